@@ -1,26 +1,79 @@
 import re
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from typing import List
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Form, UploadFile, File
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Form, UploadFile, File, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import and_, or_, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.sql.functions import current_user
 
-from backend.app.core.security import require_role, get_current_active_user
-from backend.app.models.database import get_db, User, ContactLead, Project, BlogPost, AuditLog, ServiceRequest
+from backend.app.core import activity_feed, audit, profiling, slow_queries
+from backend.app.core.audit import AuditActor, audit_actor
+from backend.app.core.bulk_actions import bulk_delete, bulk_lead_status, bulk_update, record_bulk_audit, \
+    selection_criteria
+from backend.app.core.config import settings
+from backend.app.core.dashboard import get_dashboard
+from backend.app.core.funnel import funnel_report, mark_weeks_dirty, record_status_change, week_start
+from backend.app.core.lead_import import import_leads_csv
+from backend.app.core.query_stats import query_budget
+from backend.app.core.events import broker, SSE_HEADERS
+from backend.app.core.scheduling import availability
+from backend.app.core.security import require_role, get_current_active_user, create_feed_token, verify_token, \
+    get_stream_user, create_profile_token, token_revoked
+from backend.app.models.database import get_db, User, ContactLead, Project, BlogPost, AuditLog, ServiceRequest, \
+    SessionLocal
 from backend.app.schemas import UserOut, UserStatusUpdate, UserUpdateSchema, \
     ServiceRequestOut, ServiceRequestUpdate, ContactLeadCreate, \
     ServiceRequestsPagination, BlogPostCreate  # Asigură-te că importi UserStatusUpdate
-from backend.app.schemas import ContactLeadOut, ProjectOut
+from backend.app.schemas import ContactLeadOut, ProjectOut, CalendarEventOut
+from backend.app.schemas import LeadBulkAction, ServiceRequestBulkAction, UserBulkAction, AuditLogPage
+from backend.app.utils.calendar import combine_date_time, event_title, ics_calendar
+from backend.app.utils.export import export_response
+from backend.app.utils.pagination import encode_cursor, decode_cursor
 from backend.app.utils.storage import upload_image_to_bucket
+from backend.app.api.service_requests import publish_request_change
 
-router = APIRouter(prefix="/admin", tags=["Admin Panel"])
+router = APIRouter(prefix="/admin", tags=["Admin Panel"], route_class=profiling.ProfiledRoute)
 
 # Verificăm ca toate rutele de aici să fie accesibile DOAR administratorilor
 admin_dependency = Depends(require_role(["admin"]))
 
 
+# --- DASHBOARD ---
+@router.get("/dashboard", dependencies=[admin_dependency])
+def get_admin_dashboard(
+        days: int = Query(30, ge=1, le=settings.DASHBOARD_MAX_DAYS),
+        db: Session = Depends(get_db)
+):
+    """
+    Contoarele panoului de admin (lead-uri, cereri, proiecte, utilizatori) și seriile zilnice
+    pentru grafice. Rezultatul este păstrat DASHBOARD_CACHE_SECONDS secunde.
+    """
+    return get_dashboard(db, days)
+
+
+@router.get("/analytics/funnel", dependencies=[admin_dependency])
+def get_lead_funnel(
+        from_date: date = Query(None, alias="from"),
+        to_date: date = Query(None, alias="to"),
+        group_by: str = Query("week", pattern="^(week|source|interest)$"),
+        source: List[str] = Query(None),
+        db: Session = Depends(get_db)
+):
+    """
+    Funnel-ul lead-urilor pe cohorte săptămânale: rate de conversie și percentile
+    (p50/p75/p90, în ore) pentru new -> contactat -> câștigat, din rollup-ul săptămânal.
+    """
+    to_week = week_start(to_date or datetime.utcnow().date())
+    from_week = week_start(from_date) if from_date else to_week - timedelta(weeks=11)
+    if from_week > to_week:
+        raise HTTPException(status_code=400, detail="Interval invalid.")
+    return funnel_report(db, from_week, to_week, group_by, sources=source)
+
+
 # --- GESTIONARE UTILIZATORI ---
 
 @router.get("/users", response_model=List[UserOut], dependencies=[admin_dependency])
@@ -28,11 +81,53 @@ async def list_users(db: Session = Depends(get_db)):
     return db.query(User).all()
 
 
+# --- EXPORT (CSV / XLSX) ---
+# Rândurile se citesc cu un cursor server-side (yield_per): memoria rămâne constantă
+EXPORT_BATCH_SIZE = 1000
+
+USER_EXPORT_COLUMNS = [
+    ("ID", User.id), ("Email", User.email), ("Prenume", User.first_name), ("Nume", User.last_name),
+    ("Telefon", User.phone_number), ("Locație", User.location), ("Rol", User.role), ("Activ", User.is_active),
+    ("Verificat", User.is_verified), ("2FA", User.two_factor_enabled), ("Ultima autentificare", User.last_login),
+    ("Creat la", User.created_at),
+]
+
+LEAD_EXPORT_COLUMNS = [
+    ("ID", ContactLead.id), ("Nume", ContactLead.full_name), ("Email", ContactLead.email),
+    ("Telefon", ContactLead.phone), ("Tip proprietate", ContactLead.property_type),
+    ("Interes", ContactLead.interest), ("Mesaj", ContactLead.message), ("Status", ContactLead.status),
+    ("Sursă", ContactLead.source), ("Creat la", ContactLead.created_at),
+]
+
+SERVICE_REQUEST_EXPORT_COLUMNS = [
+    ("ID", ServiceRequest.id), ("Tip", ServiceRequest.type), ("Status", ServiceRequest.status),
+    ("Data preferată", ServiceRequest.preferred_date), ("Ora", ServiceRequest.preferred_time),
+    ("Locație", ServiceRequest.location), ("Telefon", ServiceRequest.phone), ("Nume", ServiceRequest.full_name),
+    ("Email", ServiceRequest.email), ("Email cont", User.email), ("Descriere", ServiceRequest.description),
+    ("Răspuns admin", ServiceRequest.admin_response), ("Dată propusă", ServiceRequest.new_proposed_date),
+    ("Creat la", ServiceRequest.created_at),
+]
+
+
+def stream_export_rows(columns, build_query):
+    # Sesiune proprie: generatorul rulează după ce dependențele request-ului s-au închis
+    with SessionLocal() as db:
+        query = build_query(db.query(*[column for _, column in columns]))
+        yield from query.yield_per(EXPORT_BATCH_SIZE)
+
+
+@router.get("/users/export", dependencies=[admin_dependency])
+def export_users(format: str = Query("csv")):
+    rows = stream_export_rows(USER_EXPORT_COLUMNS, lambda query: query.order_by(User.created_at.desc()))
+    return export_response(format, "utilizatori", [header for header, _ in USER_EXPORT_COLUMNS], rows)
+
+
 @router.patch("/users/{user_id}/status", dependencies=[admin_dependency])
 async def update_user_status(
         user_id: UUID,
         status_data: UserStatusUpdate,
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_db),
+        actor: AuditActor = Depends(audit_actor)
 ):
     """
     Endpoint protejat: Permite doar administratorilor să schimbe statusul de verificare al unui user.
@@ -45,6 +140,7 @@ async def update_user_status(
 
     # 2. Actualizăm câmpul conform datelor trimise din Frontend
     user.is_verified = status_data.is_verified
+    audit.record(db, actor, "USER_STATUS", "user", user.id, audit.changes(user))
 
     # 3. Salvăm modificările în Postgres
     try:
@@ -62,7 +158,8 @@ async def update_user_status(
 
 
 @router.patch("/users/{user_id}/role", dependencies=[admin_dependency])
-async def change_user_role(user_id: UUID, new_role: str, db: Session = Depends(get_db)):
+async def change_user_role(user_id: UUID, new_role: str, db: Session = Depends(get_db),
+                           actor: AuditActor = Depends(audit_actor)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="Utilizator negăsit")
@@ -71,22 +168,96 @@ async def change_user_role(user_id: UUID, new_role: str, db: Session = Depends(g
         raise HTTPException(status_code=400, detail="Rol invalid")
 
     user.role = new_role
+    audit.record(db, actor, "USER_ROLE", "user", user.id, audit.changes(user))
     db.commit()
     return {"message": f"Rolul utilizatorului {user.email} a fost schimbat în {new_role}"}
 
 
-# --- MANAGEMENT LEADS (CRM) ---
-@router.get("/leads", dependencies=[admin_dependency])
-async def get_all_leads(
-    db: Session = Depends(get_db),
-    page: int = Query(1, ge=1),
-    size: int = Query(6, ge=1, le=100),
-    search: str = Query(None),
-    status: str = Query(None),
-    property_type: str = Query(None)
+# --- ACȚIUNI ÎN MASĂ ---
+# Un singur UPDATE/DELETE ... WHERE id = ANY(...) RETURNING per lot și un singur rând de audit
+
+USER_ROLES = ["user", "admin", "editor", "sales"]
+
+
+def bulk_criteria(model, payload, apply_filters):
+    if payload.ids and len(payload.ids) > settings.BULK_ACTION_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Maximum {settings.BULK_ACTION_MAX_IDS} ID-uri per acțiune.")
+    criteria = selection_criteria(model, payload.ids, apply_filters if payload.filter else None)
+    if criteria is None:
+        raise HTTPException(status_code=400, detail="Selectați înregistrările: listă de ID-uri sau cel puțin un filtru.")
+    return criteria
+
+
+def check_assignee(db: Session, assigned_to):
+    if assigned_to is not None and not db.query(User.id).filter(User.id == assigned_to).first():
+        raise HTTPException(status_code=404, detail="Utilizatorul asignat nu a fost găsit.")
+
+
+def commit_bulk_action(db: Session, actor: AuditActor, action: str, entity_type: str, ids: list, details: dict,
+                       payload):
+    if payload.filter:
+        details["filter"] = payload.filter.dict(exclude_none=True)
+    record_bulk_audit(db, actor, action, entity_type, ids, details)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Unele înregistrări au date asociate și nu pot fi modificate.")
+    except Exception:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Eroare la actualizarea bazei de date.")
+
+
+@router.post("/users/bulk", dependencies=[admin_dependency])
+def bulk_users_action(
+        payload: UserBulkAction,
+        db: Session = Depends(get_db),
+        actor: AuditActor = Depends(audit_actor)
 ):
-    query = db.query(ContactLead)
+    """
+    Status (is_active / is_verified), rol sau ștergere pentru mai mulți utilizatori deodată.
+    Contul adminului curent este exclus din selecție.
+    """
+    criteria = bulk_criteria(User, payload, lambda query: query.filter(*[
+        getattr(User, key) == value for key, value in payload.filter.dict(exclude_none=True).items()
+    ]))
+    criteria = criteria & (User.id != actor.user_id)
 
+    details = {}
+    cascaded_requests = []
+    try:
+        if payload.action == "status":
+            values = payload.dict(include={"is_active", "is_verified"}, exclude_none=True)
+            if not values:
+                raise HTTPException(status_code=400, detail="Trimiteți is_active și/sau is_verified.")
+            rows = bulk_update(db, User, criteria, values)
+            details.update(values)
+        elif payload.action == "role":
+            if payload.role not in USER_ROLES:
+                raise HTTPException(status_code=400, detail="Rol invalid")
+            rows = bulk_update(db, User, criteria, {"role": payload.role})
+            details["role"] = payload.role
+        else:
+            # FK-urile decid: sesiunile și cererile se șterg, lead-urile rămân fără proprietar.
+            # Cererile șterse în cascadă trebuie scoase și din indexul de disponibilitate
+            cascaded_requests = [request_id for (request_id,) in db.query(ServiceRequest.id).filter(
+                ServiceRequest.user_id.in_(db.query(User.id).filter(criteria))
+            )]
+            rows = bulk_delete(db, User, criteria)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Unii utilizatori au articole sau mesaje și nu pot fi șterși.")
+
+    ids = [row.id for row in rows]
+    commit_bulk_action(db, actor, f"BULK_USER_{payload.action.upper()}", "user", ids, details, payload)
+    for request_id in cascaded_requests:
+        availability.apply(request_id, None, None, None)
+    return {"message": f"{len(ids)} utilizatori actualizați", "action": payload.action, "count": len(ids), "ids": ids}
+
+
+# --- MANAGEMENT LEADS (CRM) ---
+def filter_leads(query, search: str = None, status: str = None, property_type: str = None):
+    """Filtrele listei de lead-uri, comune paginării și exportului."""
     # Aplicăm filtrul de căutare (Nume, Email sau Telefon)
     if search:
         search_filter = f"%{search}%"
@@ -105,6 +276,20 @@ async def get_all_leads(
     # Aplicăm filtrul de tip proprietate
     if property_type and property_type != "all":
         query = query.filter(ContactLead.property_type == property_type)
+    return query
+
+
+@router.get("/leads", dependencies=[admin_dependency])
+@query_budget(max_queries=3, max_repeats=1)  # utilizatorul autentificat, COUNT, pagina
+async def get_all_leads(
+    db: Session = Depends(get_db),
+    page: int = Query(1, ge=1),
+    size: int = Query(6, ge=1, le=100),
+    search: str = Query(None),
+    status: str = Query(None),
+    property_type: str = Query(None)
+):
+    query = filter_leads(db.query(ContactLead), search, status, property_type)
 
     # Calculăm totalul după filtrare, dar înainte de paginare
     total_items = query.count()
@@ -124,22 +309,73 @@ async def get_all_leads(
     }
 
 
+@router.get("/leads/export", dependencies=[admin_dependency])
+def export_leads(
+    format: str = Query("csv"),
+    search: str = Query(None),
+    status: str = Query(None),
+    property_type: str = Query(None)
+):
+    rows = stream_export_rows(
+        LEAD_EXPORT_COLUMNS,
+        lambda query: filter_leads(query, search, status, property_type).order_by(ContactLead.created_at.desc())
+    )
+    return export_response(format, "leaduri", [header for header, _ in LEAD_EXPORT_COLUMNS], rows)
+
+
 @router.delete("/leads/{lead_id}", dependencies=[admin_dependency])
-async def delete_lead(lead_id: str, db: Session = Depends(get_db)):
+async def delete_lead(lead_id: str, db: Session = Depends(get_db), actor: AuditActor = Depends(audit_actor)):
     lead = db.query(ContactLead).filter(ContactLead.id == lead_id).first()
     if not lead:
         raise HTTPException(status_code=404, detail="Lead-ul nu a fost găsit")
 
+    audit.record(db, actor, "LEAD_DELETE", "contact_lead", lead.id, audit.snapshot(lead))
+    mark_weeks_dirty(db, [lead.created_at])
     db.delete(lead)
     db.commit()
     return {"message": "Lead șters cu succes"}
 
 
+@router.post("/leads/bulk", dependencies=[admin_dependency])
+def bulk_leads_action(
+        payload: LeadBulkAction,
+        db: Session = Depends(get_db),
+        actor: AuditActor = Depends(audit_actor)
+):
+    """
+    Schimbare de status, asignare sau ștergere pentru un lot de lead-uri (ex. după un val de spam),
+    selectat prin ID-uri sau prin filtrele listei.
+    """
+    criteria = bulk_criteria(ContactLead, payload, lambda query: filter_leads(query, **payload.filter.dict()))
+
+    details = {}
+    if payload.action == "status":
+        if not payload.status:
+            raise HTTPException(status_code=400, detail="Statusul este obligatoriu.")
+        # Doar lead-urile al căror status se schimbă primesc eveniment de funnel
+        rows = bulk_lead_status(db, criteria, payload.status, changed_by=actor.user_id)
+        details["status"] = payload.status
+    elif payload.action == "assign":
+        check_assignee(db, payload.assigned_to)
+        rows = bulk_update(db, ContactLead, criteria, {"assigned_to": payload.assigned_to})
+        details["assigned_to"] = str(payload.assigned_to) if payload.assigned_to else None
+    else:
+        rows = bulk_delete(db, ContactLead, criteria, columns=(ContactLead.created_at,))
+        mark_weeks_dirty(db, [row.created_at for row in rows])
+
+    ids = [row.id for row in rows]
+    commit_bulk_action(db, actor, f"BULK_LEAD_{payload.action.upper()}", "contact_lead", ids,
+                       details, payload)
+    activity_feed.publish_bulk("lead", payload.action, ids, status=payload.status)
+    return {"message": f"{len(ids)} lead-uri actualizate", "action": payload.action, "count": len(ids), "ids": ids}
+
+
 @router.patch("/users/{user_id}", dependencies=[admin_dependency])
 async def update_user(
         user_id: str,
         user_data: UserUpdateSchema,
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_db),
+        actor: AuditActor = Depends(audit_actor)
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -150,17 +386,25 @@ async def update_user(
     for key, value in update_dict.items():
         setattr(user, key, value)
 
+    audit.record(db, actor, "USER_UPDATE", "user", user.id, audit.changes(user))
     db.commit()
     return {"message": "Utilizator actualizat cu succes"}
 
 @router.patch("/leads/{lead_id}/status", dependencies=[admin_dependency])
-async def update_lead_status(lead_id: UUID, status: str, db: Session = Depends(get_db)):
+async def update_lead_status(
+        lead_id: UUID,
+        status: str,
+        db: Session = Depends(get_db),
+        actor: AuditActor = Depends(audit_actor)
+):
     lead = db.query(ContactLead).filter(ContactLead.id == lead_id).first()
     if not lead:
         raise HTTPException(status_code=404, detail="Lead negăsit")
 
-    lead.status = status
+    record_status_change(db, lead, status, changed_by=actor.user_id)
+    audit.record(db, actor, "LEAD_STATUS", "contact_lead", lead.id, audit.changes(lead))
     db.commit()
+    activity_feed.publish_lead(lead, "updated")
     return {"message": "Status lead actualizat"}
 
 # --- ADAUGĂ ACEASTA ÎN BACKEND (fișierul cu rutele de admin) ---
@@ -168,7 +412,8 @@ async def update_lead_status(lead_id: UUID, status: str, db: Session = Depends(g
 @router.post("/leads", response_model=ContactLeadOut, dependencies=[admin_dependency])
 async def create_lead(
         lead_data: ContactLeadCreate,
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_db),
+        actor: AuditActor = Depends(audit_actor)
 ):
     """
     Creează un lead nou manual din panoul de admin.
@@ -186,18 +431,50 @@ async def create_lead(
 
     try:
         db.add(new_lead)
+        db.flush()
+        audit.record(db, actor, "LEAD_CREATE", "contact_lead", new_lead.id, audit.snapshot(new_lead))
         db.commit()
         db.refresh(new_lead)
+        activity_feed.publish_lead(new_lead, "created")
         return new_lead
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail="Eroare la salvarea lead-ului în baza de date.")
 
+@router.post("/leads/import", dependencies=[admin_dependency])
+def import_leads(
+        file: UploadFile = File(...),
+        source: str = Query("import", max_length=50),
+        dry_run: bool = Query(False),
+        actor: AuditActor = Depends(audit_actor)
+):
+    """
+    Import în masă din CSV (antete: full_name, email, phone, property_type, interest, message,
+    opțional status, source, created_at; sunt acceptate și antetele exportului).
+    Rândurile invalide sau duplicate sunt raportate cu numărul liniei și sărite.
+    """
+    if file.filename and not file.filename.lower().endswith((".csv", ".txt")):
+        raise HTTPException(status_code=400, detail="Importul acceptă doar fișiere CSV.")
+    try:
+        summary = import_leads_csv(file.file, source=source, dry_run=dry_run)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Fișierul trebuie să fie CSV codat UTF-8.")
+    if not dry_run:
+        # Importul rulează într-o singură tranzacție pe propria conexiune (engine.begin()), iar endpoint-ul
+        # nu are sesiune de request: auditul se scrie separat (db=None), după ce importul a fost comis
+        audit.record(None, actor, "LEAD_IMPORT", "contact_lead", details={
+            "file": file.filename, "source": source,
+            **{key: value for key, value in summary.items() if key != "errors"}
+        })
+    return summary
+
+
 @router.patch("/leads/{lead_id}", response_model=ContactLeadOut, dependencies=[admin_dependency])
 async def update_lead_details(
     lead_id: UUID,
     lead_data: dict, # Folosim dict pentru a permite update parțial (nume, email, etc.)
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    actor: AuditActor = Depends(audit_actor)
 ):
     """
     Actualizează detaliile generale ale unui lead.
@@ -206,37 +483,244 @@ async def update_lead_details(
     if not lead:
         raise HTTPException(status_code=404, detail="Lead-ul nu a fost găsit.")
 
+    # Statusul trece prin istoricul de evenimente (funnel)
+    if "status" in lead_data:
+        record_status_change(db, lead, lead_data.pop("status"), changed_by=actor.user_id)
+
     # Actualizăm câmpurile care există în baza de date și sunt trimise din front-end
     for key, value in lead_data.items():
         if hasattr(lead, key):
             setattr(lead, key, value)
+    audit.record(db, actor, "LEAD_UPDATE", "contact_lead", lead.id, audit.changes(lead))
 
     try:
         db.commit()
         db.refresh(lead)
+        activity_feed.publish_lead(lead, "updated")
         return lead
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail="Eroare la actualizarea lead-ului.")
 
+# --- INTEROGĂRI LENTE (jurnal în memorie, per worker) ---
+@router.get("/slow-queries", dependencies=[admin_dependency])
+def get_slow_queries(
+        limit: int = Query(50, ge=1, le=settings.SLOW_QUERY_LOG_SIZE),
+        route: str = Query(None)
+):
+    return {
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "explain_sample": settings.SLOW_QUERY_EXPLAIN_SAMPLE,
+        "items": slow_queries.recent(limit, route)
+    }
+
+
+# --- PROFILARE (per worker; stivele în format "collapsed", pentru flamegraph) ---
+# Endpoint-uri async: citesc structurile din memorie pe event loop, unde le scrie și middleware-ul
+@router.post("/profiling/token")
+async def create_profiling_token(current_user: User = admin_dependency):
+    """Token de profilare: trimis în header-ul X-Profile-Token, request-ul respectiv e profilat."""
+    return {
+        "token": create_profile_token(str(current_user.id)),
+        "header": "X-Profile-Token",
+        "expires_in": settings.PROFILE_TOKEN_EXPIRE_MINUTES * 60
+    }
+
+
+@router.get("/profiles", dependencies=[admin_dependency])
+async def list_profiles():
+    return {"sample_rate": settings.PROFILE_SAMPLE_RATE, "items": profiling.recent_profiles()}
+
+
+@router.get("/profiles/rolling", response_class=PlainTextResponse, dependencies=[admin_dependency])
+async def get_rolling_profile():
+    """Agregatul request-urilor eșantionate (PROFILE_SAMPLE_RATE) din ultimele PROFILE_ROLLING_MINUTES."""
+    return PlainTextResponse(profiling.collapsed_text(profiling.rolling_stacks()))
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse, dependencies=[admin_dependency])
+async def get_profile(profile_id: int):
+    session = profiling.profiles.get(profile_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profilul nu există (sau a fost înlocuit de altele mai noi).")
+    return PlainTextResponse(profiling.collapsed_text(session.stacks))
+
+
 # --- AUDIT LOGS (Monitorizare activitate) ---
-@router.get("/audit-logs", dependencies=[admin_dependency])
-async def get_audit_logs(limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(AuditLog).order_by(AuditLog.created_at.desc()).limit(limit).all()
+@router.get("/audit-logs", response_model=AuditLogPage, dependencies=[admin_dependency])
+@query_budget(max_queries=2, max_repeats=1)
+def get_audit_logs(
+        limit: int = Query(100, ge=1, le=settings.AUDIT_LOGS_MAX_PAGE),
+        before: str = Query(None),
+        user_id: UUID = Query(None),
+        action: str = Query(None),
+        entity_type: str = Query(None),
+        entity_id: str = Query(None),
+        from_date: datetime = Query(None),
+        to_date: datetime = Query(None),
+        db: Session = Depends(get_db)
+):
+    """
+    Jurnalul de audit, de la cele mai noi intrări. `before` este `next_cursor` de la pagina anterioară.
+    Condițiile pe created_at (interval și cursor) elimină partițiile lunare care nu pot conține rezultate.
+    """
+    query = db.query(AuditLog)
+    if user_id:
+        query = query.filter(AuditLog.user_id == user_id)
+    if action:
+        query = query.filter(AuditLog.action == action)
+    if entity_type:
+        query = query.filter(AuditLog.entity_type == entity_type)
+    if entity_id:
+        query = query.filter(AuditLog.entity_id == entity_id)
+    if from_date:
+        query = query.filter(AuditLog.created_at >= from_date)
+    if to_date:
+        query = query.filter(AuditLog.created_at < to_date)
+    if before:
+        cursor_at, cursor_id = decode_cursor(before)
+        try:
+            cursor_id = UUID(cursor_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor de paginare invalid.")
+        query = query.filter(
+            # Condiția simplă pe created_at permite eliminarea partițiilor mai noi decât cursorul
+            AuditLog.created_at <= cursor_at,
+            or_(AuditLog.created_at < cursor_at, and_(AuditLog.created_at == cursor_at, AuditLog.id < cursor_id))
+        )
+
+    items = query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit).all()
+
+    next_cursor = None
+    if len(items) == limit:
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+# --- LIVE FEED (lead-uri și cereri noi) ---
+@router.get("/feed")
+async def stream_admin_feed(
+        request: Request,
+        last_event_id: str = Query(None),
+        stream_user: dict = Depends(get_stream_user)
+):
+    """
+    Server-Sent Events cu lead-urile și cererile create/modificate, în locul refresh-ului
+    repetat pe /admin/leads și /admin/all. La reconectare, EventSource trimite singur
+    Last-Event-ID și primește evenimentele pierdute din buffer.
+    """
+    if stream_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Nu ai permisiunea necesară.")
+
+    raw_last_id = request.headers.get("last-event-id") or last_event_id
+    resume_from = None
+    if raw_last_id:
+        try:
+            resume_from = int(raw_last_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-ID invalid.")
+
+    return StreamingResponse(
+        broker.stream(request, activity_feed.ADMIN_FEED_CHANNEL, "activity", last_event_id=resume_from),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@router.get("/feed/unread", dependencies=[admin_dependency])
+async def get_feed_unread():
+    return activity_feed.unread.snapshot()
+
+
+@router.post("/feed/ack", dependencies=[admin_dependency])
+async def acknowledge_feed(entity: str = Query(None)):
+    """Resetează badge-ul (pentru toate tipurile sau doar "lead" / "service_request")."""
+    if entity is not None and entity not in activity_feed.FEED_ENTITIES:
+        raise HTTPException(status_code=400, detail="Tip de eveniment necunoscut.")
+    activity_feed.acknowledge(entity)
+    return {"message": "Notificări marcate ca citite"}
 
 
 # --- DELETE OPERATIONS (High Security) ---
 @router.delete("/projects/{project_id}", dependencies=[admin_dependency])
-async def delete_project(project_id: UUID, db: Session = Depends(get_db)):
+async def delete_project(project_id: UUID, db: Session = Depends(get_db), actor: AuditActor = Depends(audit_actor)):
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404)
+    audit.record(db, actor, "PROJECT_DELETE", "project", project.id, audit.snapshot(project))
     db.delete(project)
     db.commit()
     return {"message": "Proiect șters definitiv"}
 
 
+def filter_service_requests(query, service_type: str = None, status: str = None):
+    """Filtrele listei de cereri, comune paginării și exportului."""
+    if service_type and service_type != "all":
+        query = query.filter(ServiceRequest.type == service_type)
+
+    if status and status != "all":
+        query = query.filter(ServiceRequest.status == status)
+    return query
+
+
+@router.get("/all/export", dependencies=[admin_dependency])
+def export_service_requests(
+        format: str = Query("csv"),
+        service_type: str = Query(None),
+        status: str = Query(None)
+):
+    rows = stream_export_rows(
+        SERVICE_REQUEST_EXPORT_COLUMNS,
+        lambda query: filter_service_requests(
+            query.outerjoin(User, ServiceRequest.user_id == User.id), service_type, status
+        ).order_by(ServiceRequest.created_at.desc())
+    )
+    return export_response(format, "cereri", [header for header, _ in SERVICE_REQUEST_EXPORT_COLUMNS], rows)
+
+
+@router.post("/all/bulk", dependencies=[admin_dependency])
+def bulk_service_requests_action(
+        payload: ServiceRequestBulkAction,
+        db: Session = Depends(get_db),
+        actor: AuditActor = Depends(audit_actor)
+):
+    """Status, asignare sau ștergere pentru un lot de cereri de service."""
+    criteria = bulk_criteria(ServiceRequest, payload,
+                             lambda query: filter_service_requests(query, **payload.filter.dict()))
+
+    details = {}
+    # Coloanele necesare notificării clientului și indexului de disponibilitate
+    returned = (ServiceRequest.user_id, ServiceRequest.status, ServiceRequest.admin_response,
+                ServiceRequest.preferred_date, ServiceRequest.preferred_time, ServiceRequest.new_proposed_date,
+                ServiceRequest.updated_at)
+    if payload.action == "status":
+        if not payload.status:
+            raise HTTPException(status_code=400, detail="Statusul este obligatoriu.")
+        rows = bulk_update(db, ServiceRequest, criteria, {"status": payload.status}, returned)
+        details["status"] = payload.status
+    elif payload.action == "assign":
+        check_assignee(db, payload.assigned_to)
+        rows = bulk_update(db, ServiceRequest, criteria, {"assigned_to": payload.assigned_to})
+        details["assigned_to"] = str(payload.assigned_to) if payload.assigned_to else None
+    else:
+        rows = bulk_delete(db, ServiceRequest, criteria)
+
+    ids = [row.id for row in rows]
+    commit_bulk_action(db, actor, f"BULK_REQUEST_{payload.action.upper()}", "service_request", ids,
+                       details, payload)
+
+    for row in rows:
+        if payload.action == "status":
+            publish_request_change(row)
+            availability.apply(row.id, row.preferred_date, row.preferred_time, row.status)
+        elif payload.action == "delete":
+            availability.apply(row.id, None, None, None)
+    activity_feed.publish_bulk("service_request", payload.action, ids, status=payload.status)
+    return {"message": f"{len(ids)} cereri actualizate", "action": payload.action, "count": len(ids), "ids": ids}
+
+
 @router.get("/all", response_model=ServiceRequestsPagination, dependencies=[admin_dependency])
+@query_budget(max_queries=3, max_repeats=1)  # clientul fiecărei cereri vine prin joinedload, nu per rând
 def get_all_requests_admin(
         service_type: str = Query(None),
         status: str = Query(None),
@@ -248,11 +732,7 @@ def get_all_requests_admin(
     query = db.query(ServiceRequest).options(joinedload(ServiceRequest.user))
 
     # 2. Aplicăm filtrele
-    if service_type and service_type != "all":
-        query = query.filter(ServiceRequest.type == service_type)
-
-    if status and status != "all":
-        query = query.filter(ServiceRequest.status == status)
+    query = filter_service_requests(query, service_type, status)
 
     # 3. Calculăm totalul înainte de paginare
     total_count = query.count()
@@ -279,7 +759,8 @@ def get_all_requests_admin(
 def respond_to_request(
         request_id: UUID,  # Schimbă din str în UUID
         data: ServiceRequestUpdate,
-        db: Session = Depends(get_db)):
+        db: Session = Depends(get_db),
+        actor: AuditActor = Depends(audit_actor)):
     req = db.query(ServiceRequest).filter(ServiceRequest.id == request_id).first()
     if not req:
         raise HTTPException(status_code=404, detail="Cererea nu a fost găsită")
@@ -288,6 +769,7 @@ def respond_to_request(
     update_data = data.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(req, key, value)
+    audit.record(db, actor, "REQUEST_RESPOND", "service_request", req.id, audit.changes(req))
 
     try:
         db.commit()
@@ -296,7 +778,19 @@ def respond_to_request(
         db.rollback()
         raise HTTPException(status_code=500, detail="Eroare la salvarea răspunsului")
 
-    return {"message": "Răspuns înregistrat cu succes", "status": req.status}
+    publish_request_change(req)
+    activity_feed.publish_service_request(req, "updated")
+
+    # Semnalăm (fără să blocăm adminul) suprapunerile cu alte programări acceptate
+    availability.sync(db)
+    availability.apply_request(req)
+    conflicts = []
+    if req.new_proposed_date:
+        conflicts = availability.conflicts_for(req.new_proposed_date, req.preferred_time, exclude_id=req.id, db=db)
+    elif req.status == "accepted":
+        conflicts = availability.conflicts_for(req.preferred_date, req.preferred_time, exclude_id=req.id, db=db)
+
+    return {"message": "Răspuns înregistrat cu succes", "status": req.status, "conflicts": conflicts}
 
 
 # --- CALENDAR EVENTS ---
@@ -304,7 +798,8 @@ def respond_to_request(
 @router.post("/calendar-events", dependencies=[admin_dependency])
 async def create_calendar_event(
     event_data: dict,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    actor: AuditActor = Depends(audit_actor)
 ):
     try:
         from datetime import datetime
@@ -325,14 +820,163 @@ async def create_calendar_event(
         )
 
         db.add(new_event)
+        db.flush()
+        audit.record(db, actor, "CALENDAR_EVENT_CREATE", "service_request", new_event.id, audit.snapshot(new_event))
         db.commit()
         db.refresh(new_event)
-        return {"message": "Succes", "id": str(new_event.id)}
+        activity_feed.publish_service_request(new_event, "created")
+
+        availability.sync(db)
+        availability.apply_request(new_event)
+        conflicts = availability.conflicts_for(
+            new_event.preferred_date, new_event.preferred_time, exclude_id=new_event.id, db=db
+        )
+        return {"message": "Succes", "id": str(new_event.id), "conflicts": conflicts}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Eroare baza de date: {str(e)}")
 
 
+def calendar_events_query(db: Session, start: datetime, end: datetime):
+    # Doar coloanele necesare evenimentului; intervalul folosește indexul pe preferred_date
+    return db.query(
+        ServiceRequest.id,
+        ServiceRequest.type,
+        ServiceRequest.preferred_date,
+        ServiceRequest.preferred_time,
+        ServiceRequest.status,
+        ServiceRequest.location,
+        ServiceRequest.full_name,
+        User.first_name,
+        User.last_name
+    ).outerjoin(User, User.id == ServiceRequest.user_id) \
+        .filter(ServiceRequest.preferred_date >= start, ServiceRequest.preferred_date < end) \
+        .order_by(ServiceRequest.preferred_date)
+
+
+@router.get("/calendar", response_model=List[CalendarEventOut], dependencies=[admin_dependency])
+def get_calendar_events(
+        from_date: datetime = Query(..., alias="from"),
+        to_date: datetime = Query(..., alias="to"),
+        status: str = Query(None),
+        db: Session = Depends(get_db)
+):
+    """
+    Evenimentele din fereastra vizibilă a calendarului (from inclusiv, to exclusiv).
+    Înlocuiește descărcarea tuturor paginilor din /admin/all și filtrarea în browser.
+    """
+    if to_date <= from_date:
+        raise HTTPException(status_code=400, detail="Intervalul de date este invalid.")
+    if to_date - from_date > timedelta(days=settings.CALENDAR_MAX_RANGE_DAYS):
+        raise HTTPException(status_code=400, detail="Intervalul cerut este prea mare.")
+
+    query = calendar_events_query(db, from_date, to_date)
+    if status and status != "all":
+        query = query.filter(ServiceRequest.status == status)
+
+    return [
+        {
+            "id": row.id,
+            "title": event_title(row.full_name, row.first_name, row.last_name, row.type),
+            "type": row.type,
+            "start": combine_date_time(row.preferred_date, row.preferred_time),
+            "status": row.status,
+            "location": row.location
+        }
+        for row in query.all()
+    ]
+
+
+@router.get("/calendar/conflicts", dependencies=[admin_dependency])
+def get_calendar_conflicts(
+        from_date: datetime = Query(..., alias="from"),
+        to_date: datetime = Query(..., alias="to"),
+        db: Session = Depends(get_db)
+):
+    """Programările acceptate care depășesc numărul de echipe disponibile (dublă rezervare)."""
+    availability.sync(db)
+    return availability.overbooked(from_date.replace(tzinfo=None), to_date.replace(tzinfo=None))
+
+
+@router.get("/calendar/feed-token", dependencies=[admin_dependency])
+async def get_calendar_feed_token(current_user: User = Depends(get_current_active_user)):
+    """Link-ul iCal personal pe care tehnicianul îl adaugă în aplicația de calendar."""
+    token = create_feed_token(str(current_user.id))
+    return {"token": token, "url": f"{settings.API_V1_PREFIX}/admin/calendar.ics?token={token}"}
+
+
+def stream_feed_events(start: datetime, end: datetime):
+    # Sesiune proprie: generatorul rulează după ce dependențele request-ului s-au închis
+    with SessionLocal() as db:
+        rows = calendar_events_query(db, start, end) \
+            .add_columns(ServiceRequest.updated_at, ServiceRequest.description) \
+            .yield_per(500)
+        for row in rows:
+            yield {
+                "id": row.id,
+                "title": event_title(row.full_name, row.first_name, row.last_name, row.type),
+                "type": row.type,
+                "start": combine_date_time(row.preferred_date, row.preferred_time),
+                "status": row.status,
+                "location": row.location,
+                "description": row.description,
+                "updated_at": row.updated_at
+            }
+
+
+@router.get("/calendar.ics")
+def get_calendar_feed(request: Request, token: str = Query(...), db: Session = Depends(get_db)):
+    """
+    Feed iCal pentru aplicațiile de calendar ale tehnicienilor.
+    Suportă GET condiționat (ETag / Last-Modified): fără modificări răspundem 304 fără corp.
+    """
+    payload = verify_token(token, "calendar_feed")
+    if not payload:
+        raise HTTPException(status_code=401, detail="Link de calendar invalid sau expirat.")
+
+    owner = db.query(User.role, User.is_active, User.tokens_valid_after) \
+        .filter(User.id == payload.get("sub")).first()
+    if owner and token_revoked(payload, owner.tokens_valid_after):
+        raise HTTPException(status_code=401, detail="Link de calendar invalid sau expirat.")
+    if not owner or owner.role != "admin" or not owner.is_active:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    # Fereastra e aliniată pe zi, ca validatorul să rămână stabil între două sincronizări
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = today - timedelta(days=settings.CALENDAR_FEED_PAST_DAYS)
+    end = today + timedelta(days=settings.CALENDAR_FEED_FUTURE_DAYS)
+
+    # Validator ieftin: un singur agregat pe indexul preferred_date
+    total, last_modified = db.query(
+        func.count(ServiceRequest.id),
+        func.max(ServiceRequest.updated_at)
+    ).filter(ServiceRequest.preferred_date >= start, ServiceRequest.preferred_date < end).one()
+
+    version = int(last_modified.timestamp()) if last_modified else 0
+    etag = f'W/"{start:%Y%m%d}-{total}-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=300"}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+    elif last_modified and request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+            if last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since:
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    return StreamingResponse(
+        ics_calendar(stream_feed_events(start, end)),
+        media_type="text/calendar; charset=utf-8",
+        headers=headers
+    )
+
+
 @router.post("/projects", response_model=ProjectOut, dependencies=[admin_dependency])
 async def create_project(
         title: str = Form(...),
@@ -345,7 +989,8 @@ async def create_project(
         status: str = Form("completed"),
         is_featured: bool = Form(False),
         image_url: str = Form(...),  # Primești direct URL-ul ca text
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_db),
+        actor: AuditActor = Depends(audit_actor)
 ):
     try:
         # Nu mai facem upload, folosim direct image_url primit din Form
@@ -363,6 +1008,8 @@ async def create_project(
         )
 
         db.add(new_project)
+        db.flush()
+        audit.record(db, actor, "PROJECT_CREATE", "project", new_project.id, audit.snapshot(new_project))
         db.commit()
         db.refresh(new_project)
         return new_project
@@ -383,7 +1030,7 @@ def generate_slug(title: str) -> str:
 async def create_blog_post(
         post_data: BlogPostCreate, # Primește tot obiectul JSON odata
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        actor: AuditActor = Depends(audit_actor)
 ):
     try:
         # Extragem datele din obiectul post_data
@@ -400,10 +1047,12 @@ async def create_blog_post(
             featured_image=post_data.featured_image, # Acesta este link-ul string
             is_published=published_bool,
             published_at=datetime.utcnow() if published_bool else None,
-            author_id=current_user.id
+            author_id=actor.user_id
         )
 
         db.add(new_post)
+        db.flush()
+        audit.record(db, actor, "BLOG_CREATE", "blog_post", new_post.id, audit.snapshot(new_post, exclude=("content",)))
         db.commit()
         db.refresh(new_post)
         return new_post
@@ -416,7 +1065,8 @@ async def create_blog_post(
 @router.delete("/blog/{post_id}", dependencies=[admin_dependency])
 async def delete_blog_post(
         post_id: UUID,
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_db),
+        actor: AuditActor = Depends(audit_actor)
 ):
     """
     Șterge definitiv un articol de blog din baza de date.
@@ -433,6 +1083,7 @@ async def delete_blog_post(
 
     try:
         # 3. Ștergem articolul
+        audit.record(db, actor, "BLOG_DELETE", "blog_post", post.id, audit.snapshot(post, exclude=("content",)))
         db.delete(post)
         db.commit()
         return {"message": "Articolul a fost șters cu succes."}
@@ -450,7 +1101,8 @@ async def delete_blog_post(
 async def update_project(
         project_id: UUID,
         project_data: dict,  # Primim un dicționar pentru a permite update parțial
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_db),
+        actor: AuditActor = Depends(audit_actor)
 ):
     """
     Actualizează detaliile unui proiect existent.
@@ -469,6 +1121,7 @@ async def update_project(
     for key, value in project_data.items():
         if hasattr(project, key):
             setattr(project, key, value)
+    audit.record(db, actor, "PROJECT_UPDATE", "project", project.id, audit.changes(project))
 
     try:
         db.commit()
@@ -487,7 +1140,8 @@ async def update_project(
 async def update_blog_post(
         post_id: UUID,
         post_data: dict,
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_db),
+        actor: AuditActor = Depends(audit_actor)
 ):
     post = db.query(BlogPost).filter(BlogPost.id == post_id).first()
     if not post:
@@ -505,6 +1159,7 @@ async def update_blog_post(
                 value = value.lower() == "true"
 
             setattr(post, key, value)
+    audit.record(db, actor, "BLOG_UPDATE", "blog_post", post.id, audit.changes(post))
 
     try:
         db.commit()
@@ -2,6 +2,7 @@ import random
 import string
 
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
 from typing import List
@@ -9,18 +10,27 @@ from typing import List
 from backend.app.core.security import (
     hash_password, verify_password, create_access_token, create_refresh_token,
     create_email_token, verify_token, get_current_user, generate_2fa_secret,
-    generate_2fa_qr, verify_2fa_code, generate_verification_code, decode_email_token
+    generate_2fa_qr, verify_2fa_code, generate_verification_code, decode_email_token, revoke_user_tokens
 )
+from backend.app.core import audit
+from backend.app.core.audit import AuditActor
+from backend.app.core.cache import TTLCache
 from backend.app.core.email import send_email
 from backend.app.core.config import settings
+from backend.app.core.profiling import ProfiledRoute
 from backend.app.core.rate_limit import rate_limit_dependency
-from backend.app.models.database import get_db, User, UserSession, AuditLog
+from backend.app.core.sessions import create_session, rotate_session, revoke_session, revoke_user_sessions
+from backend.app.models.database import get_db, User
 from backend.app.schemas import (
     UserCreate, UserLogin, TokenResponse, UserOut,
     PasswordReset, UserOutWith2FA, EmailVerification
 )
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=ProfiledRoute)
+
+# Configurări 2FA în curs, per utilizator: reîncărcarea paginii de setup primește același secret
+# și același QR, fără un secret nou, fără commit și fără randare
+pending_2fa_setups = TTLCache(ttl=settings.TWO_FACTOR_SETUP_CACHE_SECONDS, maxsize=1024)
 
 
 # --- 1. ÎNREGISTRARE ---
@@ -116,27 +126,17 @@ async def login(
     access_token = create_access_token(data={"sub": str(user.id)})
     refresh_token = create_refresh_token(data={"sub": str(user.id)})
 
-    # 6. Gestionare Sesiuni
-    now = datetime.now(timezone.utc)
-    new_session = UserSession(
-        user_id=user.id,
-        refresh_token=refresh_token,
-        ip_address=request.client.host,
-        device_info=request.headers.get("user-agent", "Unknown"),
-        expires_at=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    # 6. Gestionare Sesiuni (se păstrează doar hash-ul token-ului; peste limită se închid cele mai vechi)
+    create_session(
+        db, user.id, refresh_token,
+        ip_address=request.client.host if request.client else None,
+        device_info=request.headers.get("user-agent")
     )
-    db.add(new_session)
 
     # 7. Update Metadata & Audit
-    user.last_login = now
+    user.last_login = datetime.now(timezone.utc)
 
-    log = AuditLog(
-        user_id=user.id,
-        action="LOGIN",
-        ip_address=request.client.host,
-        created_at=now
-    )
-    db.add(log)
+    audit.record(db, AuditActor.from_request(request, user.id), "LOGIN", "user", user.id)
 
     try:
         db.commit()
@@ -154,23 +154,23 @@ async def login(
 # --- 3. REFRESH TOKEN (Sesiuni Persistente) ---
 @router.post("/refresh", response_model=TokenResponse)
 async def refresh_access_token(refresh_token: str, db: Session = Depends(get_db)):
-    # Verifică token-ul în baza de date
-    db_session = db.query(UserSession).filter(UserSession.refresh_token == refresh_token).first()
-    if not db_session or db_session.expires_at < datetime.utcnow():
-        if db_session: db.delete(db_session); db.commit()
-        raise HTTPException(status_code=401, detail="Refresh token expirat sau invalid.")
-
+    # Semnătura și expirarea se verifică local, fără baza de date
     payload = verify_token(refresh_token, "refresh")
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token.")
+    if not payload or not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="Refresh token expirat sau invalid.")
 
-    # Generează un nou access token
-    new_access_token = create_access_token(data={"sub": payload["sub"]})
-    user = db.query(User).filter(User.id == payload["sub"]).first()
+    # Rotație: token-ul vechi devine invalid, sesiunea primește unul nou (un singur UPDATE ... RETURNING).
+    # Sesiunile expirate rămase în tabelă le șterge curățarea periodică (core/sessions.py)
+    new_refresh_token = create_refresh_token(data={"sub": payload["sub"]})
+    user = rotate_session(db, refresh_token, new_refresh_token, payload["sub"])
+    if user is None:
+        db.rollback()
+        raise HTTPException(status_code=401, detail="Refresh token expirat sau invalid.")
+    db.commit()
 
     return {
-        "access_token": new_access_token,
-        "refresh_token": refresh_token,
+        "access_token": create_access_token(data={"sub": payload["sub"]}),
+        "refresh_token": new_refresh_token,
         "user": user
     }
 
@@ -181,12 +181,20 @@ async def setup_2fa(current_user: User = Depends(get_current_user), db: Session
     if current_user.two_factor_enabled:
         raise HTTPException(status_code=400, detail="2FA este deja activat.")
 
+    # Alt worker poate să fi generat între timp un secret nou: cache-ul e valid doar dacă secretul coincide
+    setup = pending_2fa_setups.get(current_user.id)
+    if setup is not None and setup["secret"] == current_user.two_factor_secret:
+        return setup
+
     secret = generate_2fa_secret()
     current_user.two_factor_secret = secret
     db.commit()
 
-    qr_code_base64 = generate_2fa_qr(current_user.email, secret)
-    return {"qr_code": qr_code_base64, "secret": secret}
+    # Randarea QR-ului e CPU pur: o mutăm de pe event loop
+    qr_code = await run_in_threadpool(generate_2fa_qr, current_user.email, secret)
+    setup = {"qr_code": qr_code, "secret": secret}
+    pending_2fa_setups.set(current_user.id, setup)
+    return setup
 
 
 @router.post("/2fa/verify-and-enable")
@@ -195,6 +203,7 @@ async def verify_and_enable_2fa(code: str, current_user: User = Depends(get_curr
     if verify_2fa_code(current_user.two_factor_secret, code):
         current_user.two_factor_enabled = True
         db.commit()
+        pending_2fa_setups.invalidate(current_user.id)
         return {"message": "2FA a fost activat cu succes."}
     raise HTTPException(status_code=400, detail="Codul introdus este incorect.")
 
@@ -222,8 +231,9 @@ async def reset_password_confirm(data: PasswordReset, db: Session = Depends(get_
         raise HTTPException(status_code=404, detail="Utilizator negăsit.")
 
     user.hashed_password = hash_password(data.new_password)
-    # Revocăm toate sesiunile vechi pentru securitate
-    db.query(UserSession).filter(UserSession.user_id == user.id).delete()
+    # Revocăm toate sesiunile vechi și access token-urile emise pentru securitate
+    revoke_user_sessions(db, user.id)
+    revoke_user_tokens(user)
     db.commit()
 
     return {"message": "Parola a fost actualizată. Te poți loga."}
@@ -232,7 +242,7 @@ async def reset_password_confirm(data: PasswordReset, db: Session = Depends(get_
 # --- 6. LOGOUT ---
 @router.post("/logout")
 async def logout(refresh_token: str, db: Session = Depends(get_db)):
-    db.query(UserSession).filter(UserSession.refresh_token == refresh_token).delete()
+    revoke_session(db, refresh_token)
     db.commit()
     return {"message": "Sesiune închisă cu succes."}
 
@@ -240,6 +250,7 @@ async def logout(refresh_token: str, db: Session = Depends(get_db)):
 @router.post("/logout-all", dependencies=[Depends(get_current_user)])
 async def logout_all_devices(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     # Șterge toate sesiunile utilizatorului (security feature)
-    db.query(UserSession).filter(UserSession.user_id == current_user.id).delete()
+    revoke_user_sessions(db, current_user.id)
+    revoke_user_tokens(current_user)
     db.commit()
     return {"message": "Te-ai delogat de pe toate dispozitivele."}
\ No newline at end of file
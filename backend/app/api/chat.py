@@ -1,86 +1,539 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
-from typing import Dict, List
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Optional
 import json
-from backend.app.models.database import ChatMessage, User, get_db
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
+from backend.app.core.batch_writer import BatchWriter
+from backend.app.core.chat_protocol import (
+    MSGPACK_SUBPROTOCOL, negotiate_subprotocol, encode_json, encode_msgpack,
+    compact_chat_frame, sender_declaration_frame, decode_client_frame
+)
+from backend.app.core.config import settings
+from backend.app.core.profiling import ProfiledRoute
+from backend.app.core.query_stats import query_budget
+from backend.app.core.security import get_current_user, require_role
+from backend.app.models.database import ChatMessage, ChatRoomSummary, User, SessionLocal, get_db
+from backend.app.schemas import ChatHistoryPage, ChatInboxPage
+from backend.app.utils.pagination import encode_cursor, decode_cursor
 
-router = APIRouter(prefix="/chat", tags=["Chat"])
+router = APIRouter(prefix="/chat", tags=["Chat"], route_class=ProfiledRoute)
+logger = logging.getLogger(__name__)
 
 
 class ChatManager:
     def __init__(self):
         # room_id -> list of websockets
         self.active_rooms: Dict[str, List[WebSocket]] = {}
+        # websocket -> (room_id, user_id, ultima activitate) pentru heartbeat și limite
+        self.connections: Dict[WebSocket, dict] = {}
+        # user_id -> număr de socket-uri deschise
+        self.user_connections: Dict[str, int] = {}
+        # room_id -> (user_id -> index mic folosit în frame-urile binare în locul UUID-ului);
+        # trăiește cât camera are socket-uri deschise, apoi se șterge odată cu ea
+        self.room_senders: Dict[str, Dict[str, int]] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    async def connect(self, websocket: WebSocket, room_id: str, user_id: str) -> bool:
+        protocol = negotiate_subprotocol(websocket)
+        await websocket.accept(subprotocol=protocol)
+
+        # Limite de conexiuni: închidere grațioasă cu 1013 (Try Again Later)
+        if len(self.connections) >= settings.CHAT_MAX_CONNECTIONS:
+            await websocket.close(code=1013, reason="Server ocupat")
+            return False
+        if self.user_connections.get(user_id, 0) >= settings.CHAT_MAX_CONNECTIONS_PER_USER:
+            await websocket.close(code=1013, reason="Prea multe conexiuni deschise")
+            return False
 
-    async def connect(self, websocket: WebSocket, room_id: str):
-        await websocket.accept()
         if room_id not in self.active_rooms:
             self.active_rooms[room_id] = []
         self.active_rooms[room_id].append(websocket)
+        self.connections[websocket] = {
+            "room_id": room_id,
+            "user_id": user_id,
+            "last_seen": time.monotonic(),
+            "protocol": protocol,
+            # Expeditorii deja declarați pe acest socket (doar pentru protocolul binar)
+            "known_senders": set()
+        }
+        self.user_connections[user_id] = self.user_connections.get(user_id, 0) + 1
+        return True
+
+    def connection_counts(self) -> Dict[tuple, int]:
+        """Socket-uri deschise pe protocol (pentru /metrics)."""
+        counts: Dict[tuple, int] = {}
+        for info in list(self.connections.values()):
+            key = (info["protocol"] or "json",)
+            counts[key] = counts.get(key, 0) + 1
+        return counts or {("json",): 0}
 
     def disconnect(self, websocket: WebSocket, room_id: str):
-        if room_id in self.active_rooms:
-            self.active_rooms[room_id].remove(websocket)
+        # Idempotent: poate fi apelat și de reaper și de handler-ul socket-ului
+        info = self.connections.pop(websocket, None)
+        if info is None:
+            return
+
+        sockets = self.active_rooms.get(room_id)
+        if sockets is not None:
+            if websocket in sockets:
+                sockets.remove(websocket)
+            if not sockets:
+                del self.active_rooms[room_id]
+                self.room_senders.pop(room_id, None)
+
+        user_id = info["user_id"]
+        remaining = self.user_connections.get(user_id, 0) - 1
+        if remaining > 0:
+            self.user_connections[user_id] = remaining
+        else:
+            self.user_connections.pop(user_id, None)
+
+    def touch(self, websocket: WebSocket):
+        """Orice frame primit de la client (inclusiv pong) resetează timer-ul de inactivitate."""
+        info = self.connections.get(websocket)
+        if info is not None:
+            info["last_seen"] = time.monotonic()
+
+    async def receive_frame(self, websocket: WebSocket) -> dict:
+        """Citește un frame text (JSON) sau binar (msgpack) și îl aduce la aceeași formă."""
+        event = await websocket.receive()
+        if event["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(event.get("code", 1000))
+        self.touch(websocket)
+
+        info = self.connections.get(websocket)
+        try:
+            if event.get("bytes") is not None:
+                # Frame binar pe un socket care n-a negociat msgpack: tip de date neacceptat
+                if not info or info["protocol"] != MSGPACK_SUBPROTOCOL:
+                    raise ValueError("frame binar pe protocolul JSON")
+                frame = decode_client_frame(event["bytes"])
+            else:
+                frame = json.loads(event["text"])
+        except (ValueError, TypeError):
+            frame = None
+        if not isinstance(frame, dict):
+            await websocket.close(code=1003, reason="Frame invalid")
+            raise WebSocketDisconnect(1003)
+        return frame
+
+    async def send_frame(self, websocket: WebSocket, frame: dict):
+        """Frame-uri de control (ping, pong, ack) în protocolul negociat de socket."""
+        info = self.connections.get(websocket)
+        if info and info["protocol"] == MSGPACK_SUBPROTOCOL:
+            compact = {"t": frame["type"]}
+            compact.update({key: value for key, value in frame.items() if key != "type"})
+            await websocket.send_bytes(encode_msgpack(compact))
+        else:
+            await websocket.send_text(encode_json(frame))
 
     async def send_to_room(self, message: dict, room_id: str):
-        if room_id in self.active_rooms:
-            for connection in self.active_rooms[room_id]:
-                await connection.send_json(message)
+        if room_id not in self.active_rooms:
+            return
+
+        # Fiecare format e codat o singură dată per broadcast, indiferent câte socket-uri are camera
+        text_frame = None
+        binary_frame = None
+        declaration = None
+        sender_id = message["user_id"]
+        sender_index = None
+
+        for connection in list(self.active_rooms.get(room_id, [])):
+            info = self.connections.get(connection)
+            try:
+                if info and info["protocol"] == MSGPACK_SUBPROTOCOL:
+                    if binary_frame is None:
+                        senders = self.room_senders.setdefault(room_id, {})
+                        sender_index = senders.setdefault(sender_id, len(senders))
+                        created_at = datetime.fromisoformat(message["created_at"])
+                        binary_frame = compact_chat_frame(message, sender_index, created_at)
+                    if sender_id not in info["known_senders"]:
+                        if declaration is None:
+                            declaration = sender_declaration_frame(sender_index, message)
+                        await connection.send_bytes(declaration)
+                        info["known_senders"].add(sender_id)
+                    await connection.send_bytes(binary_frame)
+                else:
+                    if text_frame is None:
+                        text_frame = encode_json(message)
+                    await connection.send_text(text_frame)
+            except Exception:
+                # Conexiune TCP moartă: o scoatem din cameră în loc să blocăm broadcast-ul
+                self.disconnect(connection, room_id)
+
+    def stats(self) -> dict:
+        """Gauge live pentru monitorizare."""
+        return {
+            "sockets": len(self.connections),
+            "rooms": len(self.active_rooms),
+            "users": len(self.user_connections)
+        }
+
+    def start(self):
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(settings.CHAT_PING_INTERVAL_SECONDS)
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logger.error(f"Eroare heartbeat chat: {str(e)}")
+
+    async def heartbeat(self):
+        """Trimite ping tuturor și închide socket-urile care nu au mai răspuns în timeout."""
+        now = time.monotonic()
+        for websocket, info in list(self.connections.items()):
+            if now - info["last_seen"] > settings.CHAT_IDLE_TIMEOUT_SECONDS:
+                self.disconnect(websocket, info["room_id"])
+                try:
+                    await websocket.close(code=1001, reason="Inactiv")
+                except Exception:
+                    pass
+                continue
+
+            try:
+                await self.send_frame(websocket, {"type": "ping"})
+            except Exception:
+                self.disconnect(websocket, info["room_id"])
 
 
 manager = ChatManager()
 
 
+def room_owner_id(room_id: str) -> Optional[uuid.UUID]:
+    """Camerele au formatul user_{user_id}; extragem clientul căruia îi aparține camera."""
+    try:
+        return uuid.UUID(room_id.removeprefix("user_"))
+    except ValueError:
+        return None
+
+
+def update_room_summaries(conn, rows: List[dict], result):
+    """
+    Rulează în aceeași tranzacție cu INSERT-ul lotului: un singur upsert multi-rând
+    în chat_room_summaries, ca inbox-ul să nu mai facă GROUP BY pe tot istoricul.
+    Numără doar rândurile inserate acum (RETURNING id): un mesaj retrimis după reconectare
+    e ignorat de ON CONFLICT DO NOTHING și nu trebuie să crească unread_count.
+    """
+    inserted = {row.id for row in result}
+    rows = [row for row in rows if row["id"] in inserted]
+    if not rows:
+        return
+
+    # user_id are FK spre users: o cameră al cărei UUID nu e (sau nu mai e) un utilizator
+    # primește NULL, altfel upsert-ul ar pica și ar lua cu el mesajele din același lot
+    owners = {room_owner_id(row["room_id"]) for row in rows} - {None}
+    existing = set(conn.execute(select(User.id).where(User.id.in_(owners))).scalars()) if owners else set()
+
+    summaries: Dict[str, dict] = {}
+    for row in rows:  # Lotul e în ordinea sosirii, deci ultimul rând e cel mai nou
+        owner_id = room_owner_id(row["room_id"])
+        summary = summaries.setdefault(row["room_id"], {
+            "room_id": row["room_id"],
+            "user_id": owner_id if owner_id in existing else None,
+            "unread_count": 0
+        })
+        summary["last_message"] = row["message"]
+        summary["last_message_at"] = row["created_at"]
+        summary["last_sender_id"] = row["user_id"]
+        summary["last_is_admin"] = row["is_admin"]
+        summary["updated_at"] = row["created_at"]
+        if not row["is_admin"]:
+            summary["unread_count"] += 1
+
+    table = ChatRoomSummary.__table__
+    stmt = pg_insert(table).values(list(summaries.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["room_id"],
+        set_={
+            "last_message": stmt.excluded.last_message,
+            "last_message_at": stmt.excluded.last_message_at,
+            "last_sender_id": stmt.excluded.last_sender_id,
+            "last_is_admin": stmt.excluded.last_is_admin,
+            "unread_count": table.c.unread_count + stmt.excluded.unread_count,
+            "updated_at": stmt.excluded.updated_at
+        }
+    )
+    conn.execute(stmt)
+
+
+# Mesajele sunt difuzate imediat și scrise în DB în loturi, în afara căii de latență
+message_writer = BatchWriter(
+    ChatMessage.__table__,
+    flush_interval=settings.CHAT_FLUSH_INTERVAL_MS / 1000,
+    max_batch=settings.CHAT_FLUSH_MAX_BATCH,
+    max_queue=settings.CHAT_WRITE_QUEUE_MAX,
+    after_flush=update_room_summaries,
+    # Un client care retrimite același ID nu trebuie să strice tot lotul
+    statement=pg_insert(ChatMessage.__table__).on_conflict_do_nothing(index_elements=["id"])
+    .returning(ChatMessage.__table__.c.id)
+)
+
+
+def load_chat_user(user_id: str) -> Optional[dict]:
+    """
+    Încarcă datele autorului într-o sesiune scurtă.
+    Socket-ul rămâne deschis ore întregi, dar conexiunea revine imediat în pool.
+    """
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is None:
+            return None
+        return {
+            "id": user.id,
+            "role": user.role,
+            "name": f"{user.first_name} {user.last_name}",
+            "tokens_valid_after": user.tokens_valid_after,
+        }
+
+
+def parse_client_message_id(value) -> uuid.UUID:
+    """Acceptă ID-ul generat de client (UUID valid), altfel generăm unul pe server."""
+    if value:
+        try:
+            return uuid.UUID(str(value))
+        except ValueError:
+            pass
+    return uuid.uuid4()
+
+
 @router.websocket("/ws/{room_user_id}")
 async def chat_endpoint(
         websocket: WebSocket,
         room_user_id: str,
-        token: str,  # Trimis ca query param
-        db: Session = Depends(get_db)
+        token: str  # Trimis ca query param
 ):
     # 1. Validare Token manuală (WebSockets nu suportă headere standard ușor)
-    from backend.app.core.security import verify_token
+    from backend.app.core.security import verify_token, token_revoked
     payload = verify_token(token)
     if not payload:
         await websocket.close(code=1008)
         return
 
+    # Nu folosim Depends(get_db): sesiunea ar ține o conexiune din pool cât trăiește socket-ul
     current_user_id = payload.get("sub")
-    user = db.query(User).filter(User.id == current_user_id).first()
+    user = await run_in_threadpool(load_chat_user, current_user_id)
+    if user is None or token_revoked(payload, user["tokens_valid_after"]):
+        await websocket.close(code=1008)
+        return
 
     # Restricție: Userii normali pot intra doar în camera lor proprie
     # Adminii pot intra în orice room_user_id
-    if user.role != "admin" and str(user.id) != room_user_id:
+    is_admin = user["role"] == "admin"
+    if not is_admin and str(user["id"]) != room_user_id:
         await websocket.close(code=1008)
         return
 
     room_id = f"user_{room_user_id}"
-    await manager.connect(websocket, room_id)
+    if not await manager.connect(websocket, room_id, str(user["id"])):
+        return
 
     try:
         while True:
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
-
-            # Salvare în baza de date
-            new_msg = ChatMessage(
-                room_id=room_id,
-                user_id=user.id,
-                message=message_data["text"],
-                is_admin=(user.role == "admin")
-            )
-            db.add(new_msg)
-            db.commit()
-
-            # Broadcast în cameră
+            message_data = await manager.receive_frame(websocket)
+
+            # Frame-uri de control pentru heartbeat: nu se salvează
+            frame_type = message_data.get("type")
+            if frame_type == "pong":
+                continue
+            if frame_type == "ping":
+                await manager.send_frame(websocket, {"type": "pong"})
+                continue
+
+            msg_id = parse_client_message_id(message_data.get("id"))
+            created_at = datetime.utcnow()
+
+            # Broadcast imediat în cameră, fără să așteptăm baza de date
             await manager.send_to_room({
-                "id": str(new_msg.id),
-                "user_id": str(user.id),
-                "name": f"{user.first_name} {user.last_name}",
+                "id": str(msg_id),
+                "user_id": str(user["id"]),
+                "name": user["name"],
                 "text": message_data["text"],
-                "is_admin": new_msg.is_admin,
-                "created_at": new_msg.created_at.isoformat()
+                "is_admin": is_admin,
+                "created_at": created_at.isoformat()
             }, room_id)
 
+            # Persistare write-behind (INSERT multi-rând la câteva milisecunde)
+            row = {
+                "id": msg_id,
+                "room_id": room_id,
+                "user_id": user["id"],
+                "message": message_data["text"],
+                "is_admin": is_admin,
+                "is_read": False,
+                "created_at": created_at
+            }
+            # Clientul poate cere confirmarea durabilă, dar nu o poate dezactiva când serverul o impune
+            durable = settings.CHAT_DURABLE_ACK or bool(message_data.get("durable"))
+            if not durable:
+                await message_writer.put(row)
+                continue
+
+            # Mod durabil: confirmăm expeditorului doar după flush
+            try:
+                await message_writer.put(row, wait=True)
+                await manager.send_frame(websocket, {"type": "ack", "id": str(msg_id)})
+            except WebSocketDisconnect:
+                raise
+            except Exception:
+                await manager.send_frame(websocket, {"type": "error", "id": str(msg_id)})
+
     except WebSocketDisconnect:
-        manager.disconnect(websocket, room_id)
\ No newline at end of file
+        pass
+    finally:
+        manager.disconnect(websocket, room_id)
+
+
+# --- ISTORIC & INBOX (REST) ---
+
+def check_room_access(current_user: User, room_user_id: str):
+    # Aceeași regulă ca la websocket: userii văd doar camera lor, adminii orice cameră
+    if current_user.role != "admin" and str(current_user.id) != room_user_id:
+        raise HTTPException(status_code=403, detail="Nu ai acces la această conversație.")
+
+
+@router.get("/rooms/{room_user_id}/messages", response_model=ChatHistoryPage)
+def get_room_messages(
+        room_user_id: str,
+        before: Optional[str] = Query(None),
+        limit: int = Query(50, ge=1, le=200),
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+):
+    """
+    Istoricul unei camere, de la cele mai noi la cele mai vechi.
+    `before` este cursorul `next_cursor` primit la pagina anterioară.
+    """
+    check_room_access(current_user, room_user_id)
+    room_id = f"user_{room_user_id}"
+
+    query = db.query(ChatMessage).filter(ChatMessage.room_id == room_id)
+    if before:
+        # Paginare keyset pe indexul (room_id, created_at): fără OFFSET
+        cursor_at, cursor_id = decode_cursor(before)
+        try:
+            cursor_id = uuid.UUID(cursor_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor de paginare invalid.")
+        query = query.filter(or_(
+            ChatMessage.created_at < cursor_at,
+            and_(ChatMessage.created_at == cursor_at, ChatMessage.id < cursor_id)
+        ))
+
+    items = query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()).limit(limit).all()
+
+    next_cursor = None
+    if len(items) == limit:
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.post("/rooms/{room_user_id}/read")
+def mark_room_as_read(
+        room_user_id: str,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+):
+    """Marchează ca citite toate mesajele primite din cameră, într-un singur UPDATE."""
+    check_room_access(current_user, room_user_id)
+    room_id = f"user_{room_user_id}"
+    reader_is_admin = current_user.role == "admin"
+    now = datetime.utcnow()
+
+    # Citim mesajele celeilalte părți (adminul le citește pe ale clientului și invers)
+    result = db.execute(
+        update(ChatMessage)
+        .where(
+            ChatMessage.room_id == room_id,
+            ChatMessage.is_admin == (not reader_is_admin),
+            ChatMessage.is_read == False
+        )
+        .values(is_read=True, read_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+    if reader_is_admin:
+        db.execute(
+            update(ChatRoomSummary)
+            .where(ChatRoomSummary.room_id == room_id)
+            .values(unread_count=0)
+            .execution_options(synchronize_session=False)
+        )
+
+    db.commit()
+    return {"message": "Mesaje marcate ca citite", "updated": result.rowcount}
+
+
+@router.get("/admin/inbox", response_model=ChatInboxPage, dependencies=[Depends(require_role(["admin"]))])
+@query_budget(max_queries=2, max_repeats=1)
+def get_admin_inbox(
+        before: Optional[str] = Query(None),
+        limit: int = Query(30, ge=1, le=100),
+        db: Session = Depends(get_db)
+):
+    """
+    Lista conversațiilor pentru admin: ultimul mesaj și numărul de mesaje necitite.
+    Citește din chat_room_summaries (un rând per cameră), nu din istoricul complet.
+    """
+    query = db.query(
+        ChatRoomSummary,
+        User.first_name,
+        User.last_name
+    ).outerjoin(User, User.id == ChatRoomSummary.user_id)
+
+    if before:
+        cursor_at, cursor_room = decode_cursor(before)
+        query = query.filter(or_(
+            ChatRoomSummary.last_message_at < cursor_at,
+            and_(ChatRoomSummary.last_message_at == cursor_at, ChatRoomSummary.room_id < cursor_room)
+        ))
+
+    rows = query.order_by(
+        ChatRoomSummary.last_message_at.desc(),
+        ChatRoomSummary.room_id.desc()
+    ).limit(limit).all()
+
+    items = [
+        {
+            "room_id": summary.room_id,
+            "user_id": summary.user_id,
+            "user_name": f"{first_name} {last_name}" if first_name else None,
+            "last_message": summary.last_message,
+            "last_message_at": summary.last_message_at,
+            "last_is_admin": summary.last_is_admin,
+            "unread_count": summary.unread_count
+        }
+        for summary, first_name, last_name in rows
+    ]
+
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1][0]
+        next_cursor = encode_cursor(last.last_message_at, last.room_id)
+
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/stats", dependencies=[Depends(require_role(["admin"]))])
+async def get_chat_stats():
+    """Socket-uri și camere deschise în acest proces (pentru monitorizare)."""
+    return manager.stats()
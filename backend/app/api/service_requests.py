@@ -1,15 +1,36 @@
 import uuid
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from backend.app.core.security import get_current_user
+from backend.app.core import activity_feed
+from backend.app.core.config import settings
+from backend.app.core.profiling import ProfiledRoute
+from backend.app.core.query_stats import query_budget
+from backend.app.core.events import broker, user_channel, SSE_HEADERS
+from backend.app.core.scheduling import availability
+from backend.app.core.security import get_current_user, get_stream_user
 from backend.app.models.database import get_db, ServiceRequest
 from backend.app.schemas import ServiceRequestOut
 from backend.app.utils.storage import upload_image_to_bucket
 
-router = APIRouter(prefix="", tags=["Requests"])
+router = APIRouter(prefix="", tags=["Requests"], route_class=ProfiledRoute)
+
+
+def publish_request_change(req: ServiceRequest):
+    """Trimite clientului (pe toate tab-urile deschise) starea nouă a cererii."""
+    if req.user_id is None:
+        return
+    broker.publish(user_channel(req.user_id), {
+        "id": str(req.id),
+        "status": req.status,
+        "admin_response": req.admin_response,
+        "preferred_date": req.preferred_date,
+        "new_proposed_date": req.new_proposed_date,
+        "updated_at": req.updated_at
+    })
 
 
 @router.post("/", response_model=ServiceRequestOut)
@@ -25,6 +46,20 @@ async def create_request(
         db: Session = Depends(get_db),
         current_user=Depends(get_current_user)
 ):
+    # 0. Verificăm capacitatea echipelor înainte de a urca pozele
+    # Convertim string-ul de dată primit din frontend în obiect datetime
+    try:
+        date_obj = datetime.fromisoformat(preferred_date.replace('Z', '+00:00'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Data programării este invalidă.")
+
+    availability.sync(db)
+    if availability.conflicts_for(date_obj, preferred_time, db=db):
+        raise HTTPException(
+            status_code=409,
+            detail="Intervalul ales nu mai este disponibil. Te rugăm să alegi alt interval."
+        )
+
     try:
         # 1. Procesăm și urcăm imaginile în Bucket-ul Railway
         image_urls = []
@@ -33,9 +68,6 @@ async def create_request(
             image_urls.append(url)
 
         # 2. Creăm obiectul pentru baza de date
-        # Convertim string-ul de dată primit din frontend în obiect datetime
-        date_obj = datetime.fromisoformat(preferred_date.replace('Z', '+00:00'))
-
         new_request = ServiceRequest(
             id=uuid.uuid4(),
             user_id=current_user.id,
@@ -52,6 +84,8 @@ async def create_request(
         db.add(new_request)
         db.commit()
         db.refresh(new_request)
+        publish_request_change(new_request)
+        activity_feed.publish_service_request(new_request, "created")
         return new_request
 
     except Exception as e:
@@ -59,7 +93,44 @@ async def create_request(
         raise HTTPException(status_code=500, detail=f"Eroare la crearea cererii: {str(e)}")
 
 
+@router.get("/availability")
+def get_availability(
+        from_date: datetime = Query(..., alias="from"),
+        to_date: datetime = Query(..., alias="to"),
+        db: Session = Depends(get_db),
+        current_user=Depends(get_current_user)
+):
+    """Sloturile libere (cel puțin o echipă disponibilă) din intervalul cerut."""
+    from_date = from_date.replace(tzinfo=None)
+    to_date = to_date.replace(tzinfo=None)
+    if to_date <= from_date:
+        raise HTTPException(status_code=400, detail="Intervalul de date este invalid.")
+    if to_date - from_date > timedelta(days=settings.SCHEDULING_MAX_RANGE_DAYS):
+        raise HTTPException(status_code=400, detail="Intervalul cerut este prea mare.")
+
+    availability.sync(db)
+    return {
+        "crew_capacity": settings.CREW_CAPACITY,
+        "duration_minutes": settings.CALENDAR_EVENT_DURATION_MINUTES,
+        "days": availability.free_slots(from_date, to_date)
+    }
+
+
+@router.get("/events")
+async def stream_request_events(request: Request, stream_user: dict = Depends(get_stream_user)):
+    """
+    Server-Sent Events: clientul primește imediat schimbările de status, răspunsul
+    adminului și noile date propuse, în loc să interogheze /my-requests periodic.
+    """
+    return StreamingResponse(
+        broker.stream(request, user_channel(stream_user["id"]), "service_request"),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
 @router.get("/my-requests", response_model=List[ServiceRequestOut])
+@query_budget(max_queries=2, max_repeats=1)  # ServiceRequestOut.user e chiar utilizatorul curent (identity map)
 def get_my_requests(
         db: Session = Depends(get_db),
         current_user=Depends(get_current_user)
@@ -90,11 +161,22 @@ def accept_reschedule(
     if not req or not req.new_proposed_date:
         raise HTTPException(status_code=404, detail="Nu s-a găsit nicio propunere de reprogramare")
 
+    # Între timp slotul propus poate fi fost ocupat de altă programare
+    availability.sync(db)
+    if availability.conflicts_for(req.new_proposed_date, req.preferred_time, exclude_id=req.id, db=db):
+        raise HTTPException(
+            status_code=409,
+            detail="Intervalul propus nu mai este disponibil. Vă vom contacta cu o nouă propunere."
+        )
+
     # Clientul acceptă: data propusă devine data preferată
     req.preferred_date = req.new_proposed_date
     req.new_proposed_date = None
     req.status = "accepted"
 
     db.commit()
+    availability.apply_request(req)
+    publish_request_change(req)
+    activity_feed.publish_service_request(req, "updated")
     return {"message": "Data a fost actualizată cu succes"}
 
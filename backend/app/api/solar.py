@@ -1,20 +1,25 @@
+from datetime import datetime, timedelta
 from typing import List, Optional
 from uuid import UUID
 from fastapi import APIRouter, Depends, Query, UploadFile, File, BackgroundTasks, HTTPException
+from sqlalchemy import or_, text
 from sqlalchemy.orm import Session
 from slugify import slugify
 
+from backend.app.core import activity_feed
 from backend.app.core.config import settings
+from backend.app.core.profiling import ProfiledRoute
 from backend.app.core.email import send_email
 from backend.app.core.security import get_current_active_user, require_role, get_current_user
 from backend.app.models.database import Project, BlogPost, ContactLead, get_db, User
+from backend.app.utils.contacts import email_key, phone_key
 from backend.app.schemas import (
     ProjectCreate, ProjectOut,
     BlogPostCreate, BlogPostOut,
     ContactLeadCreate
 )
 
-router = APIRouter(prefix="/solar", tags=["Solar Content"])
+router = APIRouter(prefix="/solar", tags=["Solar Content"], route_class=ProfiledRoute)
 
 
 # --- PROIECTE (Acces Public la Vizualizare) ---
@@ -68,11 +73,50 @@ async def get_blog_post(slug: str, db: Session = Depends(get_db)):
 
 
 # --- LEAD MANAGEMENT (Contact) ---
+def find_open_lead(db: Session, data: ContactLeadCreate) -> Optional[ContactLead]:
+    """Lead-ul deschis al aceleiași persoane (email sau telefon normalizat), activ în fereastra de comasare."""
+    keys = {"email": email_key(data.email), "phone": phone_key(data.phone)}
+    if db.get_bind().dialect.name == "postgresql":
+        # Două trimiteri simultane ale aceleiași persoane nu trebuie să creeze două lead-uri
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": keys["email"]})
+
+    closed_statuses = settings.LEAD_WON_STATUSES + settings.LEAD_LOST_STATUSES
+    since = datetime.utcnow() - timedelta(hours=settings.LEAD_MERGE_WINDOW_HOURS)
+    # OR pe două coloane indexate: Postgres combină cele două index scan-uri (BitmapOr)
+    return db.query(ContactLead).filter(
+        or_(ContactLead.email_key == keys["email"], ContactLead.phone_key == keys["phone"]),
+        ContactLead.updated_at >= since,
+        ContactLead.status.notin_(closed_statuses)
+    ).order_by(ContactLead.updated_at.desc()).first()
+
+
+def merge_submission(lead: ContactLead, data: ContactLeadCreate):
+    """Adaugă mesajul nou la lead-ul existent în loc să creăm un rând duplicat."""
+    now = datetime.utcnow()
+    if data.message:
+        entry = f"[{now:%d.%m.%Y %H:%M}] {data.message}"
+        lead.message = f"{lead.message}\n\n{entry}" if lead.message else entry
+    for field in ("phone", "property_type", "interest"):
+        if not getattr(lead, field):
+            setattr(lead, field, getattr(data, field))
+    lead.submissions = (lead.submissions or 1) + 1
+    lead.updated_at = now
+
+
 @router.post("/contact")
 async def submit_contact(data: ContactLeadCreate, bg_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    existing = find_open_lead(db, data)
+    if existing is not None:
+        merge_submission(existing, data)
+        db.commit()
+        # Fără email de notificare nou: lead-ul e deja în lucru
+        activity_feed.publish_lead(existing, "updated")
+        return {"message": "Solicitarea a fost primită!"}
+
     new_lead = ContactLead(**data.dict())
     db.add(new_lead)
     db.commit()
+    activity_feed.publish_lead(new_lead, "created")
 
     bg_tasks.add_task(send_email, to_email=settings.SMTP_USER, subject="🚀 Lead Nou - Gabriel Solar",
                       template_name="contact_notification", context=data.dict())
@@ -0,0 +1,76 @@
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from backend.app.core.config import settings
+from backend.app.core.events import broker
+
+# Canalul comun al adminilor: lead-uri și cereri noi/modificate
+ADMIN_FEED_CHANNEL = "admin:feed"
+
+FEED_ENTITIES = ("lead", "service_request")
+
+
+class UnreadCounter:
+    """
+    Badge-ul de necitite din panoul de admin, ținut în memorie.
+    Se actualizează din evenimentele livrate pe canal (inclusiv "ack"), așa că
+    toate worker-ele ajung la aceeași valoare când broker-ul folosește Redis.
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, int] = {entity: 0 for entity in FEED_ENTITIES}
+        self._lock = threading.Lock()
+
+    def on_event(self, event: dict):
+        with self._lock:
+            if event.get("action") == "ack":
+                for entity in event.get("entities") or FEED_ENTITIES:
+                    self._counts[entity] = 0
+            elif event.get("action") == "created" and event.get("entity") in self._counts:
+                self._counts[event["entity"]] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        counts["total"] = sum(counts.values())
+        return counts
+
+
+unread = UnreadCounter()
+broker.enable_replay(ADMIN_FEED_CHANNEL, settings.ADMIN_FEED_BUFFER_SIZE)
+broker.add_listener(ADMIN_FEED_CHANNEL, unread.on_event)
+
+
+def publish_activity(entity: str, action: str, record_id, **fields):
+    """Eveniment compact pentru feed: doar ce trebuie ca lista din admin să se actualizeze fără refresh."""
+    event = {"entity": entity, "action": action, "id": str(record_id), "at": datetime.utcnow()}
+    event.update({key: value for key, value in fields.items() if value is not None})
+    broker.publish(ADMIN_FEED_CHANNEL, event)
+
+
+def publish_lead(lead, action: str):
+    publish_activity("lead", action, lead.id, name=lead.full_name, status=lead.status, interest=lead.interest)
+
+
+def publish_service_request(req, action: str):
+    publish_activity("service_request", action, req.id, type=req.type, status=req.status,
+                     preferred_date=req.preferred_date)
+
+
+def publish_bulk(entity: str, operation: str, ids, **fields):
+    """Un singur eveniment pentru un lot din admin (status, asignare, ștergere): lista se reîncarcă."""
+    if not ids:
+        return
+    event = {
+        "entity": entity, "action": "bulk", "operation": operation, "count": len(ids),
+        "ids": [str(record_id) for record_id in ids[:settings.BULK_AUDIT_MAX_IDS]], "at": datetime.utcnow()
+    }
+    event.update({key: value for key, value in fields.items() if value is not None})
+    broker.publish(ADMIN_FEED_CHANNEL, event)
+
+
+def acknowledge(entity: Optional[str] = None):
+    broker.publish(ADMIN_FEED_CHANNEL, {
+        "entity": entity, "action": "ack", "entities": [entity] if entity else list(FEED_ENTITIES)
+    })
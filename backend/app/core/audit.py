@@ -0,0 +1,133 @@
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+
+from fastapi import Depends, Request
+from sqlalchemy import event, inspect
+
+from backend.app.core.batch_writer import BatchWriter
+from backend.app.core.config import settings
+from backend.app.core.security import get_current_active_user
+from backend.app.models.database import AuditLog, SessionLocal, User
+
+# Rândurile de audit așteaptă în sesiune până la commit (nu audităm modificări anulate)
+PENDING_KEY = "audit_pending"
+
+# Nu ajung niciodată în detaliile auditului
+REDACTED_FIELDS = {"hashed_password", "two_factor_secret", "verification_code_hash", "token_hash"}
+
+
+class AuditActor:
+    """Cine face modificarea: utilizatorul autentificat, plus IP-ul și user-agent-ul request-ului."""
+
+    __slots__ = ("user_id", "ip_address", "user_agent")
+
+    def __init__(self, user_id, ip_address: Optional[str] = None, user_agent: Optional[str] = None):
+        self.user_id = user_id
+        self.ip_address = ip_address
+        self.user_agent = user_agent[:500] if user_agent else None
+
+    @classmethod
+    def from_request(cls, request: Request, user_id) -> "AuditActor":
+        return cls(user_id, request.client.host if request.client else None, request.headers.get("user-agent"))
+
+
+async def audit_actor(request: Request, current_user: User = Depends(get_current_active_user)) -> AuditActor:
+    # Aceeași dependență ca require_role: FastAPI o rezolvă o singură dată per request
+    return AuditActor.from_request(request, current_user.id)
+
+
+# Write-behind: un INSERT multi-rând la fiecare AUDIT_FLUSH_INTERVAL_MS, în afara request-ului
+audit_writer = BatchWriter(
+    AuditLog.__table__,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL_MS / 1000,
+    max_batch=settings.AUDIT_FLUSH_MAX_BATCH,
+    max_queue=settings.AUDIT_QUEUE_MAX
+)
+
+
+def _jsonable(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+def changes(instance) -> dict:
+    """Diff-ul câmpurilor modificate și încă necomise: {"camp": [vechi, nou]}. Se apelează înainte de commit."""
+    state = inspect(instance)
+    diff = {}
+    for attribute in state.mapper.column_attrs:
+        history = state.attrs[attribute.key].history
+        if not history.has_changes():
+            continue
+        old = history.deleted[0] if history.deleted else None
+        new = history.added[0] if history.added else None
+        if old == new:
+            continue
+        if attribute.key in REDACTED_FIELDS:
+            diff[attribute.key] = ["***", "***"]
+        else:
+            diff[attribute.key] = [_jsonable(old), _jsonable(new)]
+    return diff
+
+
+def snapshot(instance, exclude=()) -> dict:
+    """Valorile coloanelor unui rând (pentru creări și ștergeri); `exclude` pentru câmpuri voluminoase."""
+    state = inspect(instance)
+    return {
+        attribute.key: _jsonable(state.attrs[attribute.key].value)
+        for attribute in state.mapper.column_attrs
+        if attribute.key not in REDACTED_FIELDS and attribute.key not in exclude
+    }
+
+
+def record(db, actor: AuditActor, action: str, entity_type: Optional[str] = None, entity_id=None,
+           details: Optional[dict] = None):
+    """
+    Înregistrează o acțiune; apelantul face commit ca de obicei.
+    Implicit rândul pleacă în coada write-behind doar după commit; cu AUDIT_SYNC_WRITES
+    intră în aceeași tranzacție cu modificarea. Fără sesiune (db=None, ex. importul care își
+    gestionează singur tranzacțiile) rândul se trimite imediat.
+    """
+    row = {
+        "id": uuid.uuid4(),
+        "user_id": actor.user_id,
+        "action": action,
+        "entity_type": entity_type,
+        "entity_id": str(entity_id) if entity_id is not None else None,
+        "details": _jsonable(details) if details else None,
+        "ip_address": actor.ip_address,
+        "user_agent": actor.user_agent,
+        "created_at": datetime.utcnow(),
+    }
+    if db is None:
+        if settings.AUDIT_SYNC_WRITES:
+            with SessionLocal() as session:
+                session.add(AuditLog(**row))
+                session.commit()
+        else:
+            audit_writer.submit(row)
+    elif settings.AUDIT_SYNC_WRITES:
+        db.add(AuditLog(**row))
+    else:
+        db.info.setdefault(PENDING_KEY, []).append(row)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _submit_after_commit(session):
+    for row in session.info.pop(PENDING_KEY, ()):
+        audit_writer.submit(row)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(PENDING_KEY, None)
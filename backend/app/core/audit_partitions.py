@@ -0,0 +1,134 @@
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+from backend.app.core.config import settings
+from backend.app.models.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Cheie pentru pg_advisory_xact_lock: un singur worker întreține partițiile la un moment dat
+AUDIT_PARTITION_LOCK_KEY = 350042
+
+# Partițiile detașate ajung aici înainte de export (sau rămân aici dacă AUDIT_ARCHIVE_DIR e gol)
+ARCHIVE_SCHEMA = "audit_archive"
+# Primește rândurile pentru care nu există încă partiția lunii (întreținerea n-a rulat la timp)
+DEFAULT_PARTITION = "audit_logs_default"
+PARTITION_NAME = re.compile(r"^audit_logs_(\d{4})_(\d{2})$")
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def list_partitions(conn) -> List[Tuple[str, date]]:
+    """Partițiile atașate la audit_logs, ordonate după lună: (nume, prima zi a lunii)."""
+    names = conn.execute(text("""
+        SELECT child.relname
+          FROM pg_inherits
+          JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+          JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+         WHERE parent.oid = to_regclass('audit_logs')
+    """)).scalars()
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, date(int(match[1]), int(match[2]), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def _default_partition_months(conn) -> set:
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}).scalar() is None:
+        return set()
+    months = conn.execute(text(
+        f"SELECT DISTINCT date_trunc('month', created_at)::date FROM {DEFAULT_PARTITION}"
+    )).scalars()
+    return set(months)
+
+
+def _try_lock(conn) -> bool:
+    return conn.execute(
+        text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": AUDIT_PARTITION_LOCK_KEY}
+    ).scalar()
+
+
+def maintain_audit_partitions(today: Optional[date] = None) -> Optional[dict]:
+    """
+    Creează partițiile lunii curente și ale următoarelor AUDIT_PARTITIONS_AHEAD luni (plus lunile
+    rămase în partiția DEFAULT, ale căror rânduri se mută în partiția lor), apoi
+    detașează lunile mai vechi de AUDIT_RETENTION_MONTHS (0 = păstrăm tot) și le mută în
+    schema de arhivă. Detașarea și mutarea sunt operații pe metadate: lock-ul pe audit_logs
+    durează milisecunde, indiferent de câte rânduri are partiția.
+    """
+    if engine.dialect.name != "postgresql":
+        return None
+    current = (today or datetime.utcnow().date()).replace(day=1)
+
+    detached = []
+    with engine.begin() as conn:
+        if not _try_lock(conn):
+            return None
+        months = {add_months(current, offset) for offset in range(settings.AUDIT_PARTITIONS_AHEAD + 1)}
+        stranded = _default_partition_months(conn)
+        if stranded:
+            logger.warning(f"Audit: rânduri în {DEFAULT_PARTITION} pentru lunile {sorted(stranded)}, se mută.")
+        for month in sorted(months | stranded):
+            conn.execute(text("SELECT audit_logs_create_partition(:month)"), {"month": month})
+
+        if settings.AUDIT_RETENTION_MONTHS > 0:
+            cutoff = add_months(current, -settings.AUDIT_RETENTION_MONTHS)
+            conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+            for name, month in list_partitions(conn):
+                if month >= cutoff:
+                    break
+                conn.execute(text(f'ALTER TABLE audit_logs DETACH PARTITION "{name}"'))
+                conn.execute(text(f'ALTER TABLE "{name}" SET SCHEMA {ARCHIVE_SCHEMA}'))
+                detached.append(name)
+
+    exported = export_archived_partitions() if settings.AUDIT_ARCHIVE_DIR else []
+    if detached or exported:
+        logger.info(f"Audit: partiții detașate {detached}, exportate {exported}.")
+    return {"detached": detached, "exported": exported}
+
+
+def export_archived_partitions() -> List[str]:
+    """
+    Exportă partițiile din schema de arhivă ca CSV gzip în AUDIT_ARCHIVE_DIR și le șterge.
+    Fiecare partiție are tranzacția ei: o rulare întreruptă este reluată de la următoarea.
+    """
+    os.makedirs(settings.AUDIT_ARCHIVE_DIR, exist_ok=True)
+    with engine.connect() as conn:
+        names = conn.execute(
+            text("SELECT table_name FROM information_schema.tables WHERE table_schema = :schema"),
+            {"schema": ARCHIVE_SCHEMA}
+        ).scalars().all()
+
+    exported = []
+    for name in sorted(name for name in names if PARTITION_NAME.match(name)):
+        path = os.path.join(settings.AUDIT_ARCHIVE_DIR, f"{name}.csv.gz")
+        with engine.begin() as conn:
+            if not _try_lock(conn):
+                break
+            cursor = conn.connection.dbapi_connection.cursor()
+            try:
+                with gzip.open(path + ".tmp", "wb") as archive:
+                    cursor.copy_expert(f'COPY {ARCHIVE_SCHEMA}."{name}" TO STDOUT WITH (FORMAT csv, HEADER)', archive)
+            finally:
+                cursor.close()
+            os.replace(path + ".tmp", path)
+            conn.execute(text(f'DROP TABLE {ARCHIVE_SCHEMA}."{name}"'))
+        exported.append(path)
+    return exported
+
+
+if __name__ == "__main__":
+    # Rulare manuală: python -m backend.app.core.audit_partitions
+    logging.basicConfig(level=logging.INFO)
+    print(maintain_audit_partitions())
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import Table, insert
+from sqlalchemy.exc import DisconnectionError, InterfaceError, OperationalError
+from sqlalchemy.sql.dml import Insert
+
+from backend.app.models.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Erori de conexiune / bază indisponibilă: lotul se pune înapoi în coadă, nu se sparge pe rânduri
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, DisconnectionError)
+
+
+class BatchWriter:
+    """
+    Coadă write-behind: rândurile se adună în memorie și sunt scrise
+    printr-un singur INSERT multi-rând la fiecare `flush_interval` secunde
+    sau imediat ce se strâng `max_batch` rânduri.
+
+    Un lot eșuat nu se pierde: se reîncearcă de `retries` ori (backoff exponențial), apoi
+    la erori de conexiune se pune înapoi în coadă (în limita max_queue), iar la erori de date
+    se scrie rând cu rând, ca doar rândul invalid să fie aruncat.
+    """
+
+    def __init__(
+            self,
+            table: Table,
+            flush_interval: float = 0.02,
+            max_batch: int = 200,
+            max_queue: int = 10000,
+            after_flush: Optional[Callable] = None,
+            statement: Optional[Insert] = None,
+            retries: int = 3,
+            retry_backoff: float = 0.05
+    ):
+        self.table = table
+        # Se poate trimite un INSERT custom (ex. ON CONFLICT DO NOTHING pentru ID-uri de la client)
+        self.statement = statement if statement is not None else insert(table)
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        # Hook apelat în aceeași tranzacție cu INSERT-ul: after_flush(conn, rows, result); cu un
+        # statement ... RETURNING, `result` spune ce rânduri au fost efectiv inserate
+        self.after_flush = after_flush
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+
+        self._pending: List[dict] = []
+        # (rând, future) pentru apelanții care așteaptă scrierea (mod durabil)
+        self._waiters: List[Tuple[dict, asyncio.Future]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+
+    def start(self):
+        """Pornește task-ul de flush pe event loop-ul curent (din lifespan)."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._loop = asyncio.get_running_loop()
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Oprește task-ul și scrie tot ce a rămas în coadă (la shutdown)."""
+        if self._task is not None:
+            # Nu anulăm task-ul în mijlocul unui flush: îl lăsăm să termine runda curentă
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        self._loop = None
+        await self.flush()
+        if self._pending:
+            logger.error(f"{len(self._pending)} rânduri pentru {self.table.name} nu au putut fi scrise la oprire.")
+
+    async def put(self, row: dict, wait: bool = False):
+        """
+        Adaugă un rând în coadă. Cu wait=True revine abia după ce rândul
+        a fost scris în baza de date (mod durabil).
+        """
+        if self._task is None:
+            self.start()
+
+        # Backpressure: nu lăsăm coada să crească nelimitat dacă baza e lentă
+        if len(self._pending) >= self.max_queue:
+            await self.flush()
+
+        self._pending.append(row)
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+
+        if wait:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append((row, future))
+            await future
+
+    def submit(self, row: dict):
+        """
+        Variantă thread-safe, fără await, a lui put(): pentru endpoint-urile sincrone
+        (threadpool) și pentru hook-uri SQLAlchemy. Din alt thread așteaptă doar până
+        când rândul intră în coadă, deci coada plină încetinește apelantul (backpressure).
+        Fără task pornit (scripturi CLI) rândul se scrie direct.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            self._write([row])
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            # Pe event loop nu putem bloca: flush-ul urmează imediat ce loop-ul e liber
+            self._pending.append(row)
+            if len(self._pending) >= self.max_batch:
+                self._wakeup.set()
+            return
+        asyncio.run_coroutine_threadsafe(self.put(row), loop).result()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def flush(self):
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            rows, self._pending = self._pending, []
+            waiters, self._waiters = self._waiters, []
+
+            error = await self._write_with_retry(rows)
+            if error is None:
+                self._resolve(waiters)
+                return
+
+            if isinstance(error, TRANSIENT_ERRORS):
+                self._requeue(rows, waiters, error)
+                return
+
+            # Eroare de date: izolăm rândurile invalide, restul lotului se scrie
+            logger.warning(f"Batch write în {self.table.name} eșuat ({len(rows)} rânduri), "
+                           f"se scrie rând cu rând: {str(error)}")
+            failed = {}
+            for row in rows:
+                try:
+                    await asyncio.to_thread(self._write, [row])
+                except Exception as e:
+                    failed[id(row)] = e
+                    logger.error(f"Rând aruncat din {self.table.name}: {str(e)}")
+            self._resolve(waiters, failed)
+
+    async def _write_with_retry(self, rows: List[dict]) -> Optional[Exception]:
+        """None dacă lotul a fost scris, altfel ultima eroare (după `retries` reîncercări)."""
+        for attempt in range(self.retries + 1):
+            try:
+                await asyncio.to_thread(self._write, rows)
+                return None
+            except Exception as e:
+                error = e
+                if attempt < self.retries:
+                    await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+        return error
+
+    def _requeue(self, rows: List[dict], waiters: list, error: Exception):
+        # Cine așteaptă confirmarea o primește ca eroare acum (poate retrimite același ID),
+        # iar lotul revine în fața cozii; peste max_queue se pierd cele mai vechi rânduri
+        self._resolve(waiters, {id(row): error for row, _ in waiters})
+        self._pending = rows + self._pending
+        overflow = len(self._pending) - self.max_queue
+        if overflow > 0:
+            self._pending = self._pending[overflow:]
+            logger.error(f"Coada {self.table.name} e plină: {overflow} rânduri aruncate ({str(error)})")
+        else:
+            logger.warning(f"Batch write în {self.table.name} eșuat, {len(rows)} rânduri puse înapoi "
+                           f"în coadă: {str(error)}")
+
+    @staticmethod
+    def _resolve(waiters: list, failed: Optional[dict] = None):
+        for row, waiter in waiters:
+            if waiter.done():
+                continue
+            error = failed.get(id(row)) if failed else None
+            if error is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(error)
+
+    def _write(self, rows: List[dict]):
+        # executemany pe insert() -> SQLAlchemy îl trimite ca INSERT ... VALUES (...), (...)
+        with engine.begin() as conn:
+            result = conn.execute(self.statement, rows)
+            if self.after_flush is not None:
+                self.after_flush(conn, rows, result)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
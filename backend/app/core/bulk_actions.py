@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence
+
+from sqlalchemy import any_, cast, delete, insert, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from backend.app.core import audit
+from backend.app.core.audit import AuditActor
+from backend.app.core.config import settings
+from backend.app.models.database import ContactLead, LeadStatusEvent
+
+
+def selection_criteria(model, ids: Optional[Sequence] = None, apply_filters: Optional[Callable] = None):
+    """
+    Condiția WHERE a unui lot: listă explicită de ID-uri (id = ANY(:ids)) sau filtrele
+    listei din admin aplicate pe un SELECT. None dacă nu s-a ales nimic (nu atingem tot tabelul).
+    """
+    if ids:
+        return model.id == any_(cast(list(ids), ARRAY(UUID(as_uuid=True))))
+    if apply_filters is None:
+        return None
+    return apply_filters(select(model.id)).whereclause
+
+
+def bulk_update(db: Session, model, criteria, values: dict, columns: Sequence = ()) -> List[Row]:
+    """
+    Un singur UPDATE ... WHERE criteria RETURNING id, *columns.
+    updated_at se setează explicit: sync-ul disponibilității și rollup-ul funnel-ului
+    citesc incremental după această coloană.
+    """
+    statement = (
+        update(model)
+        .where(criteria)
+        .values(updated_at=datetime.utcnow(), **values)
+        .returning(model.id, *columns)
+        .execution_options(synchronize_session=False)
+    )
+    return list(db.execute(statement))
+
+
+def bulk_delete(db: Session, model, criteria, columns: Sequence = ()) -> List[Row]:
+    statement = (
+        delete(model)
+        .where(criteria)
+        .returning(model.id, *columns)
+        .execution_options(synchronize_session=False)
+    )
+    return list(db.execute(statement))
+
+
+def bulk_lead_status(db: Session, criteria, new_status: str, changed_by=None) -> List[Row]:
+    """
+    Schimbă statusul lead-urilor selectate într-un singur UPDATE și scrie evenimentele
+    de funnel pentru fiecare lead modificat. Statusul vechi vine din sub-select-ul
+    blocat (FOR UPDATE), pentru că RETURNING vede doar valorile noi.
+    """
+    previous = (
+        select(ContactLead.id, ContactLead.status)
+        .where(criteria)
+        .with_for_update()
+        .subquery("previous")
+    )
+    statement = (
+        update(ContactLead)
+        .where(ContactLead.id == previous.c.id, previous.c.status.is_distinct_from(new_status))
+        .values(status=new_status, updated_at=datetime.utcnow())
+        .returning(ContactLead.id, previous.c.status)
+        .execution_options(synchronize_session=False)
+    )
+    changed = list(db.execute(statement))
+    if changed:
+        db.execute(insert(LeadStatusEvent), [
+            {"lead_id": row.id, "from_status": row.status, "to_status": new_status, "changed_by": changed_by}
+            for row in changed
+        ])
+    return changed
+
+
+def record_bulk_audit(db: Session, actor: AuditActor, action: str, entity_type: str, ids: Sequence, details: dict):
+    """Un singur rând de audit pentru tot lotul; lista de ID-uri e trunchiată la BULK_AUDIT_MAX_IDS."""
+    limit = settings.BULK_AUDIT_MAX_IDS
+    audit.record(db, actor, action, entity_type, details={
+        **details,
+        "count": len(ids),
+        "ids": [str(record_id) for record_id in ids[:limit]],
+        "ids_truncated": len(ids) > limit,
+    })
@@ -0,0 +1,72 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import WebSocket
+
+# msgpack este opțional: fără el serverul oferă doar protocolul JSON clasic
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Subprotocol negociat prin Sec-WebSocket-Protocol
+MSGPACK_SUBPROTOCOL = "gse.chat.msgpack.v1"
+
+
+def negotiate_subprotocol(websocket: WebSocket) -> Optional[str]:
+    """Alege protocolul binar doar dacă clientul îl cere explicit (opt-in)."""
+    offered = websocket.scope.get("subprotocols") or []
+    if msgpack is not None and MSGPACK_SUBPROTOCOL in offered:
+        return MSGPACK_SUBPROTOCOL
+    return None
+
+
+def encode_json(frame: dict) -> str:
+    # Codăm o singură dată per broadcast, nu o dată per socket ca send_json()
+    return json.dumps(frame, separators=(",", ":"))
+
+
+def encode_msgpack(frame: dict) -> bytes:
+    return msgpack.packb(frame, use_bin_type=True)
+
+
+def compact_chat_frame(message: dict, sender_index: int, created_at: datetime) -> bytes:
+    """
+    Varianta compactă a unui mesaj de chat:
+    t=tip, i=ID (16 octeți), u=expeditor internat, x=text, a=admin, c=epoch în ms.
+    Numele și UUID-ul expeditorului se trimit o singură dată, printr-un frame "s".
+    """
+    return encode_msgpack({
+        "t": "m",
+        "i": uuid.UUID(message["id"]).bytes,
+        "u": sender_index,
+        "x": message["text"],
+        "a": message["is_admin"],
+        "c": int(created_at.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    })
+
+
+def sender_declaration_frame(sender_index: int, message: dict) -> bytes:
+    return encode_msgpack({
+        "t": "s",
+        "u": sender_index,
+        "id": uuid.UUID(message["user_id"]).bytes,
+        "n": message["name"]
+    })
+
+
+def decode_client_frame(data: bytes) -> dict:
+    """Aduce un frame binar de la client la forma folosită de protocolul JSON."""
+    frame = msgpack.unpackb(data, raw=False)
+    decoded = {}
+    if "t" in frame:
+        decoded["type"] = frame["t"]
+    if "x" in frame:
+        decoded["text"] = frame["x"]
+    if frame.get("i"):
+        decoded["id"] = str(uuid.UUID(bytes=frame["i"]))
+    if "d" in frame:
+        decoded["durable"] = frame["d"]
+    return decoded
@@ -14,9 +14,15 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    JWT_CACHE_MAXSIZE: int = 10000  # Access token-uri verificate ținute în memorie (0 = fără cache)
+    TWO_FACTOR_SETUP_CACHE_SECONDS: int = 300  # Setup 2FA reafișat fără regenerare la reîncărcarea paginii
+    MAX_SESSIONS_PER_USER: int = 10  # La depășire se închid cele mai vechi sesiuni
+    SESSION_SWEEP_BATCH: int = 5000  # Sesiuni expirate șterse per tranzacție
 
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    # Schema se aplică la deploy (python -m backend.app.models.migrations); True doar local / SQLite
+    MIGRATE_ON_STARTUP: bool = False
 
     # Email (SMTP)
     SMTP_HOST: str = os.getenv("SMTP_HOST", "smtp.gmail.com")
@@ -35,6 +41,95 @@ class Settings(BaseSettings):
     # Redis (for caching and rate limiting)
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
+    # Chat (persistare write-behind)
+    CHAT_FLUSH_INTERVAL_MS: int = 20
+    CHAT_FLUSH_MAX_BATCH: int = 200
+    CHAT_WRITE_QUEUE_MAX: int = 10000
+    CHAT_DURABLE_ACK: bool = False  # True = confirmăm mesajul doar după ce a fost scris în DB
+    CHAT_PING_INTERVAL_SECONDS: int = 25
+    CHAT_IDLE_TIMEOUT_SECONDS: int = 75  # Fără niciun frame (nici pong) în acest interval -> închidem
+    CHAT_MAX_CONNECTIONS_PER_USER: int = 5
+    CHAT_MAX_CONNECTIONS: int = 5000  # Per proces
+
+    # Calendar programări
+    CALENDAR_MAX_RANGE_DAYS: int = 366
+    CALENDAR_EVENT_DURATION_MINUTES: int = 120
+    CALENDAR_FEED_PAST_DAYS: int = 30
+    CALENDAR_FEED_FUTURE_DAYS: int = 180
+    CALENDAR_FEED_TOKEN_EXPIRE_DAYS: int = 365
+    CALENDAR_TIMEZONE: str = "Europe/Bucharest"
+
+    # Programări: capacitate echipe și sloturi (durata unei programări = CALENDAR_EVENT_DURATION_MINUTES)
+    CREW_CAPACITY: int = 2
+    SCHEDULING_SLOT_MINUTES: int = 60
+    WORK_DAY_START_HOUR: int = 8
+    WORK_DAY_END_HOUR: int = 18
+    SCHEDULING_WORK_DAYS: List[int] = [0, 1, 2, 3, 4, 5]  # Luni - Sâmbătă
+    SCHEDULING_MAX_RANGE_DAYS: int = 62
+    # Indexul de disponibilitate se reîncarcă complet periodic (ștergerile nu ating updated_at)
+    AVAILABILITY_FULL_SYNC_SECONDS: int = 300
+
+    # Evenimente live (SSE): "memory" = doar procesul curent, "redis" = fan-out între worker-e
+    EVENTS_BACKEND: str = os.getenv("EVENTS_BACKEND", "memory")
+    SSE_KEEPALIVE_SECONDS: int = 15
+    ADMIN_FEED_BUFFER_SIZE: int = 500  # Evenimente păstrate pentru reluare după Last-Event-ID
+
+    # Dashboard admin: agregatele se păstrează scurt în cache, istoricul vine din rollup-uri zilnice
+    DASHBOARD_CACHE_SECONDS: int = 30
+    DASHBOARD_MAX_DAYS: int = 366
+    ROLLUP_INTERVAL_SECONDS: int = 3600
+    ROLLUP_REFRESH_DAYS: int = 2  # Zilele recente recalculate la fiecare rulare (rânduri întârziate)
+
+    # Funnel lead-uri: ce statusuri înseamnă "contactat" / "câștigat" și intervalele histogramelor (ore)
+    LEAD_CONTACTED_STATUSES: List[str] = ["contacted", "contactat", "in_progress", "offer_sent", "oferta_trimisa"]
+    LEAD_WON_STATUSES: List[str] = ["won", "converted", "castigat", "client"]
+    FUNNEL_BUCKET_HOURS: List[float] = [1, 4, 12, 24, 48, 72, 168, 336, 720, 2160]
+    LEAD_LOST_STATUSES: List[str] = ["lost", "pierdut", "closed", "inchis", "spam"]
+    # Trimiterile repetate (același email/telefon) într-un lead deschis se comasează în acest interval
+    LEAD_MERGE_WINDOW_HOURS: int = 72
+
+    # Import lead-uri: validare și încărcare pe bucăți
+    LEAD_IMPORT_CHUNK_SIZE: int = 5000
+    LEAD_IMPORT_MAX_REPORTED_ERRORS: int = 1000
+
+    # Audit: rândurile se scriu în loturi de un task de fundal (write-behind).
+    # AUDIT_SYNC_WRITES=True le scrie în aceeași tranzacție cu modificarea (conformitate)
+    AUDIT_SYNC_WRITES: bool = False
+    AUDIT_FLUSH_INTERVAL_MS: int = 500
+    AUDIT_FLUSH_MAX_BATCH: int = 500
+    AUDIT_QUEUE_MAX: int = 10000
+    # Audit partiționat lunar: partiții create în avans, lunile mai vechi de retenție se detașează
+    AUDIT_PARTITIONS_AHEAD: int = 3
+    AUDIT_RETENTION_MONTHS: int = 24  # 0 = fără retenție
+    AUDIT_ARCHIVE_DIR: str = os.getenv("AUDIT_ARCHIVE_DIR", "")  # Gol = partițiile rămân în schema audit_archive
+    AUDIT_LOGS_MAX_PAGE: int = 500
+
+    # Acțiuni în masă din admin: o singură instrucțiune per lot, un singur rând de audit
+    BULK_ACTION_MAX_IDS: int = 10000
+    BULK_AUDIT_MAX_IDS: int = 1000  # ID-uri păstrate în detaliile auditului
+
+    # Metrici Prometheus (/metrics): scrape-ul trimite "Authorization: Bearer <token>"; gol = /metrics dezactivat (404)
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+
+    # Interogări per request: header Server-Timing + avertisment la aceeași interogare repetată (N+1).
+    # QUERY_BUDGET_STRICT=True (teste) transformă depășirea bugetului declarat într-o eroare
+    QUERY_REPEAT_WARNING: int = 20
+    QUERY_BUDGET_STRICT: bool = False
+    # Jurnalul interogărilor lente (în memorie, per proces, vizibil în /admin/slow-queries).
+    # EXPLAIN ANALYZE rerulează interogarea: eșantionul e 0 (dezactivat) implicit
+    SLOW_QUERY_THRESHOLD_MS: int = 200
+    SLOW_QUERY_LOG_SIZE: int = 200
+    SLOW_QUERY_EXPLAIN_SAMPLE: float = 0.0
+    SLOW_QUERY_EXPLAIN_TIMEOUT_MS: int = 5000
+
+    # Profilare: la cerere (header X-Profile-Token emis din admin) sau continuu, pentru un procent
+    # din request-uri (PROFILE_SAMPLE_RATE, 0 = oprit), agregat pe ultimele PROFILE_ROLLING_MINUTES
+    PROFILE_TOKEN_EXPIRE_MINUTES: int = 15
+    PROFILE_SAMPLE_INTERVAL_MS: float = 2
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_STORE_SIZE: int = 20
+    PROFILE_ROLLING_MINUTES: int = 15
+
     # File Upload
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
     UPLOAD_FOLDER: str = "uploads"
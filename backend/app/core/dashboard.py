@@ -0,0 +1,112 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import Float, String, cast, func, literal, null, select, union_all
+from sqlalchemy.orm import Session
+
+from backend.app.core.cache import TTLCache
+from backend.app.core.config import settings
+from backend.app.core.rollups import ROLLUP_SOURCES, live_counts_select
+from backend.app.models.database import ContactLead, DailyStat, Project, ServiceRequest, User
+
+dashboard_cache = TTLCache(ttl=settings.DASHBOARD_CACHE_SECONDS, maxsize=64)
+
+
+def _grouped(kind: str, model, column):
+    return (
+        select(literal(kind).label("kind"), cast(column, String).label("key"), func.count().label("n"),
+               cast(null(), Float).label("capacity_kw"), cast(null(), Float).label("investment_value"))
+        .select_from(model)
+        .group_by(column)
+    )
+
+
+def aggregates_query(today_start: datetime):
+    """
+    Toate contoarele dashboard-ului într-un singur round-trip (UNION ALL de agregate grupate),
+    inclusiv ziua curentă, care nu are încă rollup.
+    """
+    parts = [
+        _grouped("lead_status", ContactLead, ContactLead.status),
+        _grouped("lead_property_type", ContactLead, ContactLead.property_type),
+        _grouped("request_status", ServiceRequest, ServiceRequest.status),
+        _grouped("request_type", ServiceRequest, ServiceRequest.type),
+        select(literal("projects"), cast(null(), String), func.count(),
+               func.sum(Project.capacity_kw), func.sum(Project.investment_value)).select_from(Project),
+        select(literal("users"), cast(null(), String), func.count(),
+               cast(null(), Float), cast(null(), Float)).select_from(User),
+    ]
+    for metric in ROLLUP_SOURCES:
+        live = live_counts_select(metric, today_start).subquery()
+        parts.append(select(literal(f"today:{metric}"), live.c.dimension, live.c.value,
+                            cast(null(), Float), cast(null(), Float)))
+    return union_all(*parts)
+
+
+def build_dashboard(db: Session, days: int) -> dict:
+    now = datetime.utcnow()
+    today = now.date()
+    today_start = datetime.combine(today, datetime.min.time())
+    first_day = today - timedelta(days=days - 1)
+
+    counts = defaultdict(dict)
+    projects = {"count": 0, "capacity_kw": 0.0, "investment_value": 0.0}
+    total_users = 0
+    today_series = defaultdict(dict)
+    for row in db.execute(aggregates_query(today_start)):
+        kind, key, n = row[0], row[1], row[2]
+        if kind == "projects":
+            projects = {"count": n, "capacity_kw": row[3] or 0.0, "investment_value": row[4] or 0.0}
+        elif kind == "users":
+            total_users = n
+        elif kind.startswith("today:"):
+            today_series[kind[len("today:"):]][key] = n
+        else:
+            counts[kind][key or "necunoscut"] = n
+
+    # Istoricul vine din rollup-uri; ziua curentă din agregatul de mai sus
+    history = db.execute(
+        select(DailyStat.day, DailyStat.metric, DailyStat.dimension, DailyStat.value)
+        .where(DailyStat.day >= first_day, DailyStat.day < today)
+    )
+    per_day = defaultdict(lambda: defaultdict(dict))
+    for day, metric, dimension, value in history:
+        per_day[metric][day][dimension] = int(value)
+    for metric, values in today_series.items():
+        per_day[metric][today] = values
+
+    timeseries = {}
+    for metric in ROLLUP_SOURCES:
+        points = []
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            values = per_day[metric].get(day, {})
+            point = {"date": day, "count": sum(values.values())}
+            if ROLLUP_SOURCES[metric][1] is not None:
+                point["by"] = {dimension or "necunoscut": n for dimension, n in values.items()}
+            points.append(point)
+        timeseries[metric] = points
+
+    leads_by_status = counts["lead_status"]
+    requests_by_status = counts["request_status"]
+    return {
+        "generated_at": now,
+        "leads": {
+            "total": sum(leads_by_status.values()),
+            "by_status": leads_by_status,
+            "by_property_type": counts["lead_property_type"],
+        },
+        "service_requests": {
+            "total": sum(requests_by_status.values()),
+            "by_status": requests_by_status,
+            "by_type": counts["request_type"],
+        },
+        "projects": projects,
+        "users": {"total": total_users, "new_per_day": timeseries["new_users"]},
+        "timeseries": timeseries,
+    }
+
+
+def get_dashboard(db: Session, days: int) -> dict:
+    today = datetime.utcnow().date()
+    return dashboard_cache.get_or_set(("dashboard", days, today), lambda: build_dashboard(db, days))
@@ -1,9 +1,3 @@
-import aiosmtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.image import MIMEImage
-
-import resend
 from jinja2 import Template
 from pathlib import Path
 import logging
@@ -119,9 +113,6 @@ EMAIL_TEMPLATES = {
     """
 }
 
-resend.api_key = settings.SMTP_PASSWORD
-
-
 async def send_email(
         to_email: str,
         subject: str,
@@ -142,7 +133,9 @@ async def send_email(
             "html": html_content,
         }
 
-        # Trimitere e-mail
+        # Trimitere e-mail; SDK-ul Resend se încarcă la primul e-mail, nu la pornirea aplicației
+        import resend
+        resend.api_key = settings.SMTP_PASSWORD
         email_response = resend.Emails.send(params)
 
         logger.info(f"Email trimis prin Resend API către {to_email}. ID: {email_response['id']}")
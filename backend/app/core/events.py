@@ -0,0 +1,201 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from fastapi import Request
+
+from backend.app.core.config import settings
+
+# Backend-ul Redis este opțional: fără el evenimentele circulă doar în procesul curent
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+REDIS_CHANNEL_PREFIX = "gse:events:"
+
+
+def format_sse(data: dict, event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    """Un mesaj Server-Sent Events (text/event-stream)."""
+    message = ""
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    if event is not None:
+        message += f"event: {event}\n"
+    message += f"data: {json.dumps(data, default=str, separators=(',', ':'))}\n\n"
+    return message
+
+
+class EventBroker:
+    """
+    Fan-out in-process: fiecare abonat SSE primește o coadă proprie pe canalul lui.
+    Cu EVENTS_BACKEND="redis", publicarea trece prin Redis pub/sub ca să ajungă
+    și la abonații conectați la alte procese/worker-e.
+
+    Canalele cu replay păstrează ultimele N evenimente într-un ring buffer, ca un
+    client reconectat să primească tot ce a pierdut după Last-Event-ID.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._history: Dict[str, Deque[Tuple[int, dict]]] = {}
+        self._listeners: Dict[str, List[Callable[[dict], None]]] = {}
+        self._last_id = 0
+        self._id_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        if settings.EVENTS_BACKEND != "redis":
+            return
+        if aioredis is None:
+            logger.warning("EVENTS_BACKEND=redis, dar pachetul redis nu este instalat. Folosim broker-ul local.")
+            return
+        self._redis = aioredis.from_url(settings.REDIS_URL)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    def enable_replay(self, channel: str, size: int):
+        self._history[channel] = deque(maxlen=size)
+
+    def add_listener(self, channel: str, callback: Callable[[dict], None]):
+        """Callback apelat pe event loop pentru fiecare eveniment livrat pe canal (ex. contoare)."""
+        self._listeners.setdefault(channel, []).append(callback)
+
+    def _next_id(self) -> int:
+        # ID-uri crescătoare bazate pe timp (µs): comparabile și între worker-e, pentru Last-Event-ID
+        with self._id_lock:
+            self._last_id = max(self._last_id + 1, time.time_ns() // 1000)
+            return self._last_id
+
+    def publish(self, channel: str, event: dict):
+        """
+        Thread-safe: poate fi apelat și din endpoint-urile sincrone (threadpool).
+        Dacă broker-ul nu a pornit (ex. scripturi CLI), evenimentul este ignorat.
+        """
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._dispatch, channel, self._next_id(), event)
+
+    def _dispatch(self, channel: str, event_id: int, event: dict):
+        if self._redis is not None:
+            payload = json.dumps({"id": event_id, "event": event}, default=str)
+            asyncio.ensure_future(self._redis.publish(REDIS_CHANNEL_PREFIX + channel, payload))
+        else:
+            self._deliver(channel, event_id, event)
+
+    def _deliver(self, channel: str, event_id: int, event: dict):
+        history = self._history.get(channel)
+        if history is not None:
+            history.append((event_id, event))
+        for callback in self._listeners.get(channel, ()):
+            callback(event)
+        for queue in self._subscribers.get(channel, ()):
+            if queue.full():
+                # Abonat lent: renunțăm la cel mai vechi eveniment, nu blocăm publicarea
+                queue.get_nowait()
+            queue.put_nowait((event_id, event))
+
+    def replay(self, channel: str, last_event_id: int) -> Optional[List[Tuple[int, dict]]]:
+        """
+        Evenimentele de după last_event_id. None dacă buffer-ul nu mai conține punctul
+        de reluare (clientul trebuie să reîncarce lista completă).
+
+        Reluarea e sigură doar dacă last_event_id e chiar un eveniment din buffer: altfel e
+        mai vechi decât buffer-ul (evacuat, sau emis înainte de pornirea procesului) ori vine
+        din secvența altui worker (broker local), și nu putem ști ce s-a pierdut între timp.
+        """
+        buffer = self._history.get(channel)
+        if buffer is None:
+            return []
+        history = list(buffer)
+        for index, (event_id, _) in enumerate(history):
+            if event_id == last_event_id:
+                return history[index + 1:]
+        return None
+
+    async def _listen(self):
+        pubsub = self._redis.pubsub()
+        await pubsub.psubscribe(REDIS_CHANNEL_PREFIX + "*")
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "pmessage":
+                    continue
+                channel = message["channel"]
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                payload = json.loads(message["data"])
+                self._deliver(channel[len(REDIS_CHANNEL_PREFIX):], payload["id"], payload["event"])
+        finally:
+            await pubsub.close()
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    async def stream(self, request: Request, channel: str, event_name: str, last_event_id: Optional[int] = None):
+        """Generator SSE pentru un canal, cu keep-alive ca proxy-urile să nu închidă conexiunea."""
+        # Ne abonăm înainte de replay, ca să nu pierdem evenimente între cele două
+        async with self.subscribe(channel) as queue:
+            yield "retry: 5000\n\n"
+            sent_id = 0
+            if last_event_id is not None and channel in self._history:
+                missed = self.replay(channel, last_event_id)
+                if missed is None:
+                    yield format_sse({"reason": "replay_unavailable"}, event="reset")
+                else:
+                    for event_id, event in missed:
+                        yield format_sse(event, event=event_name, event_id=str(event_id))
+                        sent_id = event_id
+
+            while True:
+                try:
+                    event_id, event = await asyncio.wait_for(queue.get(), timeout=settings.SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if event_id <= sent_id:
+                    continue  # Deja trimis din replay
+                yield format_sse(event, event=event_name, event_id=str(event_id))
+
+
+broker = EventBroker()
+
+# Headere necesare ca răspunsul să nu fie bufferizat de proxy (nginx, Railway)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def user_channel(user_id) -> str:
+    return f"user:{user_id}"
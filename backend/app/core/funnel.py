@@ -0,0 +1,258 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Iterable, List, Optional
+
+from sqlalchemy import delete, func, or_, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import settings
+from backend.app.models.database import ContactLead, LeadFunnelDirtyWeek, LeadFunnelWeekly, LeadStatusEvent, \
+    engine
+
+# numpy (~70 ms la import) se încarcă doar în funcțiile care calculează: modulul e importat de
+# admin.py pentru record_status_change / week_start, deci altfel l-ar plăti fiecare pornire
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Tranzacțiile comise cu întârziere pot avea timestamp-uri puțin mai vechi decât watermark-ul
+FUNNEL_SYNC_OVERLAP = timedelta(minutes=5)
+FUNNEL_LOCK_KEY = 350036
+
+PERCENTILES = (0.5, 0.75, 0.9)
+HISTOGRAM_COLUMNS = ("hours_to_contacted", "hours_contacted_to_won", "hours_to_won")
+GROUP_COLUMNS = ("week", "source", "interest")
+
+
+def record_status_change(db: Session, lead: ContactLead, new_status: str, changed_by=None) -> bool:
+    """Schimbă statusul și adaugă evenimentul în aceeași tranzacție; apelantul face commit."""
+    if new_status == lead.status:
+        return False
+    db.add(LeadStatusEvent(lead_id=lead.id, from_status=lead.status, to_status=new_status, changed_by=changed_by))
+    lead.status = new_status
+    return True
+
+
+def week_start(value) -> date:
+    day = value.date() if isinstance(value, datetime) else value
+    return day - timedelta(days=day.weekday())
+
+
+def mark_weeks_dirty(db: Session, created_ats: Iterable[datetime]):
+    """Marchează cohortele lead-urilor șterse (în tranzacția ștergerii); apelantul face commit."""
+    weeks = {week_start(created_at) for created_at in created_ats if created_at}
+    if weeks:
+        db.execute(pg_insert(LeadFunnelDirtyWeek).values([{"week": week} for week in weeks]).on_conflict_do_nothing())
+
+
+# --- Rollup săptămânal ---
+
+def _bucket_edges() -> "np.ndarray":
+    import numpy as np
+    return np.asarray(settings.FUNNEL_BUCKET_HOURS, dtype=float)
+
+
+def _histograms(groups: "np.ndarray", hours: "np.ndarray", n_groups: int) -> "np.ndarray":
+    """Matrice (grupuri x intervale): bucket i acoperă [edges[i-1], edges[i]), ultimul e deschis."""
+    import numpy as np
+    edges = _bucket_edges()
+    hist = np.zeros((n_groups, len(edges) + 1), dtype=np.int64)
+    known = ~np.isnan(hours)
+    np.add.at(hist, (groups[known], np.searchsorted(edges, hours[known], side="right")), 1)
+    return hist
+
+
+def _hours_between(start: "np.ndarray", end: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+    # NaT (etapă neatinsă) devine NaN
+    return (end - start) / np.timedelta64(1, "h")
+
+
+def _week_rows(conn, week: date) -> List[dict]:
+    import numpy as np
+
+    contacted_statuses = settings.LEAD_CONTACTED_STATUSES + settings.LEAD_WON_STATUSES
+    start = datetime.combine(week, datetime.min.time())
+    query = (
+        select(
+            ContactLead.created_at,
+            func.coalesce(ContactLead.source, ""),
+            func.coalesce(ContactLead.interest, ""),
+            func.min(LeadStatusEvent.created_at).filter(LeadStatusEvent.to_status.in_(contacted_statuses)),
+            func.min(LeadStatusEvent.created_at).filter(LeadStatusEvent.to_status.in_(settings.LEAD_WON_STATUSES)),
+        )
+        .select_from(ContactLead)
+        .outerjoin(LeadStatusEvent, LeadStatusEvent.lead_id == ContactLead.id)
+        .where(ContactLead.created_at >= start, ContactLead.created_at < start + timedelta(days=7))
+        .group_by(ContactLead.id)
+    )
+    leads = conn.execute(query).all()
+    if not leads:
+        return []
+
+    created, sources, interests, contacted_at, won_at = zip(*leads)
+    created = np.array(created, dtype="datetime64[us]")
+    contacted_at = np.array([value or np.datetime64("NaT") for value in contacted_at], dtype="datetime64[us]")
+    won_at = np.array([value or np.datetime64("NaT") for value in won_at], dtype="datetime64[us]")
+
+    # Separator \x1f, nu \x00: șirurile numpy pierd caracterele nule de la final
+    keys = np.array([f"{source}\x1f{interest}" for source, interest in zip(sources, interests)])
+    group_keys, groups = np.unique(keys, return_inverse=True)
+    n_groups = len(group_keys)
+
+    to_contacted = _hours_between(created, contacted_at)
+    to_won = _hours_between(created, won_at)
+    durations = {
+        "hours_to_contacted": to_contacted,
+        "hours_contacted_to_won": _hours_between(contacted_at, won_at),
+        "hours_to_won": to_won,
+    }
+    counts = {
+        "leads": np.bincount(groups, minlength=n_groups),
+        "contacted": np.bincount(groups, weights=~np.isnan(to_contacted), minlength=n_groups).astype(int),
+        "won": np.bincount(groups, weights=~np.isnan(to_won), minlength=n_groups).astype(int),
+    }
+    histograms = {column: _histograms(groups, durations[column], n_groups) for column in HISTOGRAM_COLUMNS}
+
+    computed_at = datetime.utcnow()
+    rows = []
+    for index, key in enumerate(group_keys):
+        source, interest = key.split("\x1f", 1)
+        row = {"week": week, "source": source, "interest": interest, "computed_at": computed_at}
+        row.update({name: int(values[index]) for name, values in counts.items()})
+        row.update({column: histograms[column][index].tolist() for column in HISTOGRAM_COLUMNS})
+        rows.append(row)
+    return rows
+
+
+def refresh_funnel() -> Optional[int]:
+    """
+    Recalculează doar cohortele săptămânale atinse de la ultima rulare: lead-uri noi sau
+    modificate (sursă, interes), lead-uri cu evenimente noi de status și săptămânile
+    marcate de ștergeri (mark_weeks_dirty).
+    """
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            locked = conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": FUNNEL_LOCK_KEY}).scalar()
+            if not locked:
+                return None
+
+        watermark = conn.execute(select(func.max(LeadFunnelWeekly.computed_at))).scalar()
+        changed = select(ContactLead.created_at)
+        if watermark is not None:
+            since = watermark - FUNNEL_SYNC_OVERLAP
+            recent_events = select(LeadStatusEvent.lead_id).where(LeadStatusEvent.created_at > since)
+            changed = changed.where(or_(
+                ContactLead.updated_at > since,
+                ContactLead.created_at > since,
+                ContactLead.id.in_(recent_events)
+            ))
+        weeks = {week_start(created_at) for (created_at,) in conn.execute(changed) if created_at}
+        # DELETE ... RETURNING la început: o ștergere comisă după acest punct își lasă marcajul
+        # pentru rularea următoare, în loc să-l piardă
+        weeks.update(conn.execute(delete(LeadFunnelDirtyWeek).returning(LeadFunnelDirtyWeek.week)).scalars())
+        weeks = sorted(weeks)
+
+        for week in weeks:
+            conn.execute(delete(LeadFunnelWeekly).where(LeadFunnelWeekly.week == week))
+            rows = _week_rows(conn, week)
+            if rows:
+                conn.execute(LeadFunnelWeekly.__table__.insert(), rows)
+
+    if weeks:
+        logger.info(f"Funnel lead-uri: {len(weeks)} săptămâni recalculate.")
+    return len(weeks)
+
+
+# --- Raport ---
+
+def histogram_percentiles(hist: "np.ndarray", q: float) -> "np.ndarray":
+    """Percentila q pentru fiecare rând al matricei de histograme, prin interpolare liniară în bucket."""
+    import numpy as np
+    edges = _bucket_edges()
+    lower = np.concatenate(([0.0], edges))
+    # Ultimul bucket nu are limită superioară: raportăm limita lui inferioară
+    upper = np.concatenate((edges, [edges[-1]]))
+
+    totals = hist.sum(axis=1)
+    cumulative = hist.cumsum(axis=1)
+    target = q * totals
+    bucket = np.minimum((cumulative < target[:, None]).sum(axis=1), hist.shape[1] - 1)
+    rows = np.arange(hist.shape[0])
+    in_bucket = hist[rows, bucket]
+    before = cumulative[rows, bucket] - in_bucket
+    fraction = np.divide(target - before, in_bucket, out=np.zeros(len(rows)), where=in_bucket > 0)
+    values = lower[bucket] + fraction * (upper[bucket] - lower[bucket])
+    return np.where(totals > 0, values, np.nan)
+
+
+def _rate(numerator: "np.ndarray", denominator: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+
+def _rounded(value: float) -> Optional[float]:
+    import numpy as np
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+def funnel_report(db: Session, from_week: date, to_week: date, group_by: str,
+                  sources: Optional[Iterable[str]] = None) -> dict:
+    import numpy as np
+
+    query = db.query(LeadFunnelWeekly).filter(LeadFunnelWeekly.week >= from_week, LeadFunnelWeekly.week <= to_week)
+    if sources:
+        query = query.filter(LeadFunnelWeekly.source.in_(list(sources)))
+    rollups = query.all()
+
+    n_buckets = len(settings.FUNNEL_BUCKET_HOURS) + 1
+    if rollups:
+        keys = np.array([str(getattr(row, group_by)) for row in rollups])
+        group_keys, groups = np.unique(keys, return_inverse=True)
+    else:
+        group_keys, groups = np.array([], dtype=str), np.array([], dtype=int)
+    # Rândul suplimentar (ultimul) este totalul pe tot intervalul
+    n_groups = len(group_keys) + 1
+    targets = np.concatenate((groups, np.full(len(groups), n_groups - 1)))
+
+    def totals(column: str) -> "np.ndarray":
+        values = np.array([getattr(row, column) for row in rollups], dtype=np.int64)
+        return np.bincount(targets, weights=np.concatenate((values, values)), minlength=n_groups)
+
+    leads, contacted, won = totals("leads"), totals("contacted"), totals("won")
+    histograms = {}
+    for column in HISTOGRAM_COLUMNS:
+        matrix = np.array([getattr(row, column) or [0] * n_buckets for row in rollups], dtype=np.int64)
+        merged = np.zeros((n_groups, n_buckets), dtype=np.int64)
+        if len(rollups):
+            np.add.at(merged, targets, np.concatenate((matrix, matrix)))
+        histograms[column] = {q: histogram_percentiles(merged, q) for q in PERCENTILES}
+
+    rates = {
+        "contact_rate": _rate(contacted, leads),
+        "win_rate": _rate(won, leads),
+        "contacted_win_rate": _rate(won, contacted),
+    }
+
+    def group(index: int, key: Optional[str]) -> dict:
+        item = {
+            "key": key,
+            "leads": int(leads[index]),
+            "contacted": int(contacted[index]),
+            "won": int(won[index]),
+        }
+        item.update({name: round(float(values[index]), 4) for name, values in rates.items()})
+        for column in HISTOGRAM_COLUMNS:
+            item[column] = {f"p{int(q * 100)}": _rounded(values[index]) for q, values in histograms[column].items()}
+        return item
+
+    return {
+        "from": from_week,
+        "to": to_week,
+        "group_by": group_by,
+        "groups": [group(index, str(key)) for index, key in enumerate(group_keys)],
+        "total": group(n_groups - 1, None),
+        "computed_at": max((row.computed_at for row in rollups), default=None),
+    }
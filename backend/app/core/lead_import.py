@@ -0,0 +1,228 @@
+import csv
+import io
+import logging
+import uuid
+from datetime import datetime
+from typing import IO, Dict, Iterator, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import String, bindparam, func, select, union_all
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from backend.app.core.config import settings
+from backend.app.models.database import ContactLead, engine
+from backend.app.schemas import ContactLeadCreate
+from backend.app.utils.contacts import email_key, phone_key
+
+logger = logging.getLogger(__name__)
+
+# Antetele acceptate: numele câmpurilor și coloanele din exportul CSV (round-trip)
+HEADER_ALIASES = {
+    "full_name": "full_name", "nume": "full_name", "name": "full_name",
+    "email": "email",
+    "phone": "phone", "telefon": "phone",
+    "property_type": "property_type", "tip proprietate": "property_type",
+    "interest": "interest", "interes": "interest",
+    "message": "message", "mesaj": "message",
+    "status": "status",
+    "source": "source", "sursă": "source", "sursa": "source",
+    "created_at": "created_at", "creat la": "created_at",
+}
+
+COPY_COLUMNS = ("id", "full_name", "email", "phone", "property_type", "interest", "message",
+                "source", "status", "email_key", "phone_key", "submissions", "created_at", "updated_at")
+
+
+def read_csv(file: IO[bytes]) -> Iterator[Tuple[int, dict]]:
+    """(număr linie, rând) din CSV; separatorul (, ; tab) se detectează din primele linii."""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    sample = text.read(8192)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(text, dialect)
+    header = next(reader, None)
+    if header is None:
+        return
+    fields = [HEADER_ALIASES.get(column.strip().lower()) for column in header]
+    for line, values in enumerate(reader, start=2):
+        if not any(value.strip() for value in values):
+            continue
+        yield line, {field: value.strip() for field, value in zip(fields, values) if field and value.strip()}
+
+
+def chunked(rows: Iterator, size: int) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class LeadImport:
+    """
+    Import în masă: validare cu ContactLeadCreate pe bucăți, deduplicare (în fișier și față de
+    baza de date, după email și telefon) și încărcare cu COPY pe Postgres sau INSERT multi-rând
+    în rest. Totul într-o singură tranzacție: fie intră toate rândurile valide, fie niciunul.
+    """
+
+    def __init__(self, source: str = "import", dry_run: bool = False):
+        self.source = source
+        self.dry_run = dry_run
+        self.total = self.imported = self.duplicates = self.invalid = 0
+        self.errors: List[dict] = []
+        self.errors_truncated = False
+        self.method = "copy" if engine.dialect.name == "postgresql" else "insert"
+        self._seen_emails: Set[str] = set()
+        self._seen_phones: Set[str] = set()
+
+    def _error(self, line: int, field: Optional[str], message: str):
+        if len(self.errors) < settings.LEAD_IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"row": line, "field": field, "message": message})
+        else:
+            self.errors_truncated = True
+
+    def _validate(self, chunk: List[Tuple[int, dict]]) -> List[Tuple[int, dict]]:
+        valid = []
+        now = datetime.utcnow()
+        for line, raw in chunk:
+            try:
+                lead = ContactLeadCreate.model_validate(raw)
+                created_at = datetime.fromisoformat(raw["created_at"]) if raw.get("created_at") else now
+            except ValidationError as e:
+                self.invalid += 1
+                for error in e.errors():
+                    self._error(line, ".".join(str(part) for part in error["loc"]) or None, error["msg"])
+                continue
+            except ValueError:
+                self.invalid += 1
+                self._error(line, "created_at", "Dată invalidă (format ISO 8601 așteptat).")
+                continue
+
+            row = lead.model_dump()
+            row.update({
+                "id": uuid.uuid4(),
+                "source": raw.get("source") or self.source,
+                "status": raw.get("status") or "new",
+                # COPY ocolește @validates din model: cheile le calculăm aici
+                "email_key": email_key(lead.email),
+                "phone_key": phone_key(lead.phone),
+                "submissions": 1,
+                "created_at": created_at.replace(tzinfo=None),
+                "updated_at": now,
+            })
+            valid.append((line, row))
+        return valid
+
+    def _deduplicate(self, conn, rows: List[Tuple[int, dict]]) -> List[dict]:
+        # Duplicatele din același fișier: primul rând câștigă
+        fresh = []
+        for line, row in rows:
+            email, phone = row["email_key"], row["phone_key"]
+            if email in self._seen_emails or phone in self._seen_phones:
+                self.duplicates += 1
+                self._error(line, None, "Duplicat în fișier (email sau telefon).")
+                continue
+            self._seen_emails.add(email)
+            self._seen_phones.add(phone)
+            fresh.append((line, row, email, phone))
+        if not fresh:
+            return []
+
+        # Duplicatele din baza de date: o interogare pe bucată, pe indecșii email_key și phone_key
+        emails = [email for _, _, email, _ in fresh]
+        phones = [phone for _, _, _, phone in fresh]
+        # Două căutări separate (nu OR), ca fiecare să poată folosi indexul ei
+        existing_row = select(ContactLead.email_key, ContactLead.phone_key)
+        existing = conn.execute(union_all(
+            existing_row.where(self._matches(ContactLead.email_key, emails)),
+            existing_row.where(self._matches(ContactLead.phone_key, phones))
+        )).all()
+        existing_emails = {email for email, _ in existing}
+        existing_phones = {phone for _, phone in existing if phone}
+
+        rows_to_load = []
+        for line, row, email, phone in fresh:
+            if email in existing_emails or phone in existing_phones:
+                self.duplicates += 1
+                self._error(line, None, "Lead existent cu același email sau telefon.")
+                continue
+            rows_to_load.append(row)
+        return rows_to_load
+
+    def _matches(self, column, values: List[str]):
+        if self.method == "copy":
+            # IN (SELECT unnest(array)): semi-join (index sau hash), nu o listă IN de mii de valori
+            return column.in_(select(func.unnest(bindparam(None, values, type_=ARRAY(String)))))
+        return column.in_(values)
+
+    def _copy(self, conn, rows: List[dict]):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(["" if row[column] is None else row[column] for column in COPY_COLUMNS])
+        buffer.seek(0)
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            # Câmpul gol necitat devine NULL (mesaj opțional)
+            cursor.copy_expert(
+                f"COPY contact_leads ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+
+    def _load(self, conn, rows: List[dict]):
+        if self.method == "copy":
+            self._copy(conn, rows)
+        else:
+            conn.execute(ContactLead.__table__.insert(), rows)
+
+    def run(self, rows: Iterator[Tuple[int, dict]]) -> dict:
+        with engine.begin() as conn:
+            for chunk in chunked(rows, settings.LEAD_IMPORT_CHUNK_SIZE):
+                self.total += len(chunk)
+                to_load = self._deduplicate(conn, self._validate(chunk))
+                if to_load and not self.dry_run:
+                    self._load(conn, to_load)
+                self.imported += len(to_load)
+        logger.info(f"Import lead-uri: {self.imported}/{self.total} importate, "
+                    f"{self.duplicates} duplicate, {self.invalid} invalide ({self.method}).")
+        return self.summary()
+
+    def summary(self) -> Dict:
+        return {
+            "total": self.total,
+            "imported": self.imported,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "dry_run": self.dry_run,
+            "method": self.method,
+            "errors": self.errors,
+            "errors_truncated": self.errors_truncated,
+        }
+
+
+def import_leads_csv(file: IO[bytes], source: str = "import", dry_run: bool = False) -> dict:
+    return LeadImport(source=source, dry_run=dry_run).run(read_csv(file))
+
+
+if __name__ == "__main__":
+    # python -m backend.app.core.lead_import leaduri.csv [--source crm-vechi] [--dry-run]
+    import argparse
+    import json
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Import în masă de lead-uri din CSV")
+    parser.add_argument("path")
+    parser.add_argument("--source", default="import")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.path, "rb") as csv_file:
+        result = import_leads_csv(csv_file, source=args.source, dry_run=args.dry_run)
+    print(json.dumps(result, ensure_ascii=False, indent=2, default=str))
@@ -0,0 +1,199 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy.pool import QueuePool
+
+# Limitele implicite ale histogramelor Prometheus (secunde)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Shards(threading.local):
+    """
+    O valoare per thread (event loop-ul + thread-urile din threadpool). Fiecare thread scrie doar
+    în dicționarul lui, deci înregistrarea nu ia niciun lock; scrape-ul adună toate shard-urile.
+    """
+
+    def __init__(self, registry: list, lock: threading.Lock):
+        self.values: dict = {}
+        # Rulează o singură dată per thread, la primul acces
+        with lock:
+            registry.append(self.values)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._all_shards: List[dict] = []
+        self._shards = _Shards(self._all_shards, threading.Lock())
+        REGISTRY.append(self)
+
+    def _label_text(self, labels: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _snapshot(self) -> List[Tuple[tuple, object]]:
+        # list(dict.items()) se copiază în C, fără a ceda GIL-ul: sigur față de thread-ul care scrie
+        return [item for shard in list(self._all_shards) for item in list(shard.items())]
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        values = self._shards.values
+        values[labels] = values.get(labels, 0) + amount
+
+    def totals(self) -> Dict[tuple, float]:
+        totals: Dict[tuple, float] = {}
+        for labels, value in self._snapshot():
+            totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def collect(self) -> Iterable[str]:
+        yield from super().collect()
+        for labels, value in sorted(self.totals().items()):
+            yield f"{self.name}{self._label_text(labels)} {value}"
+
+
+class Gauge(Counter):
+    """Gauge cu inc/dec (ex. request-uri în curs): shard-urile se adună la fel ca la Counter."""
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class CallbackGauge(_Metric):
+    """Valoare citită abia la scrape (statistici pool, socket-uri deschise): zero cost pe request."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], Dict[tuple, float]],
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def collect(self) -> Iterable[str]:
+        yield from super().collect()
+        for labels, value in sorted(self.callback().items()):
+            yield f"{self.name}{self._label_text(labels)} {value}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: tuple = ()):
+        values = self._shards.values
+        series = values.get(labels)
+        if series is None:
+            # [contor per bucket..., +Inf, sumă]
+            series = values[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self) -> Iterable[str]:
+        yield from super().collect()
+        merged: Dict[tuple, list] = {}
+        for labels, series in self._snapshot():
+            total = merged.setdefault(labels, [0] * len(series))
+            for index, value in enumerate(list(series)):
+                total[index] += value
+        for labels, series in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                yield f"{self.name}_bucket{self._label_text(labels, le)} {cumulative}"
+            yield f"{self.name}_sum{self._label_text(labels)} {series[-1]}"
+            yield f"{self.name}_count{self._label_text(labels)} {cumulative}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render() -> str:
+    """Formatul text Prometheus (valori per proces: fiecare worker se scrape-uiește separat)."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+# --- HTTP ---
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Request-uri HTTP terminate, pe rută (șablon), metodă și status.",
+    ("method", "route", "status")
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Durata request-urilor HTTP până la headerele răspunsului.",
+    ("method", "route")
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Request-uri HTTP în curs.", ("method",))
+HTTP_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Instrucțiuni SQL executate per request.", ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+)
+HTTP_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Timpul petrecut în baza de date per request.", ("method", "route")
+)
+
+
+def route_template(scope: dict) -> str:
+    """Calea rutei potrivite ("/api/v1/admin/leads/{lead_id}"), nu URL-ul concret: cardinalitate mică."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return "unmatched"
+    return scope.get("root_path", "") + path
+
+
+# --- Pool-ul de conexiuni SQLAlchemy ---
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Conexiuni luate din pool.")
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Timpul de așteptare pentru o conexiune din pool.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool care măsoară cât așteaptă fiecare checkout (pool plin = latență ascunsă în request)."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
+            DB_POOL_CHECKOUTS.inc()
+
+
+def register_pool(pool) -> None:
+    """Expune starea curentă a pool-ului (citită la scrape)."""
+    CallbackGauge("db_pool_size", "Conexiuni permanente configurate.", lambda: {(): pool.size()})
+    CallbackGauge("db_pool_checked_out", "Conexiuni folosite acum.", lambda: {(): pool.checkedout()})
+    CallbackGauge("db_pool_checked_in", "Conexiuni libere în pool.", lambda: {(): pool.checkedin()})
+    CallbackGauge("db_pool_overflow", "Conexiuni peste pool_size (negativ = încă nedeschise).",
+                  lambda: {(): pool.overflow()})
+
@@ -0,0 +1,254 @@
+import asyncio
+import functools
+import inspect
+import itertools
+import random
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from fastapi import Request
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+from backend.app.core.config import settings
+from backend.app.core.security import token_revoked, verify_token
+from backend.app.models.database import SessionLocal, User
+
+PROFILE_HEADER = "x-profile-token"
+
+# Cadrele în care un thread doar așteaptă (event loop-ul în select, thread-urile libere din threadpool)
+IDLE_FRAMES = {
+    ("selectors", "select"), ("threading", "wait"), ("threading", "_wait_for_tstate_lock"), ("queue", "get"),
+}
+
+_ids = itertools.count(1)
+_frame_names: Dict[object, str] = {}
+
+
+class ProfileSession:
+    """
+    Eșantioanele unui request profilat: stive "modul:funcție;...;modul:funcție" -> număr.
+    Se eșantionează doar ce lucrează pentru request: event loop-ul cât rulează unul din task-urile
+    lui și thread-ul din threadpool cât rulează endpoint-ul sincron (vezi ProfiledRoute).
+    """
+
+    __slots__ = ("id", "on_demand", "stacks", "samples", "started", "method", "route", "duration_ms", "at",
+                 "loop", "loop_thread", "tasks", "threads")
+
+    def __init__(self, on_demand: bool):
+        self.id = next(_ids)
+        self.on_demand = on_demand
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started = time.perf_counter()
+        self.at = datetime.utcnow()
+        self.method = None
+        self.route = None
+        self.duration_ms = None
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.tasks: Set[asyncio.Task] = {asyncio.current_task()}
+        self.threads: Set[int] = set()
+
+
+# Sesiunea request-ului curent; ajunge (copiată) și în task-ul aplicației și în threadpool
+current_session: ContextVar[Optional[ProfileSession]] = ContextVar("profile_session", default=None)
+
+
+def _frame_name(code, module: str) -> str:
+    name = _frame_names.get(code)
+    if name is None:
+        name = _frame_names[code] = f"{module}:{code.co_qualname}"
+    return name
+
+
+def collapse(frame) -> Optional[str]:
+    """Stiva unui thread, de la rădăcină spre vârf; None dacă thread-ul e inactiv."""
+    top = frame
+    if (top.f_globals.get("__name__"), top.f_code.co_name) in IDLE_FRAMES:
+        return None
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code, frame.f_globals.get("__name__", "?")))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Sampler:
+    """
+    Un singur thread de eșantionare, activ doar cât există sesiuni deschise. La fiecare
+    PROFILE_SAMPLE_INTERVAL_MS citește stivele tuturor thread-urilor (event loop + threadpool):
+    cProfile ar vedea doar thread-ul curent, nu și endpoint-urile sincrone din threadpool.
+    Eșantionarea e la nivel de proces: request-urile concurente apar și ele în profil.
+    """
+
+    def __init__(self):
+        self._sessions: List[ProfileSession] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, session: ProfileSession):
+        with self._lock:
+            self._sessions.append(session)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def stop(self, session: ProfileSession):
+        # După stop() sesiunea nu mai primește eșantioane (adăugarea se face sub același lock)
+        with self._lock:
+            self._sessions.remove(session)
+
+    def _run(self):
+        while True:
+            if not self._sessions:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            frames = sys._current_frames()
+            with self._lock:
+                for session in self._sessions:
+                    session.samples += 1
+                    session.stacks.update(_session_stacks(session, frames))
+            time.sleep(settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+
+
+def _session_stacks(session: ProfileSession, frames: dict) -> List[str]:
+    """
+    Stivele thread-urilor care lucrează acum pentru sesiune. Un task și un thread din threadpool
+    aparțin unui singur request, deci request-urile concurente nu se amestecă în profil.
+    """
+    stacks = []
+    loop_frame = frames.get(session.loop_thread)
+    if loop_frame is not None and asyncio.current_task(session.loop) in session.tasks:
+        stacks.append(collapse(loop_frame))
+    for ident in list(session.threads):
+        frame = frames.get(ident)
+        if frame is not None:
+            stacks.append(collapse(frame))
+    return [stack for stack in stacks if stack is not None]
+
+
+def _profiled_sync(endpoint):
+    """Endpoint sincron: thread-ul din threadpool se eșantionează cât rulează pentru sesiune."""
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        session = current_session.get()
+        if session is None:
+            return endpoint(*args, **kwargs)
+        ident = threading.get_ident()
+        session.threads.add(ident)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            session.threads.discard(ident)
+    wrapper.profiled = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    route_class pentru routere: leagă task-ul care rulează dependențele/endpoint-ul și thread-ul
+    endpoint-urilor sincrone de sesiunea de profilare. Fără sesiune costul e un ContextVar.get().
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        # include_router() recreează rutele cu aceeași clasă: endpoint-ul se învelește o singură dată
+        if not inspect.iscoroutinefunction(endpoint) and not getattr(endpoint, "profiled", False):
+            endpoint = _profiled_sync(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request):
+            session = current_session.get()
+            if session is not None:
+                session.tasks.add(asyncio.current_task())
+            return await handler(request)
+
+        return profiled_handler
+
+
+sampler = Sampler()
+
+# Profilurile cerute explicit (ultimele PROFILE_STORE_SIZE) și agregatul continuu pe minute.
+# Se modifică doar din middleware (event loop), deci nu au nevoie de lock
+profiles: "OrderedDict[int, ProfileSession]" = OrderedDict()
+rolling: deque = deque()  # (minut, Counter)
+
+
+def load_profile_owner(user_id: str):
+    with SessionLocal() as db:
+        return db.query(User.role, User.is_active, User.tokens_valid_after).filter(User.id == user_id).first()
+
+
+async def session_for(request: Request) -> Optional[ProfileSession]:
+    """Sesiune la cerere (header semnat de un admin) sau eșantion pentru agregatul continuu."""
+    token = request.headers.get(PROFILE_HEADER)
+    if token:
+        payload = verify_token(token, "profile")
+        # Ca orice token: emitentul trebuie să fie încă admin activ, iar token-ul nerevocat
+        owner = await run_in_threadpool(load_profile_owner, payload["sub"]) if payload else None
+        if (owner is not None and owner.role == "admin" and owner.is_active
+                and not token_revoked(payload, owner.tokens_valid_after)):
+            return ProfileSession(on_demand=True)
+    if settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE:
+        return ProfileSession(on_demand=False)
+    return None
+
+
+def finish(session: ProfileSession, method: str, route: str):
+    session.tasks.clear()
+    session.method = method
+    session.route = route
+    session.duration_ms = round((time.perf_counter() - session.started) * 1000, 1)
+    if session.on_demand:
+        profiles[session.id] = session
+        while len(profiles) > settings.PROFILE_STORE_SIZE:
+            profiles.popitem(last=False)
+        return
+
+    minute = int(time.time() // 60)
+    if not rolling or rolling[-1][0] != minute:
+        rolling.append((minute, Counter()))
+    while rolling and rolling[0][0] <= minute - settings.PROFILE_ROLLING_MINUTES:
+        rolling.popleft()
+    # Rădăcina stivei e ruta: flamegraph-ul se poate filtra pe endpoint
+    rolling[-1][1].update({f"{method} {route};{stack}": count for stack, count in session.stacks.items()})
+
+
+def rolling_stacks() -> Counter:
+    minute = int(time.time() // 60)
+    merged: Counter = Counter()
+    for bucket_minute, stacks in rolling:
+        if bucket_minute > minute - settings.PROFILE_ROLLING_MINUTES:
+            merged.update(stacks)
+    return merged
+
+
+def collapsed_text(stacks: Counter) -> str:
+    """Formatul "stivă număr" pe linie: flamegraph.pl, speedscope, inferno."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def summary(session: ProfileSession) -> dict:
+    return {
+        "id": session.id,
+        "at": session.at,
+        "method": session.method,
+        "route": session.route,
+        "duration_ms": session.duration_ms,
+        "samples": session.samples,
+    }
+
+
+def recent_profiles() -> Iterable[dict]:
+    return [summary(session) for session in reversed(profiles.values())]
@@ -0,0 +1,118 @@
+import inspect
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """Instrucțiunile SQL ale unui request: număr, timp total și de câte ori s-a repetat fiecare formă."""
+
+    __slots__ = ("count", "duration", "shapes", "scope")
+
+    def __init__(self, scope: Optional[dict] = None):
+        # Scope-ul ASGI al request-ului: ruta potrivită (pentru jurnalul interogărilor lente)
+        self.scope = scope
+        self.count = 0
+        self.duration = 0.0
+        # SQL-ul cu parametri legați e chiar "forma" instrucțiunii: același text = aceeași interogare
+        self.shapes: Dict[str, int] = {}
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement] = self.shapes.get(statement, 0) + 1
+
+    def most_repeated(self) -> tuple:
+        """(instrucțiune, repetări) pentru forma cea mai frecventă; ("", 0) fără interogări."""
+        if not self.shapes:
+            return "", 0
+        statement = max(self.shapes, key=self.shapes.get)
+        return statement, self.shapes[statement]
+
+    def violations(self, max_queries: Optional[int] = None, max_repeats: Optional[int] = None) -> List[str]:
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(f"{self.count} interogări (buget {max_queries})")
+        statement, repeats = self.most_repeated()
+        if max_repeats is not None and repeats > max_repeats:
+            problems.append(f"aceeași interogare de {repeats} ori (maxim {max_repeats}), posibil N+1: "
+                            f"{' '.join(statement.split())[:300]}")
+        return problems
+
+
+# Statisticile request-ului curent. Obiectul e mutabil: thread-urile din threadpool primesc o copie
+# a contextului, dar aceeași instanță, deci interogările endpoint-urilor sincrone se numără și ele.
+current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track(scope: Optional[dict] = None) -> Iterator[QueryStats]:
+    """Numără interogările din blocul curent (middleware-ul HTTP; direct în teste sau scripturi)."""
+    stats = QueryStats(scope)
+    token = current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Pornim cronometrul pentru orice instrucțiune: îl citește și jurnalul de interogări lente
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.record(statement, query_duration(context))
+
+
+def query_duration(context) -> float:
+    """Secundele scurse de la before_cursor_execute (0 dacă instrucțiunea n-a trecut prin engine)."""
+    started = getattr(context, "_query_started", None)
+    return time.perf_counter() - started if started is not None else 0.0
+
+
+def install(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def query_budget(max_queries: Optional[int] = None, max_repeats: Optional[int] = None):
+    """
+    Declară bugetul de interogări al unui endpoint (decorator pus sub @router.get/...).
+    Middleware-ul verifică bugetul după fiecare request: depășirea se loghează, iar cu
+    QUERY_BUDGET_STRICT (teste) request-ul eșuează cu AssertionError.
+    """
+    def decorator(endpoint):
+        endpoint.query_budget = (max_queries, max_repeats)
+        return endpoint
+    return decorator
+
+
+def check_budget(stats: QueryStats, endpoint, route: str):
+    """Bugetul declarat al endpoint-ului, altfel doar detecția generală de N+1 (QUERY_REPEAT_WARNING)."""
+    # Bugetul stă pe funcția originală, nu pe învelișul pus de ProfiledRoute
+    endpoint = inspect.unwrap(endpoint) if endpoint is not None else None
+    max_queries, max_repeats = getattr(endpoint, "query_budget", (None, settings.QUERY_REPEAT_WARNING))
+    problems = stats.violations(max_queries, max_repeats)
+    if not problems:
+        return
+    message = f"Buget de interogări depășit pe {route}: " + "; ".join(problems)
+    if settings.QUERY_BUDGET_STRICT:
+        raise AssertionError(message)
+    logger.warning(message)
+
+
+def assert_query_budget(stats: QueryStats, max_queries: Optional[int] = None, max_repeats: Optional[int] = None):
+    """Pentru teste: `with track() as stats: ...` apoi assert_query_budget(stats, 3, max_repeats=1)."""
+    problems = stats.violations(max_queries, max_repeats)
+    assert not problems, "; ".join(problems)
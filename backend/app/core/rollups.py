@@ -0,0 +1,129 @@
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import Date, cast, delete, func, insert, literal, select, text
+
+from backend.app.core.audit_partitions import maintain_audit_partitions
+from backend.app.core.config import settings
+from backend.app.core.funnel import refresh_funnel
+from backend.app.core.sessions import sweep_expired_sessions
+from backend.app.models.database import ContactLead, DailyStat, ServiceRequest, User, engine
+
+logger = logging.getLogger(__name__)
+
+# metrică -> (tabelă, dimensiune); numărăm rândurile create în fiecare zi
+ROLLUP_SOURCES = {
+    "new_users": (User, None),
+    "new_leads": (ContactLead, ContactLead.property_type),
+    "new_service_requests": (ServiceRequest, ServiceRequest.type),
+}
+
+# Cheie pentru pg_advisory_xact_lock: un singur worker recalculează la un moment dat
+ROLLUP_LOCK_KEY = 350035
+
+
+def _dimension(dimension):
+    """(expresie selectată, coloane de grupare); metricile fără dimensiune folosesc ""."""
+    if dimension is None:
+        return literal(""), []
+    return func.coalesce(dimension, ""), [dimension]
+
+
+def live_counts_select(metric: str, since: datetime):
+    """Aceeași agregare ca rollup-ul, pentru ziua curentă (încă neînchisă)."""
+    model, dimension = ROLLUP_SOURCES[metric]
+    dimension_col, group_by = _dimension(dimension)
+    return (
+        select(dimension_col.label("dimension"), func.count().label("value"))
+        .select_from(model)
+        .where(model.created_at >= since)
+        .group_by(*group_by)
+    )
+
+
+def rollup_days(conn, start: date, end: date):
+    """Recalculează zilele [start, end): ștergere + INSERT ... SELECT grupat, în tranzacția apelantului."""
+    conn.execute(delete(DailyStat).where(DailyStat.day >= start, DailyStat.day < end))
+    start_at = datetime.combine(start, datetime.min.time())
+    end_at = datetime.combine(end, datetime.min.time())
+    for metric, (model, dimension) in ROLLUP_SOURCES.items():
+        day_col = cast(model.created_at, Date)
+        dimension_col, group_by = _dimension(dimension)
+        rows = (
+            select(day_col, literal(metric), dimension_col, func.count())
+            .where(model.created_at >= start_at, model.created_at < end_at)
+            .group_by(day_col, *group_by)
+        )
+        conn.execute(insert(DailyStat).from_select(["day", "metric", "dimension", "value"], rows))
+
+
+def refresh_rollups(today: Optional[date] = None) -> Optional[tuple]:
+    """
+    Aduce rollup-urile la zi până ieri inclusiv. Prima rulare face backfill de la cel mai
+    vechi rând; apoi recalculăm doar zilele noi plus ultimele ROLLUP_REFRESH_DAYS.
+    """
+    today = today or datetime.utcnow().date()
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            locked = conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ROLLUP_LOCK_KEY}).scalar()
+            if not locked:
+                return None
+
+        last_day = conn.execute(select(func.max(DailyStat.day))).scalar()
+        if last_day is None:
+            first_seen = [
+                conn.execute(select(func.min(model.created_at))).scalar()
+                for model, _ in ROLLUP_SOURCES.values()
+            ]
+            first_seen = [value for value in first_seen if value is not None]
+            start = min(first_seen).date() if first_seen else today
+        else:
+            start = min(last_day + timedelta(days=1), today - timedelta(days=settings.ROLLUP_REFRESH_DAYS))
+
+        if start >= today:
+            return None
+        rollup_days(conn, start, today)
+    logger.info(f"Rollup-uri zilnice recalculate: {start} - {today - timedelta(days=1)}")
+    return start, today
+
+
+class RollupScheduler:
+    """Task de fundal care rulează job-urile de rollup la pornire și apoi periodic."""
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            for job in self.jobs:
+                try:
+                    await asyncio.to_thread(job)
+                except Exception as e:
+                    logger.error(f"Eroare la calculul rollup-urilor ({job.__name__}): {str(e)}")
+            await asyncio.sleep(settings.ROLLUP_INTERVAL_SECONDS)
+
+
+scheduler = RollupScheduler([refresh_rollups, refresh_funnel, maintain_audit_partitions, sweep_expired_sessions])
+
+
+if __name__ == "__main__":
+    # Backfill manual: python -m backend.app.core.rollups
+    logging.basicConfig(level=logging.INFO)
+    refresh_rollups()
+    refresh_funnel()
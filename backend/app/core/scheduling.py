@@ -0,0 +1,204 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import settings
+from backend.app.models.database import ServiceRequest
+from backend.app.utils.calendar import combine_date_time
+
+# Doar programările acceptate ocupă o echipă
+BOOKED_STATUSES = ("accepted",)
+
+# Re-citim o mică fereastră înapoi ca să prindem tranzacții comise cu întârziere
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class AvailabilityIndex:
+    """
+    Index în memorie al programărilor acceptate, sortat după ora de început.
+    Toate programările au aceeași durată D, deci cele care se suprapun cu [start, end)
+    sunt exact cele cu început în (start - D, end): două căutări binare, O(log n).
+    """
+
+    def __init__(self):
+        self._starts: List[Tuple[datetime, str]] = []
+        self._bookings: Dict[str, datetime] = {}
+        self._watermark: Optional[datetime] = None
+        self._last_full_sync: Optional[float] = None  # time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self) -> timedelta:
+        return timedelta(minutes=settings.CALENDAR_EVENT_DURATION_MINUTES)
+
+    # --- Întreținere incrementală ---
+
+    def apply(self, request_id, preferred_date, preferred_time, status):
+        """Aplică starea curentă a unei cereri (după commit)."""
+        key = str(request_id)
+        with self._lock:
+            self._remove(key)
+            if status in BOOKED_STATUSES and preferred_date is not None:
+                start = combine_date_time(preferred_date, preferred_time)
+                self._bookings[key] = start
+                insort(self._starts, (start, key))
+
+    def apply_request(self, req: ServiceRequest):
+        self.apply(req.id, req.preferred_date, req.preferred_time, req.status)
+
+    def _remove(self, key: str):
+        start = self._bookings.pop(key, None)
+        if start is not None:
+            position = bisect_left(self._starts, (start, key))
+            if position < len(self._starts) and self._starts[position] == (start, key):
+                del self._starts[position]
+
+    def sync(self, db: Session):
+        """
+        Prima apelare (și apoi o dată la AVAILABILITY_FULL_SYNC_SECONDS) reîncarcă toate
+        programările viitoare; între reîncărcări citim doar rândurile modificate de la
+        ultimul watermark (index pe updated_at), ca să vedem și schimbările altor procese.
+        Ștergerile făcute de alte procese (inclusiv cascada de la ștergerea unui utilizator)
+        și UPDATE-urile care nu ating updated_at nu apar în citirea incrementală: le prinde
+        reîncărcarea completă, iar conflictele sunt oricum reverificate în DB (conflicts_for).
+        """
+        query = db.query(
+            ServiceRequest.id,
+            ServiceRequest.preferred_date,
+            ServiceRequest.preferred_time,
+            ServiceRequest.status,
+            ServiceRequest.updated_at
+        )
+        with self._lock:
+            watermark = self._watermark
+            full = watermark is None or (
+                time.monotonic() - self._last_full_sync >= settings.AVAILABILITY_FULL_SYNC_SECONDS
+            )
+
+        if full:
+            loaded_at = datetime.utcnow()
+            rows = query.filter(
+                ServiceRequest.status.in_(BOOKED_STATUSES),
+                ServiceRequest.preferred_date >= loaded_at - timedelta(days=1)
+            ).all()
+            starts = sorted((combine_date_time(row.preferred_date, row.preferred_time), str(row.id)) for row in rows)
+            with self._lock:
+                self._starts = starts
+                self._bookings = {key: start for start, key in starts}
+                # Watermark-ul coboară la momentul instantaneului: ce s-a aplicat între timp
+                # peste vechiul index e recitit la următorul sync incremental
+                self._watermark = loaded_at
+                self._last_full_sync = time.monotonic()
+            return
+
+        rows = query.filter(ServiceRequest.updated_at > watermark - SYNC_OVERLAP).all()
+        for row in rows:
+            self.apply(row.id, row.preferred_date, row.preferred_time, row.status)
+        newest = max((row.updated_at for row in rows if row.updated_at), default=None)
+        if newest is not None:
+            with self._lock:
+                if self._watermark is None or newest > self._watermark:
+                    self._watermark = newest
+
+    def confirm(self, db: Session, request_ids: List[str]):
+        """Recitește din DB câteva programări din index (șterse sau mutate între timp => scoase)."""
+        rows = db.query(
+            ServiceRequest.id,
+            ServiceRequest.preferred_date,
+            ServiceRequest.preferred_time,
+            ServiceRequest.status
+        ).filter(ServiceRequest.id.in_(request_ids)).all()
+        found = set()
+        for row in rows:
+            self.apply(row.id, row.preferred_date, row.preferred_time, row.status)
+            found.add(str(row.id))
+        for key in set(request_ids) - found:
+            self.apply(key, None, None, None)
+
+    # --- Interogări ---
+
+    def overlapping(self, start: datetime, end: datetime, exclude_id=None) -> List[Tuple[datetime, str]]:
+        exclude = str(exclude_id) if exclude_id is not None else None
+        with self._lock:
+            low = bisect_right(self._starts, (start - self.duration, "\uffff"))
+            high = bisect_left(self._starts, (end, ""))
+            return [item for item in self._starts[low:high] if item[1] != exclude]
+
+    def max_concurrency(self, start: datetime, end: datetime, exclude_id=None) -> int:
+        """Numărul maxim de echipe ocupate simultan în intervalul [start, end)."""
+        events = []
+        for booking_start, _ in self.overlapping(start, end, exclude_id):
+            events.append((max(booking_start, start), 1))
+            events.append((min(booking_start + self.duration, end), -1))
+        # La egalitate, terminarea (-1) vine înaintea începutului (+1)
+        events.sort()
+        busy = peak = 0
+        for _, delta in events:
+            busy += delta
+            peak = max(peak, busy)
+        return peak
+
+    def conflicts_for(self, preferred_date: datetime, preferred_time: Optional[str], exclude_id=None,
+                      db: Optional[Session] = None) -> List[str]:
+        """
+        ID-urile programărilor acceptate care ar intra în conflict, sau [] dacă mai e o echipă liberă.
+        Cu `db`, un conflict găsit în index e reverificat în baza de date înainte de a fi raportat,
+        ca o programare ștearsă de alt proces să nu mai blocheze slotul.
+        """
+        start = combine_date_time(preferred_date, preferred_time)
+        end = start + self.duration
+        if self.max_concurrency(start, end, exclude_id) < settings.CREW_CAPACITY:
+            return []
+        conflicts = [key for _, key in self.overlapping(start, end, exclude_id)]
+        if db is None:
+            return conflicts
+
+        self.confirm(db, conflicts)
+        if self.max_concurrency(start, end, exclude_id) < settings.CREW_CAPACITY:
+            return []
+        return [key for _, key in self.overlapping(start, end, exclude_id)]
+
+    def free_slots(self, from_date: datetime, to_date: datetime) -> List[dict]:
+        """Sloturile din programul de lucru în care mai există cel puțin o echipă liberă."""
+        step = timedelta(minutes=settings.SCHEDULING_SLOT_MINUTES)
+        days = []
+        day = from_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < to_date:
+            if day.weekday() in settings.SCHEDULING_WORK_DAYS:
+                slots = []
+                slot = day.replace(hour=settings.WORK_DAY_START_HOUR)
+                day_end = day.replace(hour=settings.WORK_DAY_END_HOUR)
+                while slot + self.duration <= day_end:
+                    if from_date <= slot < to_date:
+                        free = settings.CREW_CAPACITY - self.max_concurrency(slot, slot + self.duration)
+                        if free > 0:
+                            slots.append({"start": slot, "free_crews": free})
+                    slot += step
+                days.append({"date": day.date(), "slots": slots})
+            day += timedelta(days=1)
+        return days
+
+    def overbooked(self, from_date: datetime, to_date: datetime) -> List[dict]:
+        """Grupuri de programări acceptate care depășesc capacitatea echipelor."""
+        groups = []
+        seen = set()
+        with self._lock:
+            low = bisect_left(self._starts, (from_date, ""))
+            high = bisect_left(self._starts, (to_date, ""))
+            candidates = self._starts[low:high]
+        for start, key in candidates:
+            end = start + self.duration
+            if self.max_concurrency(start, end) > settings.CREW_CAPACITY:
+                request_ids = [other for _, other in self.overlapping(start, end)]
+                if frozenset(request_ids) in seen:
+                    continue
+                seen.add(frozenset(request_ids))
+                groups.append({"start": start, "request_ids": request_ids})
+        return groups
+
+
+availability = AvailabilityIndex()
@@ -1,24 +1,33 @@
+import hashlib
+import time
+from calendar import timegm
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, status, Query, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 import pyotp
-import qrcode
-import io
 import base64
+import struct
+import uuid
+import zlib
 
 import random
 import string
 
+from backend.app.core.cache import TTLCache
 from backend.app.core.config import settings
-from backend.app.models.database import get_db, User
+from backend.app.models.database import get_db, User, SessionLocal
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_PREFIX}/auth/login")
 
+# Payload-urile access token-urilor deja verificate, cheie = SHA-256 al token-ului.
+# Fiecare intrare expiră odată cu token-ul (exp); revocarea se verifică separat, pe rândul utilizatorului
+verified_tokens = TTLCache(ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60, maxsize=settings.JWT_CACHE_MAXSIZE)
+
 
 def hash_password(password: str) -> str:
 
@@ -37,7 +46,8 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    to_encode.update({"exp": expire, "type": "access"})
+    # iat: token-urile emise înainte de User.tokens_valid_after sunt revocate
+    to_encode.update({"exp": expire, "iat": datetime.utcnow(), "type": "access"})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -45,7 +55,8 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
 def create_refresh_token(data: Dict[str, Any]) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    # jti unic: două sesiuni deschise în aceeași secundă nu primesc același token (hash-ul e unic)
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -56,7 +67,15 @@ def create_email_token(email: str, token_type: str = "verify") -> str:
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
-def verify_token(token: str, expected_type: str = "access") -> Optional[Dict[str, Any]]:
+def create_feed_token(user_id: str) -> str:
+    """Token de lungă durată pentru feed-ul iCal (aplicațiile de calendar nu trimit headere)."""
+    expire = datetime.utcnow() + timedelta(days=settings.CALENDAR_FEED_TOKEN_EXPIRE_DAYS)
+    # iat: linkul se invalidează la logout de pe toate dispozitivele / resetarea parolei
+    to_encode = {"sub": user_id, "type": "calendar_feed", "exp": expire, "iat": datetime.utcnow()}
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def _decode_token(token: str, expected_type: str) -> Optional[Dict[str, Any]]:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         if payload.get("type") != expected_type:
@@ -66,6 +85,49 @@ def verify_token(token: str, expected_type: str = "access") -> Optional[Dict[str
         return None
 
 
+def create_profile_token(user_id: str) -> str:
+    """Token scurt emis de un admin: request-urile cu header-ul X-Profile-Token sunt profilate."""
+    expire = datetime.utcnow() + timedelta(minutes=settings.PROFILE_TOKEN_EXPIRE_MINUTES)
+    to_encode = {"sub": user_id, "type": "profile", "exp": expire, "iat": datetime.utcnow()}
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def verify_token(token: str, expected_type: str = "access") -> Optional[Dict[str, Any]]:
+    """
+    Access token-urile (folosite la fiecare request și la handshake-ul websocket) trec prin cache:
+    semnătura HMAC și claim-urile se verifică o singură dată per token. Doar token-urile valide
+    intră în cache; celelalte tipuri (refresh, reset, feed) se decodează de fiecare dată.
+    """
+    if expected_type != "access" or settings.JWT_CACHE_MAXSIZE <= 0:
+        return _decode_token(token, expected_type)
+
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = verified_tokens.get(digest)
+    if payload is None:
+        payload = _decode_token(token, expected_type)
+        if payload is None:
+            return None
+        remaining = payload.get("exp", 0) - time.time()
+        if remaining > 0:
+            verified_tokens.set(digest, payload, ttl=remaining)
+    return payload
+
+
+def token_revoked(payload: Dict[str, Any], tokens_valid_after: Optional[datetime]) -> bool:
+    """Token emis înainte de ultima revocare (logout de pe toate dispozitivele, resetare parolă)."""
+    if tokens_valid_after is None:
+        return False
+    return payload.get("iat", 0) < timegm(tokens_valid_after.utctimetuple())
+
+
+def revoke_user_tokens(user: User):
+    """
+    Invalidează toate access token-urile emise până acum pentru utilizator; apelantul face commit.
+    Marcajul stă în baza de date (nu în cache-ul procesului), deci e respectat de toate worker-ele.
+    """
+    user.tokens_valid_after = datetime.utcnow().replace(microsecond=0)
+
+
 async def get_current_user(
         token: str = Depends(oauth2_scheme),
         db: Session = Depends(get_db)
@@ -85,7 +147,7 @@ async def get_current_user(
         raise credentials_exception
 
     user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+    if user is None or token_revoked(payload, user.tokens_valid_after):
         raise credentials_exception
 
     if not user.is_active:
@@ -94,6 +156,36 @@ async def get_current_user(
     return user
 
 
+def get_stream_user(request: Request, token: Optional[str] = Query(None)) -> Dict[str, Any]:
+    """
+    Autentificare pentru stream-uri (SSE): EventSource nu poate trimite headere,
+    deci acceptăm token-ul și ca query param. Folosim o sesiune scurtă, nu get_db,
+    ca stream-ul deschis să nu țină o conexiune din pool.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    if token is None:
+        authorization = request.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            token = authorization[7:]
+    payload = verify_token(token, "access") if token else None
+    if payload is None or payload.get("sub") is None:
+        raise credentials_exception
+
+    with SessionLocal() as db:
+        user = db.query(User.id, User.role, User.is_active, User.tokens_valid_after).filter(
+            User.id == payload["sub"]
+        ).first()
+    if user is None or not user.is_active or token_revoked(payload, user.tokens_valid_after):
+        raise credentials_exception
+
+    return {"id": user.id, "role": user.role}
+
+
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     if not current_user.is_verified:
         raise HTTPException(status_code=400, detail="Email not verified")
@@ -116,24 +208,48 @@ def generate_2fa_secret() -> str:
     return pyotp.random_base32()
 
 
+def qr_matrix(data: str, border: int = 5) -> list:
+    """Modulele QR-ului (True = negru), cu marginea inclusă. Alegerea măștii domină timpul de generare."""
+    import qrcode  # Doar pentru setup-ul 2FA: nu îl încărcăm la pornire
+
+    qr = qrcode.QRCode(border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def encode_qr_png(matrix: list, scale: int = 10) -> bytes:
+    """
+    PNG alb-negru pe 1 bit, scris direct cu zlib, fără Pillow (aceiași pixeli ca
+    qrcode.make_image). Rândurile de pixeli se repetă de `scale` ori, deci se comprimă aproape complet.
+    """
+    width = len(matrix) * scale
+    raw = bytearray()
+    for row in matrix:
+        # Gri pe 1 bit: 0 = negru, 1 = alb; fiecare linie începe cu filtrul PNG 0 (None)
+        bits = "".join(("0" if dark else "1") * scale for dark in row)
+        bits += "1" * (-len(bits) % 8)
+        raw += (b"\x00" + int(bits, 2).to_bytes(len(bits) // 8, "big")) * scale
+
+    def chunk(tag: bytes, body: bytes) -> bytes:
+        return struct.pack(">I", len(body)) + tag + body + struct.pack(">I", zlib.crc32(tag + body))
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, width, 1, 0, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(bytes(raw)))
+        + chunk(b"IEND", b"")
+    )
+
+
 def generate_2fa_qr(email: str, secret: str) -> str:
-    """Generate QR code as base64 string"""
+    """QR-ul pentru Google Authenticator, ca data URI PNG. CPU pur: se apelează din threadpool."""
     totp_uri = pyotp.totp.TOTP(secret).provisioning_uri(
         name=email,
         issuer_name="Gabriel Solar Energy"
     )
-
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(totp_uri)
-    qr.make(fit=True)
-
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffer = io.BytesIO()
-    img.save(buffer, format="PNG")
-    buffer.seek(0)
-
-    img_base64 = base64.b64encode(buffer.getvalue()).decode()
-    return f"data:image/png;base64,{img_base64}"
+    png = encode_qr_png(qr_matrix(totp_uri))
+    return f"data:image/png;base64,{base64.b64encode(png).decode()}"
 
 
 def verify_2fa_code(secret: str, code: str) -> bool:
@@ -0,0 +1,109 @@
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import settings
+from backend.app.models.database import User, UserSession, engine
+
+logger = logging.getLogger(__name__)
+
+
+def hash_refresh_token(token: str) -> str:
+    """
+    SHA-256 hex (64 caractere) al refresh token-ului: în baza de date nu ajunge token-ul brut.
+    Token-ul e un JWT semnat, cu entropie mare, deci un hash rapid e suficient (nu bcrypt).
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def session_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
+
+def create_session(db: Session, user_id, refresh_token: str, ip_address: Optional[str] = None,
+                   device_info: Optional[str] = None) -> UserSession:
+    """
+    Adaugă sesiunea nouă și evacuează cele mai vechi sesiuni peste MAX_SESSIONS_PER_USER,
+    în tranzacția apelantului (apelantul face commit).
+    """
+    overflow = (
+        select(UserSession.id)
+        .where(UserSession.user_id == user_id)
+        .order_by(UserSession.created_at.desc(), UserSession.id.desc())
+        .offset(max(settings.MAX_SESSIONS_PER_USER - 1, 0))
+    )
+    db.execute(
+        delete(UserSession).where(UserSession.id.in_(overflow)).execution_options(synchronize_session=False)
+    )
+    session = UserSession(
+        user_id=user_id,
+        token_hash=hash_refresh_token(refresh_token),
+        ip_address=ip_address,
+        device_info=(device_info or "Unknown")[:255],
+        expires_at=session_expiry()
+    )
+    db.add(session)
+    return session
+
+
+def rotate_session(db: Session, old_token: str, new_token: str, user_id) -> Optional[User]:
+    """
+    Rotația refresh token-ului într-un singur drum la baza de date: UPDATE pe hash-ul vechi
+    (doar dacă sesiunea nu a expirat și utilizatorul e activ) care întoarce direct utilizatorul.
+    None dacă token-ul vechi nu mai e valid sau a fost deja rotit de o cerere concurentă.
+    """
+    now = datetime.utcnow()
+    statement = (
+        update(UserSession)
+        .where(
+            UserSession.token_hash == hash_refresh_token(old_token),
+            UserSession.user_id == user_id,
+            UserSession.expires_at > now,
+            User.id == UserSession.user_id,
+            User.is_active.is_(True)
+        )
+        .values(token_hash=hash_refresh_token(new_token), expires_at=session_expiry())
+        .returning(User)
+    )
+    return db.scalars(select(User).from_statement(statement)).first()
+
+
+def revoke_session(db: Session, refresh_token: str) -> int:
+    return db.execute(
+        delete(UserSession).where(UserSession.token_hash == hash_refresh_token(refresh_token))
+    ).rowcount
+
+
+def revoke_user_sessions(db: Session, user_id) -> int:
+    return db.execute(delete(UserSession).where(UserSession.user_id == user_id)).rowcount
+
+
+def sweep_expired_sessions(now: Optional[datetime] = None) -> int:
+    """
+    Șterge sesiunile expirate în loturi de SESSION_SWEEP_BATCH, fiecare lot în tranzacția lui
+    (lock-uri scurte, fără o tranzacție lungă pe toată tabela). Lotul se alege pe indexul
+    expires_at; SKIP LOCKED lasă în pace rândurile ocupate de un refresh/logout în curs.
+    """
+    now = now or datetime.utcnow()
+    expired = (
+        select(UserSession.id)
+        .where(UserSession.expires_at < now)
+        .limit(settings.SESSION_SWEEP_BATCH)
+    )
+    if engine.dialect.name == "postgresql":
+        expired = expired.with_for_update(skip_locked=True)
+
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            deleted = conn.execute(delete(UserSession).where(UserSession.id.in_(expired))).rowcount
+        total += deleted
+        if deleted < settings.SESSION_SWEEP_BATCH:
+            break
+    if total:
+        logger.info(f"Sesiuni expirate șterse: {total}")
+    return total
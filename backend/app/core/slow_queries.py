@@ -0,0 +1,114 @@
+import itertools
+import logging
+import random
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import event
+
+from backend.app.core import metrics
+from backend.app.core.config import settings
+from backend.app.core.query_stats import current_stats, query_duration
+
+logger = logging.getLogger(__name__)
+
+# Ultimele SLOW_QUERY_LOG_SIZE interogări lente ale procesului; deque.append e atomic, fără lock
+slow_queries: deque = deque(maxlen=settings.SLOW_QUERY_LOG_SIZE)
+_ids = itertools.count(1)
+
+SLOW_QUERIES = metrics.Counter("db_slow_queries_total", "Interogări peste SLOW_QUERY_THRESHOLD_MS.", ("route",))
+
+# EXPLAIN ANALYZE rulează interogarea din nou: un singur thread, pe o conexiune separată, în afara
+# request-ului; cât timp un plan e în lucru, celelalte eșantioane se sar (nu se pun la coadă)
+_explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+_explain_slot = threading.Semaphore(1)
+
+PLACEHOLDER_LIST = re.compile(r"\(\s*%\(\w+\)s(?:\s*,\s*%\(\w+\)s)+\s*\)")
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+READ_ONLY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+DATA_CHANGE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b|\bFOR\s+(UPDATE|SHARE)\b", re.IGNORECASE)
+
+
+def normalize_sql(statement: str) -> str:
+    """Aceeași formă pentru aceeași interogare: liste IN expandate, literali și spațiile comprimate."""
+    statement = PLACEHOLDER_LIST.sub("(...)", statement)
+    statement = STRING_LITERAL.sub("?", statement)
+    statement = NUMBER_LITERAL.sub("?", statement)
+    return " ".join(statement.split())
+
+
+def parameter_shape(parameters, executemany: bool):
+    """Tipurile parametrilor, fără valori (pot conține date personale)."""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "row": parameter_shape(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in list(parameters.items())[:30]}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters[:30]]
+    return None
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = query_duration(context)
+    if duration * 1000 < settings.SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    stats = current_stats.get()
+    scope = stats.scope if stats is not None else None
+    route = metrics.route_template(scope) if scope is not None else "background"
+    entry = {
+        "id": next(_ids),
+        "at": datetime.utcnow(),
+        "duration_ms": round(duration * 1000, 1),
+        "statement": normalize_sql(statement),
+        "parameters": parameter_shape(parameters, executemany),
+        "method": scope.get("method") if scope is not None else None,
+        "route": route,
+        "plan": None,
+    }
+    slow_queries.append(entry)
+    SLOW_QUERIES.inc((route,))
+    logger.warning(f"Interogare lentă ({entry['duration_ms']} ms) pe {route}: {entry['statement'][:300]}")
+
+    if (not executemany and settings.SLOW_QUERY_EXPLAIN_SAMPLE > 0 and conn.dialect.name == "postgresql"
+            and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE
+            and READ_ONLY.match(statement) and not DATA_CHANGE.search(statement)
+            and _explain_slot.acquire(blocking=False)):
+        _explain_executor.submit(_explain, conn.engine, entry, statement, parameters)
+
+
+def _explain(engine, entry: dict, statement: str, parameters):
+    """EXPLAIN (ANALYZE, BUFFERS) într-o tranzacție read-only, cu statement_timeout, apoi rollback."""
+    try:
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SET TRANSACTION READ ONLY")
+            cursor.execute(f"SET LOCAL statement_timeout = {int(settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS)}")
+            # Cursorul DBAPI nu trece prin evenimentele engine-ului: planul nu ajunge în jurnal
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+            entry["plan"] = "\n".join(row[0] for row in cursor.fetchall())
+        finally:
+            connection.rollback()
+            connection.close()
+    except Exception as e:
+        entry["plan"] = f"EXPLAIN eșuat: {str(e).strip()}"
+    finally:
+        _explain_slot.release()
+
+
+def install(engine):
+    # Înregistrat după query_stats.install: cronometrul pornit în before_cursor_execute e comun
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def recent(limit: int = 50, route: Optional[str] = None) -> List[dict]:
+    """Cele mai noi intrări primele, opțional doar pentru o rută."""
+    entries = [entry for entry in reversed(list(slow_queries)) if route is None or entry["route"] == route]
+    return entries[:limit]
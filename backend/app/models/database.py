@@ -1,20 +1,29 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import create_engine, Column, String, DateTime, Boolean, Text, Integer, ForeignKey, JSON, Float
+from sqlalchemy import create_engine, Column, String, DateTime, Date, Boolean, Text, Integer, ForeignKey, JSON, Float, \
+    Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, validates
 from sqlalchemy.sql import func
 
 from backend.app.core.config import settings
+from backend.app.core import query_stats, slow_queries
+from backend.app.core.metrics import InstrumentedQueuePool
+from backend.app.utils.contacts import email_key, phone_key
 
 engine = create_engine(
     settings.DATABASE_URL,
     pool_size=20,
     max_overflow=0,
-    pool_pre_ping=True
+    pool_pre_ping=True,
+    poolclass=InstrumentedQueuePool  # Măsoară așteptarea la checkout (/metrics)
 )
 
+# Numărarea interogărilor per request (Server-Timing, N+1) și jurnalul interogărilor lente
+query_stats.install(engine)
+slow_queries.install(engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -46,9 +55,10 @@ class User(Base):
     two_factor_secret = Column(String, nullable=True)
 
     last_login = Column(DateTime, default=datetime.utcnow)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # Rollup-uri zilnice
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     verification_code_hash = Column(String, nullable=True)
+    tokens_valid_after = Column(DateTime, nullable=True)  # Access token-urile emise înainte sunt revocate
     # RELATIONSHIPS - CORECTATE
     sessions = relationship("UserSession", back_populates="user", cascade="all, delete-orphan")
 
@@ -62,16 +72,25 @@ class User(Base):
 
     blog_posts = relationship("BlogPost", back_populates="author")
     chat_messages = relationship("ChatMessage", back_populates="user")
-    service_requests = relationship("ServiceRequest", back_populates="user", cascade="all, delete-orphan")
+    service_requests = relationship(
+        "ServiceRequest",
+        back_populates="user",
+        foreign_keys="ServiceRequest.user_id",
+        cascade="all, delete-orphan"
+    )
 class UserSession(Base):
     __tablename__ = "user_sessions"
+    __table_args__ = (
+        # Evacuarea celor mai vechi sesiuni peste MAX_SESSIONS_PER_USER
+        Index("ix_user_sessions_user_created", "user_id", "created_at"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
-    refresh_token = Column(String, unique=True, index=True)
+    token_hash = Column(String(64), unique=True, index=True)  # SHA-256 al refresh token-ului, vezi core/sessions.py
     device_info = Column(String(255))
     ip_address = Column(String(45))
-    expires_at = Column(DateTime)
+    expires_at = Column(DateTime, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="sessions")
@@ -90,11 +109,18 @@ class ContactLead(Base):
     property_type = Column(String(50))
     interest = Column(String(100))
     message = Column(Text)
+    source = Column(String(50), default="website")  # website, Admin Panel, import...
+
+    # Chei normalizate pentru deduplicare (formular și import), întreținute de @validates
+    email_key = Column(String(100), index=True)
+    phone_key = Column(String(20), index=True)
+    submissions = Column(Integer, default=1, server_default="1", nullable=False)  # Trimiteri comasate în acest lead
 
     status = Column(String(20), default="new")
 
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # Rollup-uri zilnice
+    # Indexat: rollup-ul funnel-ului recalculează doar cohortele cu lead-uri modificate
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # RELATIONSHIPS - CORECTATE
     # Relația către cel care a creat lead-ul
@@ -116,6 +142,17 @@ class ContactLead(Base):
         foreign_keys=[assigned_to]
     )
 
+    @validates("email")
+    def _set_email_key(self, key, value):
+        self.email_key = email_key(value)
+        return value
+
+    @validates("phone")
+    def _set_phone_key(self, key, value):
+        self.phone_key = phone_key(value)
+        return value
+
+
 class Project(Base):
     __tablename__ = "projects"
 
@@ -152,7 +189,7 @@ class ServiceRequest(Base):
 
     # Detalii Serviciu
     type = Column(String, nullable=False)  # consultatie, oferta, instalare, mentenanta, reparatie
-    preferred_date = Column(DateTime, nullable=False)
+    preferred_date = Column(DateTime, nullable=False, index=True)  # Calendar: interogări pe interval
     preferred_time = Column(String, nullable=False)
     location = Column(String, nullable=False)
     phone = Column(String, nullable=False)
@@ -169,12 +206,17 @@ class ServiceRequest(Base):
     status = Column(String, default="pending")
     admin_response = Column(Text, nullable=True)
     new_proposed_date = Column(DateTime, nullable=True)
+    # Echipa/agentul care preia cererea (setat din admin, inclusiv în masă)
+    assigned_to = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
 
     # Audit
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # Rollup-uri zilnice
+    # Indexat: motorul de disponibilitate citește incremental doar rândurile modificate
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # Relația către utilizator (va fi None pentru intervențiile manuale)
-    user = relationship("User", back_populates="service_requests")
+    user = relationship("User", back_populates="service_requests", foreign_keys=[user_id])
+    assigned_user = relationship("User", foreign_keys=[assigned_to])
 
 class BlogPost(Base):
     __tablename__ = "blog_posts"
@@ -209,6 +251,10 @@ class BlogPost(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Istoric paginat cu cursor: WHERE room_id = ? AND created_at < ? ORDER BY created_at DESC
+        Index("ix_chat_messages_room_created", "room_id", "created_at"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     room_id = Column(String(100), index=True)  # Format: user_{user_id}
@@ -225,8 +271,37 @@ class ChatMessage(Base):
     user = relationship("User", back_populates="chat_messages")
 
 
+class ChatRoomSummary(Base):
+    """Rezumat per cameră, actualizat la fiecare flush de mesaje (inbox-ul adminului)."""
+    __tablename__ = "chat_room_summaries"
+
+    room_id = Column(String(100), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+
+    last_message = Column(Text)
+    last_message_at = Column(DateTime, index=True)
+    last_sender_id = Column(UUID(as_uuid=True), nullable=True)
+    last_is_admin = Column(Boolean, default=False)
+
+    # Mesaje de la client încă necitite de admin
+    unread_count = Column(Integer, default=0, nullable=False)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = relationship("User")
+
+
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # Citiri recent-first paginate cu cursor (created_at, id), opțional filtrate
+        Index("ix_audit_logs_created_id", "created_at", "id"),
+        Index("ix_audit_logs_user_created", "user_id", "created_at"),
+        Index("ix_audit_logs_action_created", "action", "created_at"),
+        Index("ix_audit_logs_entity_created", "entity_type", "entity_id", "created_at"),
+        # Partiționat lunar (vezi migrations.py și core/audit_partitions.py): retenția detașează partiții întregi
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
@@ -236,8 +311,65 @@ class AuditLog(Base):
     details = Column(JSON)
     ip_address = Column(String(45))
     user_agent = Column(String(500))
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # Cheia de partiționare trebuie să facă parte din cheia primară
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
+
+
+class LeadStatusEvent(Base):
+    """Istoric append-only al schimbărilor de status (baza funnel-ului de conversie)."""
+    __tablename__ = "lead_status_events"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    lead_id = Column(UUID(as_uuid=True), ForeignKey("contact_leads.id", ondelete="CASCADE"), nullable=False, index=True)
+    from_status = Column(String(20))
+    to_status = Column(String(20), nullable=False)
+    changed_by = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class LeadFunnelWeekly(Base):
+    """
+    Rollup săptămânal al funnel-ului, pe cohorte (săptămâna în care a intrat lead-ul), sursă și interes.
+    Duratele sunt histograme pe intervalele din FUNNEL_BUCKET_HOURS, ca percentilele să se poată
+    combina între rânduri fără a reciti evenimentele.
+    """
+    __tablename__ = "lead_funnel_weekly"
+
+    week = Column(Date, primary_key=True)  # Lunea săptămânii
+    source = Column(String(50), primary_key=True, default="")
+    interest = Column(String(100), primary_key=True, default="")
+
+    leads = Column(Integer, nullable=False, default=0)
+    contacted = Column(Integer, nullable=False, default=0)
+    won = Column(Integer, nullable=False, default=0)
+
+    hours_to_contacted = Column(JSON)  # new -> contactat
+    hours_contacted_to_won = Column(JSON)  # contactat -> câștigat
+    hours_to_won = Column(JSON)  # new -> câștigat
+
+    computed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class LeadFunnelDirtyWeek(Base):
+    """
+    Săptămâni de recalculat la următorul refresh_funnel: ștergerea unui lead nu lasă urme
+    în updated_at / evenimente, deci ștergerile își marchează aici cohorta.
+    """
+    __tablename__ = "lead_funnel_dirty_weeks"
+
+    week = Column(Date, primary_key=True)
+    marked_at = Column(DateTime, default=datetime.utcnow)
+
+
+class DailyStat(Base):
+    """
+    Rollup zilnic pentru graficele din dashboard: (zi, metrică, dimensiune) -> valoare.
+    Zilele încheiate se calculează o singură dată; istoricul nu mai scanează rândurile brute.
+    """
+    __tablename__ = "daily_stats"
 
+    day = Column(Date, primary_key=True)
+    metric = Column(String(50), primary_key=True)  # new_users, new_leads, new_service_requests
+    dimension = Column(String(100), primary_key=True, default="")  # property_type / type, "" = fără
+    value = Column(Float, nullable=False, default=0)
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
@@ -0,0 +1,198 @@
+import logging
+
+from sqlalchemy import text
+
+from backend.app.models.database import Base, engine
+
+logger = logging.getLogger(__name__)
+
+# create_all() creează doar tabelele lipsă, nu adaugă coloane/indecși pe tabele existente.
+# Pașii de mai jos sunt idempotenți și aduc o bază de date mai veche la zi.
+MIGRATIONS = [
+    # Istoric chat paginat cu cursor
+    "CREATE INDEX IF NOT EXISTS ix_chat_messages_room_created ON chat_messages (room_id, created_at)",
+    # Populare inițială a rezumatelor de cameră din istoricul existent (o singură dată, cât tabela e goală)
+    """
+    INSERT INTO chat_room_summaries (room_id, user_id, last_message, last_message_at,
+                                     last_sender_id, last_is_admin, unread_count, updated_at)
+    SELECT DISTINCT ON (m.room_id)
+           m.room_id,
+           u.id,
+           m.message,
+           m.created_at,
+           m.user_id,
+           m.is_admin,
+           (SELECT count(*) FROM chat_messages c
+             WHERE c.room_id = m.room_id AND c.is_admin = false AND c.is_read = false),
+           now()
+      FROM chat_messages m
+      LEFT JOIN users u ON 'user_' || u.id::text = m.room_id
+     WHERE m.room_id IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM chat_room_summaries)
+    ORDER BY m.room_id, m.created_at DESC
+    ON CONFLICT (room_id) DO NOTHING
+    """,
+    # Calendar: interval pe preferred_date + updated_at pentru GET condiționat (feed iCal)
+    "CREATE INDEX IF NOT EXISTS ix_service_requests_preferred_date ON service_requests (preferred_date)",
+    "ALTER TABLE service_requests ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP",
+    "UPDATE service_requests SET updated_at = created_at WHERE updated_at IS NULL",
+    # Sincronizare incrementală a indexului de disponibilitate
+    "CREATE INDEX IF NOT EXISTS ix_service_requests_updated_at ON service_requests (updated_at)",
+    # Dashboard: rollup-urile zilnice și ziua curentă citesc pe interval de created_at
+    "CREATE INDEX IF NOT EXISTS ix_users_created_at ON users (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_contact_leads_created_at ON contact_leads (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_service_requests_created_at ON service_requests (created_at)",
+    # Funnel lead-uri: sursa lead-ului + cohortele modificate de la ultimul rollup
+    # Backfill o singură dată, doar când coloana se adaugă acum: la fiecare deploy ar rescrie
+    # și lead-urile create între timp cu sursă NULL (admin, import)
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                        WHERE table_name = 'contact_leads' AND column_name = 'source') THEN
+            ALTER TABLE contact_leads ADD COLUMN source VARCHAR(50);
+            UPDATE contact_leads SET source = 'website';
+        END IF;
+    END
+    $$
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_contact_leads_updated_at ON contact_leads (updated_at)",
+    # Deduplicare lead-uri (formular + import) pe chei normalizate, vezi utils/contacts.py
+    "ALTER TABLE contact_leads ADD COLUMN IF NOT EXISTS email_key VARCHAR(100)",
+    "ALTER TABLE contact_leads ADD COLUMN IF NOT EXISTS phone_key VARCHAR(20)",
+    "ALTER TABLE contact_leads ADD COLUMN IF NOT EXISTS submissions INTEGER NOT NULL DEFAULT 1",
+    # create_all a creat coloana fără DEFAULT pe bazele noi: INSERT-urile SQL (COPY, seed) o omit
+    "ALTER TABLE contact_leads ALTER COLUMN submissions SET DEFAULT 1",
+    """
+    UPDATE contact_leads
+       SET email_key = CASE
+               WHEN split_part(lower(trim(email)), '@', 2) IN ('gmail.com', 'googlemail.com')
+               THEN replace(split_part(split_part(lower(trim(email)), '@', 1), '+', 1), '.', '') || '@gmail.com'
+               ELSE lower(trim(email))
+           END,
+           phone_key = NULLIF(right(regexp_replace(coalesce(phone, ''), '[^0-9]', '', 'g'), 9), '')
+     WHERE email_key IS NULL
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_contact_leads_email_key ON contact_leads (email_key)",
+    "CREATE INDEX IF NOT EXISTS ix_contact_leads_phone_key ON contact_leads (phone_key)",
+    # Înlocuiți de cheile normalizate
+    "DROP INDEX IF EXISTS ix_contact_leads_email_lower",
+    "DROP INDEX IF EXISTS ix_contact_leads_phone",
+    # Asignarea cererilor de service (acțiuni în masă din admin)
+    "ALTER TABLE service_requests ADD COLUMN IF NOT EXISTS assigned_to UUID REFERENCES users (id) ON DELETE SET NULL",
+    # Audit partiționat lunar pe created_at. Partițiile se numesc audit_logs_YYYY_MM;
+    # funcția e folosită și de întreținerea periodică (core/audit_partitions.py). Rândurile lunii
+    # ajunse între timp în partiția DEFAULT (întreținere oprită) se mută în partiția nouă
+    """
+    CREATE OR REPLACE FUNCTION audit_logs_create_partition(month date) RETURNS text AS $$
+    DECLARE
+        start_at date := date_trunc('month', month)::date;
+        end_at date := (date_trunc('month', month) + interval '1 month')::date;
+        partition_name text := 'audit_logs_' || to_char(start_at, 'YYYY_MM');
+    BEGIN
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I (LIKE audit_logs INCLUDING DEFAULTS)', partition_name);
+            IF to_regclass('audit_logs_default') IS NOT NULL THEN
+                EXECUTE format('WITH moved AS (DELETE FROM audit_logs_default WHERE created_at >= %L '
+                               'AND created_at < %L RETURNING *) INSERT INTO %I SELECT * FROM moved',
+                               start_at, end_at, partition_name);
+            END IF;
+            EXECUTE format('ALTER TABLE audit_logs ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                           partition_name, start_at, end_at);
+        END IF;
+        RETURN partition_name;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    # Tabela veche (nepartiționată) se convertește o singură dată: rândurile se copiază în partiții
+    """
+    DO $$
+    DECLARE
+        month timestamp;
+    BEGIN
+        IF EXISTS (SELECT 1 FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE c.relname = 'audit_logs' AND n.nspname = current_schema() AND c.relkind = 'r') THEN
+            ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned;
+            ALTER INDEX IF EXISTS audit_logs_pkey RENAME TO audit_logs_unpartitioned_pkey;
+            CREATE TABLE audit_logs (
+                LIKE audit_logs_unpartitioned INCLUDING DEFAULTS,
+                PRIMARY KEY (id, created_at),
+                CONSTRAINT audit_logs_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE SET NULL
+            ) PARTITION BY RANGE (created_at);
+
+            FOR month IN
+                SELECT generate_series(date_trunc('month', coalesce(min(created_at), timezone('utc', now()))),
+                                       date_trunc('month', timezone('utc', now())), interval '1 month')
+                  FROM audit_logs_unpartitioned
+            LOOP
+                PERFORM audit_logs_create_partition(month::date);
+            END LOOP;
+
+            INSERT INTO audit_logs (id, user_id, action, entity_type, entity_id, details, ip_address, user_agent,
+                                    created_at)
+            SELECT id, user_id, action, entity_type, entity_id, details, ip_address, user_agent,
+                   coalesce(created_at, timezone('utc', now()))
+              FROM audit_logs_unpartitioned;
+            DROP TABLE audit_logs_unpartitioned;
+        END IF;
+    END
+    $$
+    """,
+    "SELECT audit_logs_create_partition((date_trunc('month', timezone('utc', now())) + m * interval '1 month')::date) "
+    "FROM generate_series(0, 3) AS m",
+    # Plasă de siguranță: fără partiția lunii, INSERT-ul nu mai eșuează cu "no partition found"
+    "CREATE TABLE IF NOT EXISTS audit_logs_default PARTITION OF audit_logs DEFAULT",
+    "CREATE INDEX IF NOT EXISTS ix_audit_logs_created_id ON audit_logs (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_logs_user_created ON audit_logs (user_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_logs_action_created ON audit_logs (action, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_logs_entity_created ON audit_logs (entity_type, entity_id, created_at)",
+    # Sesiuni: doar hash-ul SHA-256 al refresh token-ului (vezi core/sessions.py); token-urile brute
+    # existente se convertesc pe loc, deci sesiunile deschise rămân valide
+    "ALTER TABLE user_sessions ADD COLUMN IF NOT EXISTS token_hash VARCHAR(64)",
+    """
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'user_sessions' AND column_name = 'refresh_token') THEN
+            UPDATE user_sessions SET token_hash = encode(sha256(convert_to(refresh_token, 'UTF8')), 'hex')
+             WHERE token_hash IS NULL AND refresh_token IS NOT NULL;
+            ALTER TABLE user_sessions DROP COLUMN refresh_token;
+        END IF;
+    END
+    $$
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_user_sessions_token_hash ON user_sessions (token_hash)",
+    # Curățarea periodică a sesiunilor expirate + evacuarea celor mai vechi sesiuni ale unui utilizator
+    "CREATE INDEX IF NOT EXISTS ix_user_sessions_expires_at ON user_sessions (expires_at)",
+    "CREATE INDEX IF NOT EXISTS ix_user_sessions_user_created ON user_sessions (user_id, created_at)",
+    # Revocarea access token-urilor (logout de pe toate dispozitivele, resetare parolă)
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS tokens_valid_after TIMESTAMP",
+]
+
+
+def run_migrations():
+    """Rulează pașii de migrare în ordine, într-o singură tranzacție."""
+    if engine.dialect.name != "postgresql":
+        # Pașii folosesc sintaxă Postgres; alte dialecte primesc schema din create_all()
+        return
+
+    with engine.begin() as conn:
+        for statement in MIGRATIONS:
+            conn.execute(text(statement))
+    logger.info(f"Migrări aplicate: {len(MIGRATIONS)} pași verificați.")
+
+
+def migrate():
+    """
+    Schema completă: tabelele lipsă (create_all), apoi pașii de mai sus. Rulează ca pas separat
+    de deploy (`release` în Procfile), nu la importul aplicației: fiecare worker pornea altfel
+    cu create_all + toți pașii, iar testele plăteau același cost doar ca să colecteze modulele.
+    """
+    Base.metadata.create_all(bind=engine)
+    run_migrations()
+
+
+if __name__ == "__main__":
+    # Rulare manuală / la deploy: python -m backend.app.models.migrations
+    logging.basicConfig(level=logging.INFO)
+    migrate()
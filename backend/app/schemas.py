@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, validator, ConfigDict
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import datetime
 from uuid import UUID
 import re
@@ -87,6 +87,8 @@ class ContactLeadCreate(BaseModel):
 class ContactLeadOut(ContactLeadCreate):
     id: UUID
     status: str
+    source: Optional[str] = None
+    submissions: int = 1
     created_at: datetime
 
     class Config:
@@ -179,6 +181,7 @@ class ServiceRequestOut(BaseModel):
     status: str
     admin_response: Optional[str] = None
     new_proposed_date: Optional[datetime] = None
+    assigned_to: Optional[UUID] = None
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
@@ -198,4 +201,115 @@ class BlogPostCreate(BaseModel):
     featured_image: str
     excerpt: Optional[str] = None
     tags: Optional[str] = None
-    is_published: Optional[str] = "false"
\ No newline at end of file
+    is_published: Optional[str] = "false"
+
+# --- CHAT SCHEMAS ---
+
+class ChatMessageOut(BaseModel):
+    id: UUID
+    room_id: str
+    user_id: Optional[UUID] = None
+    message: str
+    is_admin: bool
+    is_read: bool
+    read_at: Optional[datetime] = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ChatHistoryPage(BaseModel):
+    items: List[ChatMessageOut]
+    next_cursor: Optional[str] = None
+
+
+class ChatRoomSummaryOut(BaseModel):
+    room_id: str
+    user_id: Optional[UUID] = None
+    user_name: Optional[str] = None
+    last_message: Optional[str] = None
+    last_message_at: Optional[datetime] = None
+    last_is_admin: bool = False
+    unread_count: int
+
+
+class ChatInboxPage(BaseModel):
+    items: List[ChatRoomSummaryOut]
+    next_cursor: Optional[str] = None
+
+
+# --- AUDIT ---
+
+class AuditLogOut(BaseModel):
+    id: UUID
+    user_id: Optional[UUID] = None
+    action: str
+    entity_type: Optional[str] = None
+    entity_id: Optional[str] = None
+    details: Optional[dict] = None
+    ip_address: Optional[str] = None
+    user_agent: Optional[str] = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AuditLogPage(BaseModel):
+    items: List[AuditLogOut]
+    next_cursor: Optional[str] = None
+
+
+# --- ACȚIUNI ÎN MASĂ (ADMIN) ---
+# Selecția: listă de ID-uri sau aceleași filtre ca listele din admin
+
+class LeadBulkFilter(BaseModel):
+    search: Optional[str] = None
+    status: Optional[str] = None
+    property_type: Optional[str] = None
+
+
+class LeadBulkAction(BaseModel):
+    action: Literal["status", "assign", "delete"]
+    ids: Optional[List[UUID]] = None
+    filter: Optional[LeadBulkFilter] = None
+    status: Optional[str] = Field(None, max_length=20)
+    assigned_to: Optional[UUID] = None  # null = dezasignare
+
+
+class ServiceRequestBulkFilter(BaseModel):
+    service_type: Optional[str] = None
+    status: Optional[str] = None
+
+
+class ServiceRequestBulkAction(BaseModel):
+    action: Literal["status", "assign", "delete"]
+    ids: Optional[List[UUID]] = None
+    filter: Optional[ServiceRequestBulkFilter] = None
+    status: Optional[str] = None
+    assigned_to: Optional[UUID] = None
+
+
+class UserBulkFilter(BaseModel):
+    role: Optional[str] = None
+    is_active: Optional[bool] = None
+    is_verified: Optional[bool] = None
+
+
+class UserBulkAction(BaseModel):
+    action: Literal["status", "role", "delete"]
+    ids: Optional[List[UUID]] = None
+    filter: Optional[UserBulkFilter] = None
+    is_active: Optional[bool] = None
+    is_verified: Optional[bool] = None
+    role: Optional[str] = None
+
+
+# --- CALENDAR SCHEMAS ---
+
+class CalendarEventOut(BaseModel):
+    id: UUID
+    title: str
+    type: str
+    start: datetime
+    status: str
+    location: Optional[str] = None
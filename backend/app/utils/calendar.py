@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional
+
+from backend.app.core.config import settings
+
+# Statusurile cererilor mapate pe STATUS din RFC 5545
+ICS_STATUS = {
+    "accepted": "CONFIRMED",
+    "pending": "TENTATIVE",
+    "rejected": "CANCELLED",
+    "cancelled": "CANCELLED",
+}
+
+
+def combine_date_time(preferred_date: datetime, preferred_time: Optional[str]) -> datetime:
+    """
+    Ora programării: preferred_time ("HH:MM") aplicat pe ziua din preferred_date.
+    Dacă ora lipsește sau nu e validă, păstrăm ora din preferred_date.
+    """
+    # Coloana e TIMESTAMP fără fus orar: Postgres ignoră offset-ul, la fel facem și noi
+    preferred_date = preferred_date.replace(tzinfo=None)
+    if preferred_time:
+        try:
+            parsed = datetime.strptime(preferred_time.strip()[:5], "%H:%M")
+            return preferred_date.replace(hour=parsed.hour, minute=parsed.minute, second=0, microsecond=0)
+        except ValueError:
+            pass
+    return preferred_date
+
+
+def event_title(full_name: Optional[str], first_name: Optional[str], last_name: Optional[str], type_: str) -> str:
+    if full_name:
+        return full_name
+    if first_name or last_name:
+        return f"{first_name or ''} {last_name or ''}".strip()
+    return type_
+
+
+def _escape(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    return (value.replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _fold(line: str) -> str:
+    # RFC 5545: liniile mai lungi de 75 de octeți se continuă pe rândul următor cu un spațiu
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74
+        chunk = encoded[:limit]
+        # Nu tăiem un caracter UTF-8 multi-octet la mijloc
+        while chunk and (encoded[len(chunk):len(chunk) + 1] or b"\x00")[0] & 0xC0 == 0x80:
+            chunk = chunk[:-1]
+        parts.append(chunk.decode("utf-8"))
+        encoded = encoded[len(chunk):]
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _ics_datetime(value: datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def ics_calendar(events: Iterable[dict]) -> Iterator[str]:
+    """Generează feed-ul iCal bucată cu bucată (potrivit pentru StreamingResponse)."""
+    yield (
+        "BEGIN:VCALENDAR\r\n"
+        "VERSION:2.0\r\n"
+        "PRODID:-//Gabriel Solar Energy//Programari//RO\r\n"
+        "CALSCALE:GREGORIAN\r\n"
+        "METHOD:PUBLISH\r\n"
+        + _fold(f"X-WR-CALNAME:{settings.PROJECT_NAME} - Programări")
+        + f"X-WR-TIMEZONE:{settings.CALENDAR_TIMEZONE}\r\n"
+    )
+
+    duration = timedelta(minutes=settings.CALENDAR_EVENT_DURATION_MINUTES)
+    for event in events:
+        start = event["start"]
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:{event['id']}@gabriel-solar-energy.ro",
+            f"DTSTAMP:{_ics_datetime(event['updated_at'] or start)}Z",
+            # Oră locală "floating": aplicațiile o afișează în fusul orar al calendarului
+            f"DTSTART:{_ics_datetime(start)}",
+            f"DTEND:{_ics_datetime(start + duration)}",
+            f"SUMMARY:{_escape(event['title'])} - {_escape(event['type'])}",
+            f"LOCATION:{_escape(event['location'])}",
+            f"STATUS:{ICS_STATUS.get(event['status'], 'TENTATIVE')}",
+        ]
+        if event.get("description"):
+            lines.append(f"DESCRIPTION:{_escape(event['description'])}")
+        lines.append("END:VEVENT")
+        yield "".join(_fold(line) for line in lines)
+
+    yield "END:VCALENDAR\r\n"
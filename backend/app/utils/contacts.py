@@ -0,0 +1,29 @@
+import re
+from typing import Optional
+
+# Adrese Gmail: punctele și sufixul +eticheta ajung în aceeași căsuță poștală
+GMAIL_DOMAINS = ("gmail.com", "googlemail.com")
+
+# Ultimele 9 cifre = numărul național fără 0 / +40 / 0040 în față
+PHONE_KEY_DIGITS = 9
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def email_key(email: Optional[str]) -> Optional[str]:
+    """Cheia normalizată a unui email (aceeași regulă ca în migrarea de backfill)."""
+    if not email:
+        return None
+    email = email.strip().lower()
+    local, _, domain = email.partition("@")
+    if domain in GMAIL_DOMAINS:
+        return f"{local.split('+', 1)[0].replace('.', '')}@gmail.com"
+    return email
+
+
+def phone_key(phone: Optional[str]) -> Optional[str]:
+    """0712 345 678, +40712345678 și 0040-712-345-678 au aceeași cheie: 712345678."""
+    if not phone:
+        return None
+    digits = _NON_DIGITS.sub("", phone)
+    return digits[-PHONE_KEY_DIGITS:] or None
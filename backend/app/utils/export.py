@@ -0,0 +1,94 @@
+import csv
+import importlib.util
+import io
+import os
+import tempfile
+import uuid
+from datetime import datetime
+from typing import Iterable, Iterator, Sequence
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+# openpyxl este opțional: fără el exportul rămâne disponibil doar ca CSV. Verificăm doar că
+# există; modulul se importă la primul export XLSX (~100 ms economisiți la pornire)
+XLSX_AVAILABLE = importlib.util.find_spec("openpyxl") is not None
+
+EXPORT_FORMATS = ("csv", "xlsx")
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Câte rânduri strângem în buffer înainte de a trimite o bucată din răspuns
+CSV_ROWS_PER_CHUNK = 500
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if value is None:
+        return ""
+    return value
+
+
+def csv_chunks(headers: Sequence[str], rows: Iterable[Sequence]) -> Iterator[str]:
+    """CSV generat incremental; BOM-ul UTF-8 face ca Excel să afișeze corect diacriticele."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(headers)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([_cell(value) for value in row])
+        if count % CSV_ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _xlsx_cell(value):
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def xlsx_chunks(headers: Sequence[str], rows: Iterable[Sequence], sheet_title: str) -> Iterator[bytes]:
+    """
+    XLSX în modul write-only: rândurile ajung direct pe disc, nu în memorie.
+    Arhiva se poate trimite doar după ce e completă, apoi o citim pe bucăți.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title[:31])
+    sheet.append(list(headers))
+    for row in rows:
+        sheet.append([_xlsx_cell(value) for value in row])
+
+    handle, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(handle)
+    try:
+        workbook.save(path)
+        with open(path, "rb") as file:
+            while chunk := file.read(FILE_CHUNK_SIZE):
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def export_response(format: str, name: str, headers: Sequence[str], rows: Iterable[Sequence]):
+    """
+    StreamingResponse pentru export. `rows` trebuie să fie un generator: sesiunea și
+    cursorul server-side se deschid abia la iterarea răspunsului și trăiesc cât transferul.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Format de export necunoscut (csv sau xlsx).")
+    if format == "xlsx" and not XLSX_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Exportul XLSX nu este disponibil pe acest server.")
+
+    filename = f"{name}-{datetime.utcnow():%Y%m%d-%H%M}.{format}"
+    disposition = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if format == "csv":
+        return StreamingResponse(csv_chunks(headers, rows), media_type="text/csv; charset=utf-8", headers=disposition)
+    return StreamingResponse(xlsx_chunks(headers, rows, name), media_type=XLSX_MEDIA_TYPE, headers=disposition)
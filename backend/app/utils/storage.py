@@ -1,9 +1,7 @@
-import boto3
-from botocore.client import Config
-from PIL import Image
 import io
 import uuid
 import os
+from functools import lru_cache
 from fastapi import UploadFile
 
 # Acestea ar trebui să stea în .env pe Railway
@@ -12,21 +10,33 @@ RAILWAY_STORAGE_BUCKET = os.getenv("RAILWAY_STORAGE_BUCKET")
 RAILWAY_STORAGE_ACCESS_KEY = os.getenv("RAILWAY_STORAGE_ACCESS_KEY")
 RAILWAY_STORAGE_SECRET_KEY = os.getenv("RAILWAY_STORAGE_SECRET_KEY")
 
-# Configurare client S3-compatible pentru Railway
-s3_client = boto3.client(
-    's3',
-    endpoint_url=RAILWAY_STORAGE_ENDPOINT,
-    aws_access_key_id=RAILWAY_STORAGE_ACCESS_KEY,
-    aws_secret_access_key=RAILWAY_STORAGE_SECRET_KEY,
-    config=Config(signature_version='s3v4'),
-    region_name='auto'
-)
+
+@lru_cache(maxsize=1)
+def get_s3_client():
+    """
+    Client S3-compatible pentru Railway, creat la primul upload: boto3 și construirea
+    clientului costă câteva sute de ms, plătite altfel la fiecare pornire de worker.
+    """
+    import boto3
+    from botocore.client import Config
+
+    return boto3.client(
+        's3',
+        endpoint_url=RAILWAY_STORAGE_ENDPOINT,
+        aws_access_key_id=RAILWAY_STORAGE_ACCESS_KEY,
+        aws_secret_access_key=RAILWAY_STORAGE_SECRET_KEY,
+        config=Config(signature_version='s3v4'),
+        region_name='auto'
+    )
+
 
 async def upload_image_to_bucket(file: UploadFile) -> str:
     """
     Procesează imaginea (redimensionare + WebP) și o urcă în bucket.
     Returnează URL-ul public al imaginii.
     """
+    from PIL import Image
+
     try:
         # 1. Citim fișierul în memorie
         content = await file.read()
@@ -50,7 +60,7 @@ async def upload_image_to_bucket(file: UploadFile) -> str:
         file_name = f"requests/{uuid.uuid4()}.{file_extension}"
 
         # 6. Upload efectiv
-        s3_client.upload_fileobj(
+        get_s3_client().upload_fileobj(
             img_byte_arr,
             RAILWAY_STORAGE_BUCKET,
             file_name,
@@ -0,0 +1,96 @@
+"""
+Benchmark: QR-ul de setup 2FA, PNG prin Pillow (vechea implementare) vs PNG scris direct cu zlib.
+
+Rulare:  SECRET_KEY=... python -m benchmarks.bench_2fa_qr [--runs 200]
+Nu are nevoie de bază de date. Raportează mărimea data URI-ului (și gzip, cum pleacă în răspunsul
+JSON comprimat) și latența mediană per randare, separat doar pentru codarea imaginii (generarea
+matricei QR e comună și domină timpul), plus costul unei reîncărcări servite din cache.
+"""
+import argparse
+import base64
+import gzip
+import io
+import statistics
+import time
+
+import pyotp
+import qrcode
+
+from backend.app.api.auth import pending_2fa_setups
+from backend.app.core.security import encode_qr_png, generate_2fa_qr, qr_matrix
+
+EMAIL = "ana.popescu@example.ro"
+
+
+def generate_png_qr(email: str, secret: str) -> str:
+    """Implementarea anterioară, păstrată pentru comparație."""
+    totp_uri = pyotp.totp.TOTP(secret).provisioning_uri(name=email, issuer_name="Gabriel Solar Energy")
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(totp_uri)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+
+def pillow_encode(qr: qrcode.QRCode) -> bytes:
+    buffer = io.BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def median_ms(fn, runs: int) -> float:
+    fn()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def measure(render, runs: int):
+    secrets = [pyotp.random_base32() for _ in range(runs)]
+    render(EMAIL, secrets[0])  # Încălzire (importuri, tabele qrcode)
+    samples, sizes, gzipped = [], [], []
+    for secret in secrets:
+        start = time.perf_counter()
+        uri = render(EMAIL, secret)
+        samples.append((time.perf_counter() - start) * 1000)
+        sizes.append(len(uri))
+        gzipped.append(len(gzip.compress(uri.encode())))
+    return statistics.median(samples), statistics.median(sizes), statistics.median(gzipped)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'':<24}{'latență':>12}{'data URI':>14}{'gzip':>12}")
+    for label, render in (("PNG prin Pillow", generate_png_qr), ("PNG zlib (fără Pillow)", generate_2fa_qr)):
+        latency, size, compressed = measure(render, args.runs)
+        print(f"{label:<24}{latency:>9.2f} ms{size:>12} B{compressed:>10} B")
+
+    # Doar codarea imaginii, pe aceeași matrice
+    uri = pyotp.totp.TOTP(pyotp.random_base32()).provisioning_uri(name=EMAIL, issuer_name="Gabriel Solar Energy")
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(uri)
+    qr.make(fit=True)
+    matrix = qr_matrix(uri)
+    print(f"{'Matrice QR (comună)':<24}{median_ms(lambda: qr_matrix(uri), args.runs):>9.2f} ms")
+    print(f"{'Codare Pillow':<24}{median_ms(lambda: pillow_encode(qr), args.runs):>9.2f} ms")
+    print(f"{'Codare zlib':<24}{median_ms(lambda: encode_qr_png(matrix), args.runs):>9.2f} ms")
+
+    # Reîncărcarea paginii de setup: aceeași căutare ca endpoint-ul
+    pending_2fa_setups.set("bench", {"qr_code": generate_2fa_qr(EMAIL, pyotp.random_base32()), "secret": "-"})
+    start = time.perf_counter()
+    for _ in range(args.runs):
+        pending_2fa_setups.get("bench")
+    print(f"{'Reîncărcare din cache':<24}{(time.perf_counter() - start) / args.runs * 1000:>9.4f} ms")
+    pending_2fa_setups.invalidate("bench")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Benchmark: jurnalul de audit partiționat lunar, la volum mare (implicit 50M rânduri).
+
+Rulare:  DATABASE_URL=postgresql://... python -m benchmarks.bench_audit [--rows 50000000] [--months 24]
+             [--baseline] [--keep | --reuse]
+Rulați pe o bază de test: rândurile (entity_type="bench") se inserează în audit_logs cu generate_series,
+întinse pe ultimele --months luni, și se șterg la final (--keep le păstrează, --reuse nu mai inserează).
+--baseline copiază rândurile într-o tabelă nepartiționată, fără indexuri (schema veche), pentru comparație.
+Timpii sunt mediana a 5 rulări, pe sesiuni calde.
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+from backend.app.api.admin import get_audit_logs
+from backend.app.core.audit_partitions import add_months, list_partitions
+from backend.app.models.database import Base, SessionLocal, User, engine
+from backend.app.models.migrations import run_migrations
+
+BENCH_ENTITY = "bench"
+BENCH_EMAIL = "bench-audit@example.ro"
+SEED_BATCH = 1_000_000
+RUNS = 5
+
+# Distribuția acțiunilor: login-urile domină, ștergerile sunt rare
+ACTIONS_SQL = """
+    CASE WHEN n % 1000 = 0 THEN 'LEAD_DELETE'
+         WHEN n % 10 = 0 THEN 'LEAD_UPDATE'
+         WHEN n % 7 = 0 THEN 'USER_UPDATE'
+         ELSE 'LOGIN' END
+"""
+
+
+def bench_user_id():
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.email == BENCH_EMAIL).first()
+        if user is None:
+            user = User(email=BENCH_EMAIL, hashed_password="-", first_name="Bench", last_name="Audit", role="admin")
+            db.add(user)
+            db.commit()
+        return user.id
+
+
+def seed(rows: int, months: int, user_id):
+    now = datetime.utcnow()
+    first_month = add_months(now.date().replace(day=1), -months)
+    span_seconds = (now - datetime.combine(first_month, datetime.min.time())).total_seconds()
+    with engine.begin() as conn:
+        month = first_month
+        while month <= now.date():
+            conn.execute(text("SELECT audit_logs_create_partition(:month)"), {"month": month})
+            month = add_months(month, 1)
+
+    for start in range(1, rows + 1, SEED_BATCH):
+        end = min(start + SEED_BATCH - 1, rows)
+        with engine.begin() as conn:
+            # 1 din 500 de rânduri aparține utilizatorului de test (filtrul pe user)
+            conn.execute(text(f"""
+                INSERT INTO audit_logs (id, user_id, action, entity_type, entity_id, details, ip_address,
+                                        user_agent, created_at)
+                SELECT gen_random_uuid(), CASE WHEN n % 500 = 0 THEN CAST(:user_id AS uuid) END,
+                       {ACTIONS_SQL}, :entity, (n % 100000)::text, '{{"status": ["new", "contacted"]}}',
+                       '10.0.0.' || (n % 250), 'Mozilla/5.0 (bench)',
+                       :now - make_interval(secs => (n::float8 / :rows) * :span)
+                  FROM generate_series(:start, :end) AS n
+            """), {"user_id": str(user_id), "entity": BENCH_ENTITY, "now": now, "rows": rows,
+                   "span": span_seconds, "start": start, "end": end})
+        print(f"  {end} / {rows} rânduri inserate", flush=True)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE audit_logs"))
+
+
+def timed(fn) -> float:
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def audit_page(**filters):
+    defaults = dict(limit=100, before=None, user_id=None, action=None, entity_type=None, entity_id=None,
+                    from_date=None, to_date=None)
+    defaults.update(filters)
+    with SessionLocal() as db:
+        return get_audit_logs(db=db, **defaults)
+
+
+def deep_page(pages: int):
+    cursor = None
+    for _ in range(pages):
+        cursor = audit_page(before=cursor)["next_cursor"]
+
+
+def report(label: str, milliseconds: float):
+    print(f"{label:<52}{milliseconds:>10.1f} ms")
+
+
+def run_reads(user_id):
+    now = datetime.utcnow()
+    year_ago = add_months(now.date().replace(day=1), -12)
+    report("Prima pagină (100, recent-first)", timed(lambda: audit_page()))
+    report("Pagina 50 prin cursor (50 interogări)", timed(lambda: deep_page(50)))
+    report("Filtru utilizator", timed(lambda: audit_page(user_id=user_id)))
+    report("Filtru acțiune rară (LEAD_DELETE)", timed(lambda: audit_page(action="LEAD_DELETE")))
+    report("Filtru entitate", timed(lambda: audit_page(entity_type=BENCH_ENTITY, entity_id="4242")))
+    report("Interval: o lună de acum un an", timed(lambda: audit_page(
+        from_date=datetime.combine(year_ago, datetime.min.time()),
+        to_date=datetime.combine(add_months(year_ago, 1), datetime.min.time())
+    )))
+
+
+def run_retention():
+    with engine.connect() as conn:
+        partitions = list_partitions(conn)
+        has_baseline = conn.execute(text("SELECT to_regclass('bench_audit_flat')")).scalar() is not None
+        conn.rollback()
+        oldest, oldest_month = partitions[0]
+
+        # Ambele variante rulează într-o tranzacție anulată la final: datele rămân neatinse
+        with conn.begin() as transaction:
+            start = time.perf_counter()
+            conn.execute(text(f'ALTER TABLE audit_logs DETACH PARTITION "{oldest}"'))
+            report(f"Retenție: DETACH PARTITION {oldest}", (time.perf_counter() - start) * 1000)
+            transaction.rollback()
+
+        if has_baseline:
+            with conn.begin() as transaction:
+                start = time.perf_counter()
+                deleted = conn.execute(text("DELETE FROM bench_audit_flat WHERE created_at < :cutoff"),
+                                       {"cutoff": add_months(oldest_month, 1)}).rowcount
+                report(f"Retenție veche: DELETE ({deleted} rânduri)", (time.perf_counter() - start) * 1000)
+                transaction.rollback()
+
+
+def run_baseline():
+    with engine.begin() as conn:
+        if not conn.execute(text("SELECT to_regclass('bench_audit_flat')")).scalar():
+            conn.execute(text("CREATE TABLE bench_audit_flat AS SELECT * FROM audit_logs WHERE entity_type = :entity"),
+                         {"entity": BENCH_ENTITY})
+            conn.execute(text("ALTER TABLE bench_audit_flat ADD PRIMARY KEY (id)"))
+            conn.execute(text("ANALYZE bench_audit_flat"))
+
+    def old_query():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT * FROM bench_audit_flat ORDER BY created_at DESC LIMIT 100")).all()
+
+    report("Schema veche: ORDER BY created_at DESC LIMIT 100", timed(old_query))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--baseline", action="store_true", help="compară cu tabela nepartiționată fără indexuri")
+    parser.add_argument("--keep", action="store_true", help="nu șterge rândurile la final")
+    parser.add_argument("--reuse", action="store_true", help="folosește rândurile inserate la o rulare anterioară")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations()
+    user_id = bench_user_id()
+    if not args.reuse:
+        seed(args.rows, args.months, user_id)
+    try:
+        with engine.connect() as conn:
+            total = conn.execute(text("SELECT count(*) FROM audit_logs")).scalar()
+            print(f"{total} rânduri de audit în {len(list_partitions(conn))} partiții")
+        run_reads(user_id)
+        if args.baseline:
+            run_baseline()
+        run_retention()
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                conn.execute(text("DROP TABLE IF EXISTS bench_audit_flat"))
+                conn.execute(text("DELETE FROM audit_logs WHERE entity_type = :entity"), {"entity": BENCH_ENTITY})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: lanțul de autentificare (verify_token -> get_current_user -> get_current_active_user)
+cu și fără cache-ul de access token-uri verificate.
+
+Rulare:  DATABASE_URL=postgresql://... SECRET_KEY=... python -m benchmarks.bench_auth [--requests 20000]
+Rulați pe o bază de test: se creează (o singură dată) utilizatorul bench-auth@example.ro.
+--no-db măsoară doar verificarea token-ului, fără baza de date.
+"""
+import argparse
+import asyncio
+import time
+
+from backend.app.core.config import settings
+from backend.app.core.security import (
+    create_access_token, get_current_active_user, get_current_user, verified_tokens, verify_token
+)
+from backend.app.models.database import SessionLocal, User
+
+BENCH_EMAIL = "bench-auth@example.ro"
+
+
+def bench_user_id():
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.email == BENCH_EMAIL).first()
+        if user is None:
+            user = User(email=BENCH_EMAIL, hashed_password="-", first_name="Bench", last_name="Auth",
+                        is_verified=True)
+            db.add(user)
+            db.commit()
+        return str(user.id)
+
+
+def verify_only(token: str, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        verify_token(token)
+    return time.perf_counter() - start
+
+
+async def dependency_chain(token: str, requests: int) -> float:
+    # Aceeași ordine ca FastAPI: o sesiune per request, get_current_user apoi get_current_active_user
+    start = time.perf_counter()
+    for _ in range(requests):
+        with SessionLocal() as db:
+            await get_current_active_user(await get_current_user(token=token, db=db))
+    return time.perf_counter() - start
+
+
+def report(label: str, seconds: float, requests: int):
+    print(f"{label:<44}{seconds / requests * 1e6:>10.1f} µs/request")
+
+
+def run(label: str, token: str, requests: int, use_db: bool, cached: bool):
+    settings.JWT_CACHE_MAXSIZE = verified_tokens.maxsize if cached else 0
+    verified_tokens.invalidate()
+    verify_token(token)  # Încălzire (și prima verificare, care populează cache-ul)
+    report(f"verify_token, {label}", verify_only(token, requests), requests)
+    if use_db:
+        report(f"lanț complet (cu DB), {label}", asyncio.run(dependency_chain(token, requests)), requests)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--no-db", action="store_true", help="doar verificarea token-ului")
+    args = parser.parse_args()
+
+    subject = "00000000-0000-0000-0000-000000000000" if args.no_db else bench_user_id()
+    token = create_access_token(data={"sub": subject})
+    configured = settings.JWT_CACHE_MAXSIZE
+    try:
+        run("fără cache", token, args.requests, not args.no_db, cached=False)
+        run("cu cache", token, args.requests, not args.no_db, cached=True)
+    finally:
+        settings.JWT_CACHE_MAXSIZE = configured
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: calendarul admin prin paginarea /admin/all vs /admin/calendar și feed-ul .ics.
+
+Rulare:  DATABASE_URL=postgresql://... python -m benchmarks.bench_calendar [--per-day 30]
+Inserează un an de programări marcate cu type="bench-calendar" și le șterge la final.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import joinedload
+
+from backend.app.api.admin import calendar_events_query, stream_feed_events
+from backend.app.models.database import Base, SessionLocal, ServiceRequest, engine
+from backend.app.schemas import ServiceRequestOut
+from backend.app.utils.calendar import combine_date_time, event_title, ics_calendar
+
+BENCH_TYPE = "bench-calendar"
+
+
+def seed(per_day: int) -> datetime:
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=180)
+    rows = []
+    for day in range(365):
+        for _ in range(per_day):
+            rows.append({
+                "type": BENCH_TYPE,
+                "preferred_date": start + timedelta(days=day),
+                "preferred_time": f"{random.randint(8, 17):02d}:{random.choice(['00', '30'])}",
+                "location": "Cluj-Napoca",
+                "phone": "0712345678",
+                "full_name": "Client Benchmark",
+                "status": random.choice(["pending", "accepted", "rejected"]),
+                "photos": [],
+                "created_at": start,
+                "updated_at": start
+            })
+    with SessionLocal() as db:
+        db.bulk_insert_mappings(ServiceRequest, rows)
+        db.commit()
+    return start
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<42}{(time.perf_counter() - start) * 1000:>10.1f} ms   {result}")
+
+
+def old_paging() -> str:
+    # Ce făcea frontend-ul: toate paginile din /admin/all (count + pagină) și filtrare locală
+    pages, items, page = 0, 0, 1
+    with SessionLocal() as db:
+        while True:
+            query = db.query(ServiceRequest).options(joinedload(ServiceRequest.user)) \
+                .filter(ServiceRequest.type == BENCH_TYPE)
+            query.count()
+            batch = query.order_by(ServiceRequest.created_at.desc()).offset((page - 1) * 100).limit(100).all()
+            items += len([ServiceRequestOut.model_validate(row).model_dump() for row in batch])
+            pages += 1
+            if len(batch) < 100:
+                break
+            page += 1
+    return f"{pages} pagini, {items} rânduri"
+
+
+def calendar_window(start: datetime) -> str:
+    # Fereastra vizibilă tipică: o lună cu zilele din săptămânile vecine (6 săptămâni)
+    window_start = start + timedelta(days=170)
+    with SessionLocal() as db:
+        rows = calendar_events_query(db, window_start, window_start + timedelta(days=42)).all()
+        events = [
+            {"id": row.id, "title": event_title(row.full_name, row.first_name, row.last_name, row.type),
+             "start": combine_date_time(row.preferred_date, row.preferred_time), "status": row.status}
+            for row in rows
+        ]
+    return f"{len(events)} evenimente"
+
+
+def ics_feed(start: datetime) -> str:
+    size = sum(len(chunk) for chunk in ics_calendar(stream_feed_events(start, start + timedelta(days=365))))
+    return f"{size / 1024:.0f} KiB"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--per-day", type=int, default=30)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    start = seed(args.per_day)
+    try:
+        timed("paginare /admin/all (100/pagină)", old_paging)
+        timed("/admin/calendar (6 săptămâni)", lambda: calendar_window(start))
+        timed("feed .ics (un an, streaming)", lambda: ics_feed(start))
+    finally:
+        with SessionLocal() as db:
+            db.query(ServiceRequest).filter(ServiceRequest.type == BENCH_TYPE).delete(synchronize_session=False)
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
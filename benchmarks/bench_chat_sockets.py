@@ -0,0 +1,125 @@
+"""
+Benchmark: socket-uri de chat deschise nu trebuie să țină conexiuni din pool-ul bazei de date.
+
+Rulare:  DATABASE_URL=postgresql://... SECRET_KEY=... python -m benchmarks.bench_chat_sockets [--sockets 200]
+Pornește aplicația cu uvicorn în același proces, deschide `--sockets` websocket-uri autentificate
+(utilizatorul bench-chat@example.ro, admin, creat o singură dată; limita per utilizator e ridicată
+doar pentru rulare) și, cât timp sunt deschise, măsoară GET /admin/leads și conexiunile ținute
+din pool. Iese cu cod 1 dacă un request depășește --max-ms sau pool-ul are peste
+--max-checked-out conexiuni folosite în repaus.
+"""
+import argparse
+import asyncio
+import socket
+import statistics
+import sys
+import time
+import uuid
+
+import requests
+import uvicorn
+import websockets
+
+from backend.app.core.config import settings
+from backend.app.core.security import create_access_token
+from backend.app.models.database import SessionLocal, User, engine
+
+BENCH_EMAIL = "bench-chat@example.ro"
+
+
+def bench_admin_id() -> str:
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.email == BENCH_EMAIL).first()
+        if user is None:
+            user = User(email=BENCH_EMAIL, hashed_password="-", first_name="Bench", last_name="Chat",
+                        role="admin", is_active=True, is_verified=True)
+            db.add(user)
+            db.commit()
+        return str(user.id)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def timed_get(url: str, token: str) -> float:
+    start = time.perf_counter()
+    response = requests.get(url, headers={"Authorization": f"Bearer {token}"}, timeout=30)
+    elapsed = (time.perf_counter() - start) * 1000
+    if response.status_code != 200:
+        raise SystemExit(f"GET {url} a răspuns {response.status_code}: {response.text[:300]}")
+    return elapsed
+
+
+async def run(args) -> list:
+    from main import app
+
+    token = create_access_token(data={"sub": bench_admin_id()})
+    settings.CHAT_MAX_CONNECTIONS_PER_USER = args.sockets
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base = f"127.0.0.1:{port}{settings.API_V1_PREFIX}"
+    leads_url = f"http://{base}/admin/leads?page=1&size=50"
+    problems = []
+    sockets = []
+    try:
+        baseline = statistics.median([await asyncio.to_thread(timed_get, leads_url, token) for _ in range(5)])
+
+        start = time.perf_counter()
+        for _ in range(args.sockets):
+            # Camere diferite: adminul poate intra în orice cameră
+            sockets.append(await websockets.connect(f"ws://{base}/chat/ws/{uuid.uuid4()}?token={token}"))
+        opened_in = time.perf_counter() - start
+        await asyncio.sleep(0.5)
+
+        # Fără request în curs, niciun socket deschis nu ar trebui să țină o conexiune
+        idle_checked_out = engine.pool.checkedout()
+        latencies = []
+        for _ in range(args.requests):
+            latencies.append(await asyncio.to_thread(timed_get, leads_url, token))
+            idle_checked_out = max(idle_checked_out, engine.pool.checkedout())
+        open_sockets = sum(1 for ws in sockets if ws.close_code is None)
+
+        print(f"{'socket-uri deschise':<36}{open_sockets:>10} / {args.sockets} în {opened_in:.2f} s")
+        print(f"{'/admin/leads fără socket-uri':<36}{baseline:>10.1f} ms (mediană)")
+        print(f"{'/admin/leads cu socket-uri':<36}{statistics.median(latencies):>10.1f} ms (mediană), "
+              f"max {max(latencies):.1f} ms")
+        print(f"{'conexiuni din pool folosite':<36}{idle_checked_out:>10} (pool_size {engine.pool.size()})")
+
+        if open_sockets < args.sockets:
+            problems.append(f"doar {open_sockets} din {args.sockets} socket-uri au rămas deschise")
+        if max(latencies) > args.max_ms:
+            problems.append(f"/admin/leads a răspuns în {max(latencies):.0f} ms (limita {args.max_ms:.0f} ms)")
+        if idle_checked_out > args.max_checked_out:
+            problems.append(f"{idle_checked_out} conexiuni din pool ținute cu socket-urile deschise "
+                            f"(maxim {args.max_checked_out})")
+    finally:
+        await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+        server.should_exit = True
+        await serving
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sockets", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--max-ms", type=float, default=500)
+    parser.add_argument("--max-checked-out", type=int, default=0)
+    args = parser.parse_args()
+
+    problems = asyncio.run(run(args))
+    for problem in problems:
+        print(f"REGRESIE: {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
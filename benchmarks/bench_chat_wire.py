@@ -0,0 +1,102 @@
+"""
+Benchmark: octeți per mesaj și CPU per broadcast, JSON (vechi/nou) vs msgpack compact.
+
+Rulare:  python -m benchmarks.bench_chat_wire [--messages 20000] [--room-size 3]
+Nu are nevoie de bază de date.
+"""
+import argparse
+import json
+import time
+import uuid
+import zlib
+from datetime import datetime
+
+from backend.app.core.chat_protocol import (
+    msgpack, encode_json, compact_chat_frame, sender_declaration_frame
+)
+
+TEXTS = [
+    "Bună ziua, aș dori o ofertă pentru panouri fotovoltaice.",
+    "Sigur! Ce suprafață are acoperișul?",
+    "Aproximativ 80 mp, orientare sud.",
+    "Perfect, revenim cu o propunere până mâine.",
+    "Mulțumesc!",
+]
+
+
+def build_messages(count: int):
+    senders = [(str(uuid.uuid4()), name, is_admin) for name, is_admin in
+               (("Ana Popescu", False), ("Gabriel Admin", True))]
+    messages = []
+    for i in range(count):
+        user_id, name, is_admin = senders[i % 2]
+        messages.append({
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "name": name,
+            "text": TEXTS[i % len(TEXTS)],
+            "is_admin": is_admin,
+            "created_at": datetime.utcnow().isoformat()
+        })
+    return messages
+
+
+def deflated_size(frames) -> int:
+    # permessage-deflate cu context takeover: un singur compresor pe toată conexiunea
+    compressor = zlib.compressobj(wbits=-15)
+    total = 0
+    for frame in frames:
+        data = frame.encode() if isinstance(frame, str) else frame
+        total += len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--room-size", type=int, default=3)
+    args = parser.parse_args()
+
+    messages = build_messages(args.messages)
+    index = {}
+
+    # 1. Calea veche: send_json() serializa mesajul separat pentru fiecare socket
+    start = time.perf_counter()
+    for message in messages:
+        for _ in range(args.room_size):
+            json.dumps(message)
+    old_cpu = (time.perf_counter() - start) / len(messages)
+
+    # 2. JSON codat o singură dată per broadcast
+    start = time.perf_counter()
+    json_frames = [encode_json(message) for message in messages]
+    json_cpu = (time.perf_counter() - start) / len(messages)
+
+    print(f"{'format':<22}{'octeți/msg':>12}{'deflate/msg':>14}{'µs/broadcast':>15}")
+    json_bytes = sum(len(frame.encode()) for frame in json_frames) / len(messages)
+    print(f"{'json (per socket)':<22}{json_bytes:>12.1f}{'':>14}{old_cpu * 1e6:>15.2f}")
+    print(f"{'json (o dată)':<22}{json_bytes:>12.1f}"
+          f"{deflated_size(json_frames) / len(messages):>14.1f}{json_cpu * 1e6:>15.2f}")
+
+    if msgpack is None:
+        print("msgpack nu este instalat: varianta binară a fost sărită.")
+        return
+
+    # 3. msgpack compact, cu expeditori internați (declarațiile sunt incluse în total)
+    start = time.perf_counter()
+    binary_frames = []
+    for message in messages:
+        if message["user_id"] not in index:
+            index[message["user_id"]] = len(index)
+            binary_frames.append(sender_declaration_frame(index[message["user_id"]], message))
+        created_at = datetime.fromisoformat(message["created_at"])
+        binary_frames.append(compact_chat_frame(message, index[message["user_id"]], created_at))
+    binary_cpu = (time.perf_counter() - start) / len(messages)
+
+    binary_bytes = sum(len(frame) for frame in binary_frames) / len(messages)
+    print(f"{'msgpack compact':<22}{binary_bytes:>12.1f}"
+          f"{deflated_size(binary_frames) / len(messages):>14.1f}{binary_cpu * 1e6:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
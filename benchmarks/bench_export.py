@@ -0,0 +1,101 @@
+"""
+Benchmark: exportul lead-urilor în streaming (yield_per) vs încărcarea întregii tabele.
+
+Rulare:  DATABASE_URL=postgresql://... python -m benchmarks.bench_export [--rows 1000000] [--load-all] [--xlsx]
+Inserează lead-uri cu status="bench-export" (generate_series, doar Postgres) și le șterge la final.
+Memoria este vârful alocărilor Python (tracemalloc), măsurat separat de timp.
+"""
+import argparse
+import csv
+import io
+import time
+import tracemalloc
+
+from sqlalchemy import text
+
+from backend.app.api.admin import LEAD_EXPORT_COLUMNS, filter_leads, stream_export_rows
+from backend.app.models.database import Base, ContactLead, SessionLocal, engine
+from backend.app.utils.export import csv_chunks, xlsx_chunks
+
+BENCH_STATUS = "bench-export"
+HEADERS = [header for header, _ in LEAD_EXPORT_COLUMNS]
+
+
+def seed(rows: int):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO contact_leads (id, full_name, email, phone, property_type, interest, message,
+                                       source, status, created_at, updated_at)
+            SELECT gen_random_uuid(), 'Client ' || n, 'client' || n || '@example.ro', '0712345678',
+                   'casa', 'panouri fotovoltaice', 'Aș dori o ofertă pentru un sistem de 5 kW, cu baterii.',
+                   'website', :status, now() - (n || ' seconds')::interval, now()
+              FROM generate_series(1, :rows) AS n
+        """), {"status": BENCH_STATUS, "rows": rows})
+
+
+def export_rows():
+    return stream_export_rows(
+        LEAD_EXPORT_COLUMNS,
+        lambda query: filter_leads(query, status=BENCH_STATUS).order_by(ContactLead.created_at.desc())
+    )
+
+
+def streaming_csv() -> str:
+    size = sum(len(chunk.encode()) for chunk in csv_chunks(HEADERS, export_rows()))
+    return f"{size / 1024 / 1024:.0f} MiB"
+
+
+def streaming_xlsx() -> str:
+    size = sum(len(chunk) for chunk in xlsx_chunks(HEADERS, export_rows(), "leaduri"))
+    return f"{size / 1024 / 1024:.0f} MiB"
+
+
+def load_all_csv() -> str:
+    # Varianta naivă: toată tabela în memorie (ca list_users), apoi serializare
+    with SessionLocal() as db:
+        leads = filter_leads(db.query(ContactLead), status=BENCH_STATUS).order_by(ContactLead.created_at.desc()).all()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(HEADERS)
+        for lead in leads:
+            writer.writerow([lead.id, lead.full_name, lead.email, lead.phone, lead.property_type, lead.interest,
+                             lead.message, lead.status, lead.source, lead.created_at])
+        data = buffer.getvalue().encode()
+    return f"{len(data) / 1024 / 1024:.0f} MiB"
+
+
+def measure(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34}{elapsed:>9.1f} s {peak / 1024 / 1024:>10.1f} MiB vârf   {result}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--load-all", action="store_true", help="include varianta care încarcă tot în memorie")
+    parser.add_argument("--xlsx", action="store_true")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    seed(args.rows)
+    try:
+        print(f"{args.rows} lead-uri")
+        measure("CSV streaming (yield_per)", streaming_csv)
+        if args.xlsx:
+            measure("XLSX write-only (yield_per)", streaming_xlsx)
+        if args.load_all:
+            measure("CSV cu .all() în memorie", load_all_csv)
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM contact_leads WHERE status = :status"), {"status": BENCH_STATUS})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: timpul de import al aplicației (python -X importtime -c "import main").
+
+Rulare:  SECRET_KEY=... DATABASE_URL=... python -m benchmarks.bench_startup [--runs 5] [--budget-ms 1500]
+Nu se conectează la baza de date: importul nu mai creează schema (vezi models/migrations.py).
+Fiecare rulare e un proces nou (cache-ul de module gol, ca la pornirea unui worker); raportează
+mediana timpului cumulat pentru `main` și modulele cele mai scumpe. Iese cu cod 1 dacă mediana
+depășește bugetul sau dacă la pornire se încarcă o dependință care trebuie importată leneș.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Încărcate doar la prima folosire (upload, e-mail, setup 2FA, export XLSX, funnel lead-uri)
+LAZY_MODULES = ("boto3", "botocore", "PIL", "qrcode", "resend", "openpyxl", "numpy")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_profile() -> dict:
+    """{modul: (µs proprii, µs cumulate, adâncime)} pentru un import curat al aplicației."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, env=os.environ.copy()
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Importul aplicației a eșuat:\n{result.stderr[-2000:]}")
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules[name] = (int(own), int(cumulative), len(indent) // 2)
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    profiles = [import_profile() for _ in range(args.runs)]
+    total_ms = statistics.median(profile["main"][1] for profile in profiles) / 1000
+
+    # Modulele de prim nivel importate (direct sau indirect) de aplicație, după costul cumulat median
+    direct = {name for name, (_, _, depth) in profiles[0].items() if depth == 1}
+    costs = {
+        name: statistics.median(profile[name][1] for profile in profiles if name in profile) / 1000
+        for name in direct
+    }
+    print(f"{'modul':<40}{'cumulat':>12}")
+    for name, cost in sorted(costs.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{name:<40}{cost:>9.1f} ms")
+    print(f"{'main (total, mediană)':<40}{total_ms:>9.1f} ms   buget {args.budget_ms:.0f} ms")
+
+    loaded = sorted({name.split(".")[0] for name in profiles[0]} & set(LAZY_MODULES))
+    problems = []
+    if loaded:
+        problems.append(f"importate la pornire, ar trebui încărcate leneș: {', '.join(loaded)}")
+    if total_ms > args.budget_ms:
+        problems.append(f"importul durează {total_ms:.0f} ms, peste bugetul de {args.budget_ms:.0f} ms")
+    for problem in problems:
+        print(f"REGRESIE: {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,56 @@
+import hmac
+import os
 import time
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Depends, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
 
 # Importuri locale
 from backend.app.core.config import settings
+from backend.app.core import metrics, profiling, query_stats
 from backend.app.core.rate_limit import rate_limit_dependency
-from backend.app.models.database import Base, engine, get_db
+from backend.app.core.audit import audit_writer
+from backend.app.core.events import broker
+from backend.app.core.rollups import scheduler as rollup_scheduler
+from backend.app.models.database import engine, get_db
+from backend.app.models.migrations import migrate
 from backend.app.api import auth, solar, chat, admin
 from backend.app.api import service_requests # Importă fișierul nou creat
 # Configurare Logging pentru monitorizarea erorilor în producție
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Inițializare Tabele Bază de Date (Notă: În producție se recomandă utilizarea Alembic)
-Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema nu se mai creează la import: în producție rulează pasul `release` din Procfile
+    if settings.MIGRATE_ON_STARTUP:
+        await run_in_threadpool(migrate)
+    if not os.path.exists(settings.UPLOAD_FOLDER):
+        os.makedirs(settings.UPLOAD_FOLDER)
+
+    # Task-uri de fundal care trăiesc cât procesul
+    chat.message_writer.start()
+    audit_writer.start()
+    chat.manager.start()
+    await broker.start()
+    rollup_scheduler.start()
+    yield
+    await rollup_scheduler.stop()
+    await broker.stop()
+    await chat.manager.stop()
+    # La oprire golim cozile write-behind ca să nu pierdem mesaje și rânduri de audit
+    await chat.message_writer.stop()
+    await audit_writer.stop()
+
 
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     description="Sistem Enterprise de Management pentru Gabriel Solar Energy",
@@ -49,10 +80,29 @@ app.add_middleware(
 
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
+    start_time = time.perf_counter()
+    method = request.method
+    metrics.HTTP_IN_FLIGHT.inc((method,))
+    status_code = 500
+    try:
+        # Contextul (cu statisticile SQL) se copiază în task-ul aplicației și în threadpool
+        with query_stats.track(request.scope) as stats:
+            response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        process_time = time.perf_counter() - start_time
+        metrics.HTTP_IN_FLIGHT.dec((method,))
+        # Ruta e cunoscută abia după routing (șablonul căii, nu URL-ul concret)
+        route = metrics.route_template(request.scope)
+        metrics.HTTP_LATENCY.observe(process_time, (method, route))
+        metrics.HTTP_REQUESTS.inc((method, route, str(status_code)))
+        metrics.HTTP_DB_QUERIES.observe(stats.count, (method, route))
+        metrics.HTTP_DB_SECONDS.observe(stats.duration, (method, route))
     response.headers["X-Process-Time"] = str(process_time)
+    response.headers["Server-Timing"] = (
+        f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", app;dur={process_time * 1000:.1f}'
+    )
+    query_stats.check_budget(stats, request.scope.get("endpoint"), route)
 
     # Logare cereri lente (> 2 secunde)
     if process_time > 2.0:
@@ -61,6 +111,27 @@ async def add_process_time_header(request: Request, call_next):
     return response
 
 
+# Profilare la cerere / eșantionată (vezi core/profiling.py); înregistrat după middleware-ul de
+# metrici, deci îl învelește: profilul cuprinde și restul lanțului de middleware
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    session = await profiling.session_for(request)
+    if session is None:
+        return await call_next(request)
+
+    profiling.sampler.start(session)
+    token = profiling.current_session.set(session)
+    try:
+        response = await call_next(request)
+    finally:
+        profiling.current_session.reset(token)
+        profiling.sampler.stop(session)
+        profiling.finish(session, request.method, metrics.route_template(request.scope))
+    if session.on_demand:
+        response.headers["X-Profile-Id"] = str(session.id)
+    return response
+
+
 # 3. Global Exception Handler: Protecție împotriva scurgerii de date tehnice în caz de eroare
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -75,14 +146,8 @@ async def global_exception_handler(request: Request, exc: Exception):
 # STATIC FILES & UPLOADS
 # ============================================
 
-# Servire fișiere statice (imagini proiecte, blog, etc.)
-# Asigură-te că directorul 'uploads' există
-import os
-
-if not os.path.exists(settings.UPLOAD_FOLDER):
-    os.makedirs(settings.UPLOAD_FOLDER)
-
-app.mount("/static", StaticFiles(directory=settings.UPLOAD_FOLDER), name="static")
+# Servire fișiere statice (imagini proiecte, blog, etc.); directorul 'uploads' se creează în lifespan
+app.mount("/static", StaticFiles(directory=settings.UPLOAD_FOLDER, check_dir=False), name="static")
 
 # ============================================
 # ROUTER REGISTRATION
@@ -129,6 +194,31 @@ async def health_check(db: Session = Depends(get_db)):
         )
 
 
+# ============================================
+# METRICI (Prometheus)
+# ============================================
+
+metrics.register_pool(engine.pool)
+metrics.CallbackGauge(
+    "websocket_connections", "Socket-uri de chat deschise, pe protocol.",
+    chat.manager.connection_counts, ("protocol",)
+)
+metrics.CallbackGauge("websocket_rooms", "Camere de chat cu cel puțin un socket deschis.",
+                      lambda: {(): len(chat.manager.active_rooms)})
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request):
+    """Metrici în format text Prometheus, per proces (fiecare worker se scrape-uiește separat)."""
+    # Fără token configurat endpoint-ul nu există: rutele, volumele și pool-ul DB nu sunt publice
+    if not settings.METRICS_TOKEN:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    if not hmac.compare_digest(request.headers.get("authorization", ""), expected):
+        return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 # ============================================
 # EXECUTION LOGIC
 # ============================================
@@ -141,5 +231,8 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
-        log_level="info"
+        log_level="info",
+        # Compresie permessage-deflate pentru chat (negociată doar dacă clientul o cere)
+        ws="websockets",
+        ws_per_message_deflate=True
     )
\ No newline at end of file